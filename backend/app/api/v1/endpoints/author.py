@@ -5,7 +5,8 @@ from sqlalchemy.orm import Session
 
 from backend.app.database import get_db
 from backend.app.repositories.author import AuthorRepository
-from backend.app.schemas import Author, AuthorCreate
+from backend.app.schemas import Author, AuthorCreate, SimilarMatch
+from backend.app.write_dispatcher import write_dispatcher
 
 router = APIRouter()
 
@@ -19,6 +20,16 @@ def get_all_authors(
     return AuthorRepository.get_all(db, skip=skip, limit=limit)
 
 
+@router.get("/similar", response_model=List[SimilarMatch])
+def get_similar_authors(
+    name: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """Authors with a similar name, tolerant of typos and case."""
+    return AuthorRepository.find_similar(db, name, limit=limit)
+
+
 @router.get("/{author_id}", response_model=Author)
 def get_author(author_id: int, db: Session = Depends(get_db)):
     author = AuthorRepository.get_by_id(db, author_id)
@@ -28,5 +39,5 @@ def get_author(author_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/create", response_model=Author)
-def create_author(author: AuthorCreate, db: Session = Depends(get_db)):
-    return AuthorRepository.create(db, author)
+def create_author(author: AuthorCreate):
+    return write_dispatcher.submit(AuthorRepository.create, author, groupable=True)
@@ -8,11 +8,17 @@ import zipfile
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse, Response
 
+from backend.app import database, images
 from backend.app.api import deps
-from backend.app.database import engine
+from backend.app.background import background_work_paused
+from backend.app.cache import response_cache
+from backend.app.migrations import upgrade_database
 from backend.app.models import User
+from backend.app.schemas import WriteQueueStats
+from backend.app.write_dispatcher import write_dispatcher
 from backend.config import DATABASE_PATH, IMAGE_PATH
 
 router = APIRouter()
@@ -36,6 +42,54 @@ def _is_within(directory: Path, target: Path) -> bool:
         return False
 
 
+def _write_export_archive(zip_path: str) -> None:
+    """Write the database file and the image directory into ``zip_path``."""
+    # Create the ZIP file with compression level 1 for faster compression
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+        # Add the database file
+        if os.path.exists(DATABASE_PATH):
+            logging.info("Adding database file to ZIP")
+            # Create a temporary copy of the database file
+            temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+            temp_db_path = temp_db.name
+            temp_db.close()
+
+            try:
+                # Copy the database file to the temporary location
+                shutil.copy2(DATABASE_PATH, temp_db_path)
+                # Add the temporary copy to the ZIP
+                zipf.write(temp_db_path, os.path.basename(DATABASE_PATH))
+            finally:
+                # Clean up the temporary database file
+                if os.path.exists(temp_db_path):
+                    os.unlink(temp_db_path)
+
+        # Add the images directory
+        if os.path.exists(IMAGE_PATH):
+            logging.info("Adding images to ZIP")
+            for root, dirs, files in os.walk(IMAGE_PATH):
+                # Thumbnails are generated again, partial downloads are useless
+                dirs[:] = [d for d in dirs if d not in images.WORK_DIRS]
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    arcname = os.path.relpath(file_path, os.path.dirname(IMAGE_PATH))
+                    logging.info(f"Adding file to ZIP: {arcname}")
+                    try:
+                        zipf.write(file_path, arcname)
+                    except Exception as e:
+                        logging.error(f"Error adding file {file_path} to ZIP: {str(e)}")
+                        continue
+
+
+async def _close_database_connections() -> None:
+    """Fold the WAL into the main database file, then close every pooled
+    connection so the file can be copied or replaced."""
+    logging.info("Closing database connections")
+    await run_in_threadpool(database.checkpoint_wal, database.engine)
+    await run_in_threadpool(database.engine.dispose)
+    await database.async_engine.dispose()
+
+
 @router.get(
     "/export",
     response_class=Response,
@@ -61,54 +115,15 @@ async def export_database() -> Response:
         logging.info(f"Database path: {DATABASE_PATH}")
         logging.info(f"Image path: {IMAGE_PATH}")
 
-        # Close all database connections
-        logging.info("Closing database connections")
-        engine.dispose()
-
         # Create a temporary file for the ZIP
         temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
         temp_zip_path = temp_zip.name
         temp_zip.close()
 
-        # Create the ZIP file with compression level 1 for faster compression
-        with zipfile.ZipFile(
-            temp_zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1
-        ) as zipf:
-            # Add the database file
-            if os.path.exists(DATABASE_PATH):
-                logging.info("Adding database file to ZIP")
-                # Create a temporary copy of the database file
-                temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
-                temp_db_path = temp_db.name
-                temp_db.close()
-
-                try:
-                    # Copy the database file to the temporary location
-                    shutil.copy2(DATABASE_PATH, temp_db_path)
-                    # Add the temporary copy to the ZIP
-                    zipf.write(temp_db_path, os.path.basename(DATABASE_PATH))
-                finally:
-                    # Clean up the temporary database file
-                    if os.path.exists(temp_db_path):
-                        os.unlink(temp_db_path)
-
-            # Add the images directory
-            if os.path.exists(IMAGE_PATH):
-                logging.info("Adding images to ZIP")
-                for root, _, files in os.walk(IMAGE_PATH):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(
-                            file_path, os.path.dirname(IMAGE_PATH)
-                        )
-                        logging.info(f"Adding file to ZIP: {arcname}")
-                        try:
-                            zipf.write(file_path, arcname)
-                        except Exception as e:
-                            logging.error(
-                                f"Error adding file {file_path} to ZIP: {str(e)}"
-                            )
-                            continue
+        async with background_work_paused():
+            await _close_database_connections()
+            # Copying the database and compressing images blocks for a while
+            await run_in_threadpool(_write_export_archive, temp_zip_path)
 
         # Get file size
         file_size = os.path.getsize(temp_zip_path)
@@ -151,6 +166,106 @@ async def cleanup_file(file_path: str):
         logging.error(f"Error in background cleanup: {str(e)}")
 
 
+def _restore_archive(temp_zip: str, temp_dir: str) -> None:
+    """Back up the current database and images, then replace them with the
+    ones in the archive ``temp_zip``, extracted under ``temp_dir``."""
+    # Open the archive explicitly to reject anything that is not a valid
+    # ZIP before we touch ``extractall``. ``extractall`` would happily
+    # write outside ``temp_dir`` if a member name had traversal segments
+    # in it, so we extract each member ourselves after checking it.
+    try:
+        with zipfile.ZipFile(temp_zip, "r") as zipf:
+            # Reject archives whose entry names try to escape the
+            # extraction directory (zip-slip) or contain NULs / absolute
+            # paths. We resolve each member against temp_dir and require
+            # it to stay under that directory.
+            for member in zipf.infolist():
+                member_path = Path(temp_dir) / member.filename
+                if not _is_within(Path(temp_dir), member_path.resolve()):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=("Archive contains entries with illegal path " "names"),
+                    )
+
+            # Identify which member is "the database". We require the
+            # basename (no path separators) to look like a plain db
+            # filename so members like ``../../../etc/passwd.db`` are
+            # never treated as the database.
+            db_member = None
+            for member in zipf.infolist():
+                basename = os.path.basename(member.filename)
+                if member.filename.endswith(".db") and _DB_BASENAME_PATTERN.match(
+                    basename
+                ):
+                    db_member = member.filename
+                    break
+
+            if not db_member:
+                raise HTTPException(
+                    status_code=400,
+                    detail="No database file found in the ZIP",
+                )
+
+            # Back up the current database and images before we mutate
+            # anything; a corrupted upload should still be recoverable.
+            backup_dir = os.path.join(os.path.dirname(DATABASE_PATH), "backup")
+            os.makedirs(backup_dir, exist_ok=True)
+
+            if os.path.exists(DATABASE_PATH):
+                shutil.copy2(
+                    DATABASE_PATH,
+                    os.path.join(backup_dir, "database_backup.db"),
+                )
+
+            if os.path.exists(IMAGE_PATH):
+                backup_images = os.path.join(backup_dir, "images_backup")
+                if os.path.exists(backup_images):
+                    shutil.rmtree(backup_images)
+                shutil.copytree(IMAGE_PATH, backup_images)
+
+            # Extract every member, double-checking the resolved path on
+            # each write to defend against symlink-style tricks.
+            for member in zipf.infolist():
+                member_target = (Path(temp_dir) / member.filename).resolve()
+                if not _is_within(Path(temp_dir), member_target):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=("Archive contains entries with illegal path " "names"),
+                    )
+                zipf.extract(member, temp_dir)
+
+            # Move the database file
+            extracted_db = os.path.join(temp_dir, db_member)
+            if not _is_within(Path(temp_dir), Path(extracted_db).resolve()):
+                raise HTTPException(
+                    status_code=400, detail="Invalid database path in archive"
+                )
+            if os.path.exists(extracted_db):
+                # A leftover WAL or shared-memory file belongs to the old
+                # database and would be replayed onto the imported one.
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(DATABASE_PATH + suffix):
+                        os.unlink(DATABASE_PATH + suffix)
+                shutil.move(extracted_db, DATABASE_PATH)
+
+            # Move the images directory if one was provided.
+            extracted_images = os.path.join(temp_dir, "images")
+            candidate = Path(extracted_images).resolve()
+            if not _is_within(Path(temp_dir), candidate):
+                raise HTTPException(
+                    status_code=400, detail="Invalid images path in archive"
+                )
+            if os.path.exists(extracted_images):
+                if os.path.exists(IMAGE_PATH):
+                    shutil.rmtree(IMAGE_PATH)
+                shutil.move(extracted_images, IMAGE_PATH)
+
+    except zipfile.BadZipFile:
+        raise HTTPException(
+            status_code=400, detail="Uploaded file is not a valid ZIP archive"
+        )
+
+
 @router.post(
     "/import",
     dependencies=[Depends(deps.get_current_active_superuser)],
@@ -170,10 +285,6 @@ async def import_database(
     """
     temp_dir = None
     try:
-        # Close all database connections
-        logging.info("Closing database connections")
-        engine.dispose()
-
         # Create a temporary directory for the import
         temp_dir = tempfile.mkdtemp(prefix="mangadb_import_")
         temp_zip = os.path.join(temp_dir, "import.zip")
@@ -193,102 +304,18 @@ async def import_database(
                         status_code=413,
                         detail="Uploaded archive exceeds the maximum allowed size",
                     )
-                buffer.write(chunk)
-
-        # Open the archive explicitly to reject anything that is not a valid
-        # ZIP before we touch ``extractall``. ``extractall`` would happily
-        # write outside ``temp_dir`` if a member name had traversal segments
-        # in it, so we extract each member ourselves after checking it.
-        try:
-            with zipfile.ZipFile(temp_zip, "r") as zipf:
-                # Reject archives whose entry names try to escape the
-                # extraction directory (zip-slip) or contain NULs / absolute
-                # paths. We resolve each member against temp_dir and require
-                # it to stay under that directory.
-                for member in zipf.infolist():
-                    member_path = Path(temp_dir) / member.filename
-                    if not _is_within(Path(temp_dir), member_path.resolve()):
-                        raise HTTPException(
-                            status_code=400,
-                            detail=(
-                                "Archive contains entries with illegal path " "names"
-                            ),
-                        )
-
-                # Identify which member is "the database". We require the
-                # basename (no path separators) to look like a plain db
-                # filename so members like ``../../../etc/passwd.db`` are
-                # never treated as the database.
-                db_member = None
-                for member in zipf.infolist():
-                    basename = os.path.basename(member.filename)
-                    if member.filename.endswith(".db") and _DB_BASENAME_PATTERN.match(
-                        basename
-                    ):
-                        db_member = member.filename
-                        break
-
-                if not db_member:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="No database file found in the ZIP",
-                    )
+                await run_in_threadpool(buffer.write, chunk)
 
-                # Back up the current database and images before we mutate
-                # anything; a corrupted upload should still be recoverable.
-                backup_dir = os.path.join(os.path.dirname(DATABASE_PATH), "backup")
-                os.makedirs(backup_dir, exist_ok=True)
+        async with background_work_paused():
+            await _close_database_connections()
 
-                if os.path.exists(DATABASE_PATH):
-                    shutil.copy2(
-                        DATABASE_PATH,
-                        os.path.join(backup_dir, "database_backup.db"),
-                    )
+            # Backing up and extracting copy whole directories; keep them off
+            # the event loop
+            await run_in_threadpool(_restore_archive, temp_zip, temp_dir)
 
-                if os.path.exists(IMAGE_PATH):
-                    backup_images = os.path.join(backup_dir, "images_backup")
-                    if os.path.exists(backup_images):
-                        shutil.rmtree(backup_images)
-                    shutil.copytree(IMAGE_PATH, backup_images)
-
-                # Extract every member, double-checking the resolved path on
-                # each write to defend against symlink-style tricks.
-                for member in zipf.infolist():
-                    member_target = (Path(temp_dir) / member.filename).resolve()
-                    if not _is_within(Path(temp_dir), member_target):
-                        raise HTTPException(
-                            status_code=400,
-                            detail=(
-                                "Archive contains entries with illegal path " "names"
-                            ),
-                        )
-                    zipf.extract(member, temp_dir)
-
-                # Move the database file
-                extracted_db = os.path.join(temp_dir, db_member)
-                if not _is_within(Path(temp_dir), Path(extracted_db).resolve()):
-                    raise HTTPException(
-                        status_code=400, detail="Invalid database path in archive"
-                    )
-                if os.path.exists(extracted_db):
-                    shutil.move(extracted_db, DATABASE_PATH)
-
-                # Move the images directory if one was provided.
-                extracted_images = os.path.join(temp_dir, "images")
-                candidate = Path(extracted_images).resolve()
-                if not _is_within(Path(temp_dir), candidate):
-                    raise HTTPException(
-                        status_code=400, detail="Invalid images path in archive"
-                    )
-                if os.path.exists(extracted_images):
-                    if os.path.exists(IMAGE_PATH):
-                        shutil.rmtree(IMAGE_PATH)
-                    shutil.move(extracted_images, IMAGE_PATH)
-
-        except zipfile.BadZipFile:
-            raise HTTPException(
-                status_code=400, detail="Uploaded file is not a valid ZIP archive"
-            )
+            # The archive may come from an older version of the application
+            await run_in_threadpool(upgrade_database, database.engine)
+            response_cache.clear()
 
         return {"message": "Import successful"}
     except HTTPException:
@@ -298,4 +325,14 @@ async def import_database(
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
     finally:
         if temp_dir and os.path.isdir(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
+            await run_in_threadpool(shutil.rmtree, temp_dir, ignore_errors=True)
+
+
+@router.get(
+    "/write-queue",
+    response_model=WriteQueueStats,
+    dependencies=[Depends(deps.get_current_user)],
+)
+def get_write_queue_stats():
+    """Depth and throughput counters of the single-writer queue."""
+    return write_dispatcher.stats()
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from backend.app.database import get_db
 from backend.app.repositories.genre import GenreRepository
 from backend.app.schemas import Genre, GenreCreate
+from backend.app.write_dispatcher import write_dispatcher
 
 router = APIRouter()
 
@@ -28,5 +29,5 @@ def get_genre(genre_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/create", response_model=Genre)
-def create_genre(genre: GenreCreate, db: Session = Depends(get_db)):
-    return GenreRepository.create(db, genre)
+def create_genre(genre: GenreCreate):
+    return write_dispatcher.submit(GenreRepository.create, genre, groupable=True)
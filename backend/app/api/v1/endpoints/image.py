@@ -1,14 +1,30 @@
+import logging
 import os
 import re
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
+from typing import Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 from fastapi.responses import FileResponse
 
+from backend.app import images, thumbnails
 from backend.app.api import deps
 from backend.app.models import User
 from backend.app.settings import IMAGE_SAVE_PATH
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Only allow a conservative subset of characters in cover-image filenames.
@@ -17,10 +33,6 @@ router = APIRouter()
 # strange bytes once we have a "clean" basename.
 _SAFE_FILENAME_PATTERN = re.compile(r"^[A-Za-z0-9_.\- ]+$")
 
-# Cap individual cover-image uploads at 20 MiB. Cover art should comfortably
-# fit well under that bound.
-MAX_IMAGE_BYTES = 20 * 1024 * 1024
-
 
 def _sanitize_filename(raw: str) -> str:
     """Return a safe basename for ``raw`` or raise ``HTTPException(400)``.
@@ -73,62 +85,167 @@ def _safe_join(base: str, *parts: str) -> str:
 )
 async def save_manga_cover(
     file: UploadFile = File(...),
-    filename: str = Form(...),
+    filename: Optional[str] = Form(None),
     _current_user: User = Depends(deps.get_current_active_superuser),
 ):
     """Save a cover image. Requires an authenticated admin user. Matches the
     write-vs-read auth split used in :mod:`backend.app.api.v1.endpoints.manga`
     where mutating endpoints are gated by
-    :func:`deps.get_current_active_superuser`."""
+    :func:`deps.get_current_active_superuser`.
+
+    The image is stored under its content hash (see :mod:`backend.app.images`)
+    and that name is returned; ``filename`` is only validated, for clients
+    that still send one.
+    """
     # Validate the declared content type header. This is a client-supplied
     # header, but rejecting obvious non-image uploads still trims the attack
     # surface.
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
-
-    safe_name = _sanitize_filename(filename)
-    file_path = _safe_join(IMAGE_SAVE_PATH, safe_name)
-
-    os.makedirs(IMAGE_SAVE_PATH, exist_ok=True)
+    if filename is not None:
+        _sanitize_filename(filename)
 
     # Stream the upload to disk with an explicit byte cap so a hostile client
     # cannot exhaust disk via a multi-gigabyte body.
     try:
-        bytes_written = 0
         chunk_size = 1024 * 1024
-        with open(file_path, "wb") as f:
-            while True:
-                chunk = await file.read(chunk_size)
-                if not chunk:
-                    break
-                bytes_written += len(chunk)
-                if bytes_written > MAX_IMAGE_BYTES:
-                    # Roll back the partial file we just created.
-                    f.close()
-                    try:
-                        os.unlink(file_path)
-                    except OSError:
-                        pass
-                    raise HTTPException(
-                        status_code=413,
-                        detail="Uploaded image exceeds the maximum allowed size",
-                    )
-                f.write(chunk)
-        return {"filename": safe_name}
-    except HTTPException:
-        raise
+        with images.ImageWriter(IMAGE_SAVE_PATH) as writer:
+            while chunk := await file.read(chunk_size):
+                writer.write(chunk)
+            name = writer.commit()
+    except images.ImageTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail="Uploaded image exceeds the maximum allowed size",
+        )
+    except images.InvalidImage:
+        raise HTTPException(status_code=400, detail="File must be an image")
     except Exception as e:
-        # Try to remove the partial file if writing failed mid-stream.
-        if os.path.exists(file_path):
-            try:
-                os.unlink(file_path)
-            except OSError:
-                pass
         raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+    thumbnails.thumbnail_worker.submit(IMAGE_SAVE_PATH, name)
+    return {"filename": name}
+
+
+SIZE_QUERY = Query(
+    None,
+    description="Scaled-down variant: small (200px wide), medium (400px) or "
+    "large (800px). Without it the original is returned",
+)
+FORMAT_QUERY = Query(
+    None,
+    alias="format",
+    description="Format of the variant; by default the best one the Accept "
+    "header allows (AVIF, WebP, then JPEG)",
+)
+
+
+# Content-addressed names never change content (see backend.app.images)
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Covers saved under their own names before the store: revalidate with ETag
+REVALIDATE = "no-cache"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as for GET
+    return etag.removeprefix("W/") in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    )
+
+
+def _not_modified_since(if_modified_since: Optional[str], mtime: float) -> bool:
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since.timestamp()
+
+
+def _resolve(
+    safe_name: str, variant: Optional[Tuple[str, str]]
+) -> Tuple[str, os.stat_result, Optional[str]]:
+    """Path, stat and media type of the file to serve."""
+    file_path = _safe_join(IMAGE_SAVE_PATH, images.path(".", safe_name))
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, media_type = file_path, None
+    if variant is not None:
+        size, fmt = variant
+        try:
+            path = thumbnails.get_thumbnail(IMAGE_SAVE_PATH, safe_name, size, fmt)
+            media_type = thumbnails.media_type(fmt)
+        except thumbnails.ThumbnailError as e:
+            # Better a large image than none
+            logger.warning("%s", e)
+            path = file_path
+    return path, os.stat(path), media_type
+
+
+def _image_response(
+    request: Request,
+    filename: str,
+    size: Optional[str],
+    fmt: Optional[str],
+) -> Response:
+    safe_name = _sanitize_filename(filename)
+    variant = None
+    if size is not None:
+        if fmt is not None and fmt not in thumbnails.FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format {fmt}")
+        variant = (
+            size,
+            fmt or thumbnails.negotiate_format(request.headers.get("accept")),
+        )
+    content = images.CONTENT_NAME.fullmatch(safe_name)
+
+    headers = {"Cache-Control": IMMUTABLE if content else REVALIDATE}
+    if size is not None and fmt is None:
+        headers["Vary"] = "Accept"
+    suffix = "" if variant is None else "-{}.{}".format(*variant)
+    if_none_match = request.headers.get("if-none-match")
+    if content:
+        # Known without touching the disk
+        headers["ETag"] = f'"{content["hash"]}{suffix}"'
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        key = (IMAGE_SAVE_PATH, safe_name, variant)
+        resolved = images.resolved_paths.get(key)
+        if resolved is None:
+            resolved = _resolve(safe_name, variant)
+            images.resolved_paths.put(key, resolved)
+    else:
+        resolved = _resolve(safe_name, variant)
+    path, stat_result, media_type = resolved
+
+    if not content:
+        headers["ETag"] = (
+            f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}{suffix}"'
+        )
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    headers["Last-Modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+    if if_none_match is None and _not_modified_since(
+        request.headers.get("if-modified-since"), stat_result.st_mtime
+    ):
+        return Response(status_code=304, headers=headers)
+    # Range and If-Range requests are answered by FileResponse
+    return FileResponse(
+        path, media_type=media_type, headers=headers, stat_result=stat_result
+    )
 
 
 @router.get("/manga/{filename}")
-def get_manga_cover_image(filename: str):
+def get_manga_cover_image(
+    request: Request,
+    filename: str,
+    size: Optional[Literal["small", "medium", "large"]] = SIZE_QUERY,
+    format_: Optional[Literal["avif", "webp", "jpeg"]] = FORMAT_QUERY,
+):
     """Return a manga cover image. The path parameter is untrusted, so it is
     sanitized via :func:`_sanitize_filename` and confined to
     :data:`IMAGE_SAVE_PATH` via :func:`_safe_join` to defend against path
@@ -139,20 +256,24 @@ def get_manga_cover_image(filename: str):
     auth-gated ``/api/v1/mangas/...`` endpoints, and the frontend renders
     these images via raw ``<img src>`` tags which cannot attach bearer
     tokens. Filename sanitization is the real defense here.
+
+    With ``size`` a scaled-down variant is returned instead, made on first
+    request and cached (see :mod:`backend.app.thumbnails`).
+
+    Responses carry a strong ETag and Last-Modified and answer conditional
+    and Range requests. Content-addressed images are cacheable forever.
     """
-    safe_name = _sanitize_filename(filename)
-    file_path = _safe_join(IMAGE_SAVE_PATH, safe_name)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Image not found")
-    return FileResponse(file_path)
+    return _image_response(request, filename, size, format_)
 
 
 @router.get("/volume/{filename}")
-def get_volume_cover_image(filename: str):
+def get_volume_cover_image(
+    request: Request,
+    filename: str,
+    size: Optional[Literal["small", "medium", "large"]] = SIZE_QUERY,
+    format_: Optional[Literal["avif", "webp", "jpeg"]] = FORMAT_QUERY,
+):
     """Return a volume cover image. See :func:`get_manga_cover_image` for
-    the rationale on authentication and path-traversal protection."""
-    safe_name = _sanitize_filename(filename)
-    file_path = _safe_join(IMAGE_SAVE_PATH, safe_name)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Image not found")
-    return FileResponse(file_path)
+    the rationale on authentication and path-traversal protection and for
+    ``size`` and caching."""
+    return _image_response(request, filename, size, format_)
@@ -1,52 +1,74 @@
 from typing import List as TypedList
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.database import get_db
-from backend.app.repositories.list import ListRepository
+from backend.app.database import get_async_db
+from backend.app.repositories.list import AsyncListRepository, ListRepository
 from backend.app.schemas import ListCreate, ListModel
+from backend.app.write_dispatcher import WriteQueueFull, write_dispatcher
 
 router = APIRouter()
 
 
 @router.get("/getAll", response_model=TypedList[ListModel])
-def get_lists(db: Session = Depends(get_db)):
-    return ListRepository.get_all(db)
+async def get_lists(db: AsyncSession = Depends(get_async_db)):
+    return await AsyncListRepository.get_all(db)
 
 
 @router.get("/{list_id}", response_model=ListModel)
-def get_list(list_id: int, db: Session = Depends(get_db)):
-    list_ = ListRepository.get_by_id(db, list_id)
+async def get_list(list_id: int, db: AsyncSession = Depends(get_async_db)):
+    list_ = await AsyncListRepository.get_by_id(db, list_id)
     if not list_:
         raise HTTPException(status_code=404, detail="List not found")
     return list_
 
 
 @router.post("/create", response_model=ListModel)
-def create_list(list_create: ListCreate, db: Session = Depends(get_db)):
+def create_list(list_create: ListCreate):
     try:
-        return ListRepository.create(db, list_create)
+        return write_dispatcher.submit(
+            ListRepository.create, list_create, groupable=True
+        )
+    except WriteQueueFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.put("/{list_id}", response_model=ListModel)
-def update_list(list_id: int, list_data: ListCreate, db: Session = Depends(get_db)):
+def update_list(list_id: int, list_data: ListCreate):
     try:
-        return ListRepository.update(db, list_id, list_data)
+        return write_dispatcher.submit(
+            ListRepository.update, list_id, list_data, groupable=True
+        )
+    except WriteQueueFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/{list_id}", response_model=ListModel)
-def delete_list(list_id: int, db: Session = Depends(get_db)):
+def delete_list(list_id: int):
     try:
-        return ListRepository.delete(db, list_id)
+        return write_dispatcher.submit(ListRepository.delete, list_id, groupable=True)
+    except WriteQueueFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/getAll/withCount", response_model=TypedList[dict])
-def get_lists_with_count(db: Session = Depends(get_db)):
-    return ListRepository.get_with_manga_count(db)
+async def get_lists_with_count(
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="All lists if omitted"),
+    sort: str = Query("name", pattern="^(name|count)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Lists with their number of mangas (``mangaCount``) and volumes
+    (``volumeCount``), sorted by name or manga count."""
+    return await AsyncListRepository.get_with_manga_count(
+        db, skip=skip, limit=limit, sort=sort, descending=order == "desc"
+    )
@@ -1,12 +1,31 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from backend.app.api import deps
-from backend.app.database import get_db
-from backend.app.repositories import MangaRepository
-from backend.app.schemas import Manga, MangaCreate
+from backend.app.database import get_async_db, get_db
+from backend.app.repositories import AsyncMangaRepository, MangaRepository
+from backend.app.repositories.manga import StaleCursor
+from backend.app.repositories.similarity import DUPLICATE_THRESHOLD
+from backend.app.schemas import (
+    Category,
+    ImportResponse,
+    Manga,
+    MangaCreate,
+    MangaFacets,
+    MangaFilters,
+    MangaSearchResult,
+    MangaSummary,
+    MangaView,
+    NextMissingVolume,
+    OverallStatus,
+    ReadingStatus,
+    SimilarMatch,
+    VolumeGap,
+)
+from backend.app.write_dispatcher import WriteQueueFull, write_dispatcher
 
 router = APIRouter()
 
@@ -17,55 +36,214 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(deps.get_current_active_superuser)],
 )
-def create_manga(manga: MangaCreate, db: Session = Depends(get_db)):
+def create_manga(manga: MangaCreate, response: Response, db: Session = Depends(get_db)):
+    """
+    Titles resembling the new one (e.g. differing only in case or by a typo)
+    are listed by id in the ``X-Possible-Duplicates`` header.
+    """
     db_manga = MangaRepository.get_by_title(
         db, title=manga.title, language=manga.language
     )
     if db_manga:
         raise HTTPException(status_code=400, detail="Manga already exists")
-    return MangaRepository.create(db, manga)
+    similar = MangaRepository.find_similar(
+        db, manga.title, threshold=DUPLICATE_THRESHOLD
+    )
+    created = write_dispatcher.submit(MangaRepository.create, manga, groupable=True)
+    if similar:
+        response.headers["X-Possible-Duplicates"] = ",".join(
+            str(match.id) for match in similar
+        )
+    return created
 
 
 @router.post(
     "/create-list",
-    response_model=List[Manga],
+    response_model=ImportResponse,
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(deps.get_current_active_superuser)],
 )
-def create_manga_list(mangas: List[MangaCreate], db: Session = Depends(get_db)):
+def create_manga_list(mangas: List[MangaCreate]):
+    """Create many mangas in one transaction and report the outcome per item."""
     try:
-        return MangaRepository.create_batch(db, mangas)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        return write_dispatcher.submit(MangaRepository.create_batch, mangas)
+    except WriteQueueFull:
+        raise
     except Exception:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
 
+# Read routes are async and run on an AsyncSession, so slow clients do not
+# hold one of the threadpool's workers. Writes stay synchronous and go through
+# the single writer thread.
+#
+# List routes return full mangas by default, or the slim projection with
+# ``view=summary``.
+MangaListResponse = Union[List[Manga], List[MangaSummary]]
+VIEW_QUERY = Query(
+    MangaView.full, description="'summary' returns the slim card projection"
+)
+SEARCH_QUERY = Query(
+    None,
+    description="Full-text search over title, Japanese title, summary, "
+    "authors and genres. Supports author:, genre:, list:, status:, lang:, "
+    'rating>=4, volumes>10, "quoted phrases" and -negation',
+)
+
+
+def manga_filters(
+    category: List[Category] = Query([]),
+    reading_status: List[ReadingStatus] = Query([]),
+    overall_status: List[OverallStatus] = Query([]),
+    language: List[str] = Query([]),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rating: Optional[float] = Query(None, ge=0, le=5),
+    genre_ids: List[int] = Query([]),
+    author_ids: List[int] = Query([]),
+    list_ids: List[int] = Query([]),
+) -> MangaFilters:
+    """Filters shared by ``/getAll``, ``/facets`` and ``/volume-gaps``;
+    repeat a parameter to match any of several values."""
+    return MangaFilters(
+        category=category,
+        reading_status=reading_status,
+        overall_status=overall_status,
+        language=language,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        genre_ids=genre_ids,
+        author_ids=author_ids,
+        list_ids=list_ids,
+    )
+
+
 @router.get(
     "/getAll",
-    response_model=List[Manga],
-    summary="Get mangas with server-side paging, search and sort",
+    response_model=MangaListResponse,
+    summary="Get mangas with server-side paging, search, filters and sort",
     dependencies=[Depends(deps.get_current_user)],
 )
-def get_mangas(
+async def get_mangas(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    search: Optional[str] = Query(None, description="Search term for title"),
+    search: Optional[str] = SEARCH_QUERY,
     sort: Optional[str] = Query(
         "asc", regex="^(asc|desc)$", description="Sort by title"
     ),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None,
+        description="Opaque cursor from the X-Next-Cursor header of the "
+        "previous page; replaces skip",
+    ),
+    view: MangaView = VIEW_QUERY,
+    filters: MangaFilters = Depends(manga_filters),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Liefert eine paginierte Liste von Mangas zurück. Optional können
-    Suchbegriff (title LIKE) und Sortierreihenfolge angegeben werden.
+    Suchbegriff (Volltextsuche, nach Relevanz sortiert), Filter und
+    Sortierreihenfolge angegeben werden. Der Cursor für die nächste Seite
+    steht im Header ``X-Next-Cursor``.
     """
     try:
-        return MangaRepository.get_all(
-            db, skip=skip, limit=limit, search=search, sort=sort
+        mangas, next_cursor = await AsyncMangaRepository.get_page(
+            db,
+            skip=skip,
+            limit=limit,
+            search=search,
+            sort=sort,
+            cursor=cursor,
+            view=view,
+            filters=filters,
         )  # Implementierung in Repository
+    except StaleCursor as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to fetch mangas")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return mangas
+
+
+@router.get(
+    "/facets",
+    response_model=MangaFacets,
+    summary="Counts per filter value for the current search and filters",
+    dependencies=[Depends(deps.get_current_user)],
+)
+async def get_manga_facets(
+    search: Optional[str] = SEARCH_QUERY,
+    filters: MangaFilters = Depends(manga_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Each facet is counted with all other filters applied but not its own, so
+    the counts show what selecting another value of that facet would return.
+    """
+    try:
+        return await AsyncMangaRepository.get_facets(db, search, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to count facets")
+
+
+@router.get(
+    "/volume-gaps",
+    response_model=List[VolumeGap],
+    summary="Missing volumes across the collection, largest gaps first",
+    dependencies=[Depends(deps.get_current_user)],
+)
+async def get_volume_gaps(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    filters: MangaFilters = Depends(manga_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Gaps between owned whole volumes (and before the first one) of every
+    manga matching the filters, e.g. ``list_ids``, ``language`` and
+    ``overall_status``. Volumes after the highest owned one are not known to
+    be missing and are not reported.
+    """
+    return await AsyncMangaRepository.get_volume_gaps(db, filters, skip, limit)
+
+
+@router.get(
+    "/similar",
+    response_model=List[SimilarMatch],
+    summary="Titles resembling the given one, tolerant of typos and case",
+    dependencies=[Depends(deps.get_current_user)],
+)
+async def get_similar_mangas(
+    title: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        return await AsyncMangaRepository.find_similar(db, title, limit=limit)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to find similar mangas")
+
+
+@router.get(
+    "/search",
+    response_model=List[MangaSearchResult],
+    summary="Ranked full-text search with highlighted snippets",
+    dependencies=[Depends(deps.get_current_user)],
+)
+async def search_mangas(
+    q: str = Query(..., min_length=1, description="Search term"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        return await AsyncMangaRepository.search(db, q, limit=limit)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to search mangas")
 
 
 @router.get(
@@ -73,9 +251,9 @@ def get_mangas(
     response_model=Manga,
     dependencies=[Depends(deps.get_current_user)],
 )
-def get_manga_by_id(manga_id: int, db: Session = Depends(get_db)):
+async def get_manga_by_id(manga_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_manga = MangaRepository.get_by_id(db, manga_id=manga_id)
+        db_manga = await AsyncMangaRepository.get_by_id(db, manga_id=manga_id)
         if db_manga is None:
             raise HTTPException(status_code=404, detail="Manga not found")
         return db_manga
@@ -83,38 +261,63 @@ def get_manga_by_id(manga_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to fetch manga by ID")
 
 
+@router.get(
+    "/{manga_id}/volumes/next-missing",
+    response_model=NextMissingVolume,
+    summary="Lowest whole volume number the manga does not have",
+    dependencies=[Depends(deps.get_current_user)],
+)
+async def get_next_missing_volume(
+    manga_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    next_missing = await AsyncMangaRepository.get_next_missing_volume(db, manga_id)
+    if next_missing is None:
+        raise HTTPException(status_code=404, detail="Manga not found")
+    return next_missing
+
+
 @router.get(
     "/by-genre/{genre_id}",
-    response_model=List[Manga],
+    response_model=MangaListResponse,
     dependencies=[Depends(deps.get_current_user)],
 )
-def get_mangas_by_genre(genre_id: int, db: Session = Depends(get_db)):
+async def get_mangas_by_genre(
+    genre_id: int,
+    view: MangaView = VIEW_QUERY,
+    db: AsyncSession = Depends(get_async_db),
+):
     try:
-        return MangaRepository.get_by_genre(db, genre_id)
+        return await AsyncMangaRepository.get_by_genre(db, genre_id, view=view)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to fetch mangas by genre")
 
 
 @router.get(
     "/by-author/{author_id}",
-    response_model=List[Manga],
+    response_model=MangaListResponse,
     dependencies=[Depends(deps.get_current_user)],
 )
-def get_mangas_by_author(author_id: int, db: Session = Depends(get_db)):
+async def get_mangas_by_author(
+    author_id: int,
+    view: MangaView = VIEW_QUERY,
+    db: AsyncSession = Depends(get_async_db),
+):
     try:
-        return MangaRepository.get_by_author(db, author_id)
+        return await AsyncMangaRepository.get_by_author(db, author_id, view=view)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to fetch mangas by author")
 
 
 @router.get(
     "/by-list/{list_id}",
-    response_model=List[Manga],
+    response_model=MangaListResponse,
     dependencies=[Depends(deps.get_current_user)],
 )
-def get_mangas_by_list(list_id: int, db: Session = Depends(get_db)):
+async def get_mangas_by_list(
+    list_id: int, view: MangaView = VIEW_QUERY, db: AsyncSession = Depends(get_async_db)
+):
     try:
-        return MangaRepository.get_by_list(db, list_id)
+        return await AsyncMangaRepository.get_by_list(db, list_id, view=view)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to fetch mangas by list")
 
@@ -124,9 +327,11 @@ def get_mangas_by_list(list_id: int, db: Session = Depends(get_db)):
     response_model=List[Manga],
     dependencies=[Depends(deps.get_current_user)],
 )
-def get_mangas_by_star_rating(rating: float, db: Session = Depends(get_db)):
+async def get_mangas_by_star_rating(
+    rating: float, db: AsyncSession = Depends(get_async_db)
+):
     try:
-        return MangaRepository.get_by_star_rating(db, rating)
+        return await AsyncMangaRepository.get_by_star_rating(db, rating)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to fetch mangas by rating")
 
@@ -141,9 +346,13 @@ def update_manga(manga: Manga, db: Session = Depends(get_db)):
         db_manga = MangaRepository.get_by_id(db, manga.id)
         if db_manga is None:
             raise HTTPException(status_code=404, detail="Manga not found")
-        return MangaRepository.update(db, manga_data=manga)
+        return write_dispatcher.submit(
+            MangaRepository.update, manga_data=manga, groupable=True
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except WriteQueueFull:
+        raise
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to update manga")
 
@@ -158,6 +367,10 @@ def delete_manga(manga_id: int, db: Session = Depends(get_db)):
         db_manga = MangaRepository.get_by_id(db, manga_id=manga_id)
         if db_manga is None:
             raise HTTPException(status_code=404, detail="Manga not found")
-        return MangaRepository.delete(db, manga_id=manga_id)
+        return write_dispatcher.submit(
+            MangaRepository.delete, manga_id=manga_id, groupable=True
+        )
+    except WriteQueueFull:
+        raise
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to delete manga")
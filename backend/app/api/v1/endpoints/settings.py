@@ -3,22 +3,73 @@ import shutil
 import sys
 
 from fastapi import APIRouter, BackgroundTasks, HTTPException
-from sqlalchemy import create_engine
+from fastapi.concurrency import run_in_threadpool
 
-from backend.app.database import SessionLocal
+from backend.app import database
+from backend.app.background import background_work_paused
+from backend.app.cache import response_cache
+from backend.app.migrations import upgrade_database
 from backend.config import load_config, save_config
 
 router = APIRouter()
 
-
-def update_database_engine(new_path: str):
-    """Update the database engine with a new path"""
-    global engine
-    new_url = f"sqlite:///{new_path}"
-    new_engine = create_engine(new_url, connect_args={"check_same_thread": False})
-    engine.dispose()  # Close all connections
-    engine = new_engine
-    SessionLocal.configure(bind=engine)
+# SQLite files next to a database in WAL mode
+_SIDECAR_SUFFIXES = ("-wal", "-shm")
+
+
+def _move_database_file(old_path: str, new_path: str) -> None:
+    """Move a closed database to ``new_path`` with its write-ahead log, if any
+    is left after the checkpoint. A log already at the target belongs to
+    another database and would be replayed onto this one."""
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    for suffix in _SIDECAR_SUFFIXES:
+        if os.path.exists(new_path + suffix):
+            os.remove(new_path + suffix)
+    shutil.copy2(old_path, new_path)
+    if os.path.exists(old_path + "-wal"):
+        shutil.copy2(old_path + "-wal", new_path + "-wal")
+    os.remove(old_path)
+    for suffix in _SIDECAR_SUFFIXES:
+        if os.path.exists(old_path + suffix):
+            os.remove(old_path + suffix)
+
+
+async def _switch_database(old_path: str, new_path: str, migrate: bool) -> None:
+    """Close the current database, optionally move it, and rebind the
+    engines to ``new_path``, bringing its schema up to date. Background
+    writes wait meanwhile; one landing between the checkpoint and the move
+    would go to the old file."""
+    async with background_work_paused():
+        # Commits still in the WAL must reach the main file before it is copied
+        await run_in_threadpool(database.checkpoint_wal, database.engine, "TRUNCATE")
+        await run_in_threadpool(database.engine.dispose)
+        await database.async_engine.dispose()
+        if migrate:
+            try:
+                await run_in_threadpool(_move_database_file, old_path, new_path)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500, detail=f"Failed to migrate database: {str(e)}"
+                )
+        database.rebind_engines(f"sqlite:///{new_path}")
+        # A new path starts out empty, a moved database may be older
+        await run_in_threadpool(upgrade_database, database.engine)
+        response_cache.clear()
+
+
+def _move_images(old_path: str, new_path: str) -> None:
+    # Create new images directory
+    os.makedirs(new_path, exist_ok=True)
+    # Copy all files and subdirectories
+    for item in os.listdir(old_path):
+        s = os.path.join(old_path, item)
+        d = os.path.join(new_path, item)
+        if os.path.isdir(s):
+            shutil.copytree(s, d, dirs_exist_ok=True)
+        else:
+            shutil.copy2(s, d)
+    # Delete the old images directory
+    shutil.rmtree(old_path)
 
 
 @router.get("/getAll")
@@ -35,7 +86,7 @@ def get_setting(key: str):
 
 
 @router.post("/{key}")
-def create_or_update_setting(
+async def create_or_update_setting(
     key: str,
     value: str,
     migrate: bool = False,
@@ -56,24 +107,11 @@ def create_or_update_setting(
 
     # Handle database path change
     if key == "database_path" and old_value and old_value != value:
-        if migrate:
-            if not os.path.exists(old_value):
-                raise HTTPException(
-                    status_code=404, detail="Source database file not found"
-                )
-            try:
-                # Create parent directory if it doesn't exist
-                os.makedirs(os.path.dirname(value), exist_ok=True)
-                # Copy the database file
-                shutil.copy2(old_value, value)
-                # Delete the old database file
-                os.remove(old_value)
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500, detail=f"Failed to migrate database: {str(e)}"
-                )
-        # Update the database engine
-        update_database_engine(value)
+        if migrate and not os.path.exists(old_value):
+            raise HTTPException(
+                status_code=404, detail="Source database file not found"
+            )
+        await _switch_database(old_value, value, migrate)
 
     # Handle image path change
     elif key == "image_path" and old_value and old_value != value:
@@ -83,18 +121,9 @@ def create_or_update_setting(
                     status_code=404, detail="Source images directory not found"
                 )
             try:
-                # Create new images directory
-                os.makedirs(value, exist_ok=True)
-                # Copy all files and subdirectories
-                for item in os.listdir(old_value):
-                    s = os.path.join(old_value, item)
-                    d = os.path.join(value, item)
-                    if os.path.isdir(s):
-                        shutil.copytree(s, d, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(s, d)
-                # Delete the old images directory
-                shutil.rmtree(old_value)
+                # Thumbnails and cover downloads write into the old directory
+                async with background_work_paused():
+                    await run_in_threadpool(_move_images, old_value, value)
             except Exception as e:
                 raise HTTPException(
                     status_code=500, detail=f"Failed to migrate images: {str(e)}"
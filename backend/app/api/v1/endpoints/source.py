@@ -5,8 +5,10 @@ from sqlalchemy.orm import Session
 
 from backend.app.database import get_db
 from backend.app.handlers.factory import HandlerFactory
+from backend.app.repositories.base import RepositoryError
 from backend.app.repositories.source import SourceRepository
 from backend.app.schemas import MangaCreate, Source, SourceCreate
+from backend.app.write_dispatcher import WriteQueueFull, write_dispatcher
 
 router = APIRouter()
 
@@ -22,7 +24,12 @@ def create_source(source: SourceCreate, db: Session = Depends(get_db)):
     db_source = SourceRepository.get_by_name(db, name=source.name)
     if db_source:
         raise HTTPException(status_code=400, detail="Source already exists")
-    return SourceRepository.create(db, source)
+    try:
+        return write_dispatcher.submit(SourceRepository.create, source, groupable=True)
+    except WriteQueueFull:
+        raise
+    except RepositoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/search", response_model=List[MangaCreate])
@@ -1,13 +1,36 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.database import get_db
-from backend.app.repositories.statistics import StatisticsRepository
+from backend.app.cache import get_data_generation_async, response_cache
+from backend.app.database import get_async_db
+from backend.app.repositories.statistics import AsyncStatisticsRepository
 from backend.app.schemas import Statistics
 
 router = APIRouter()
 
 
 @router.get("/", response_model=Statistics)
-def get_statistics(db: Session = Depends(get_db)):
-    return StatisticsRepository.get_statistics(db)
+async def get_statistics(
+    request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Statistics only change when library data does, so they are cached per data
+    generation and tagged with it: clients revalidating with ``If-None-Match``
+    get an empty 304 while nothing was written.
+    """
+    generation = await get_data_generation_async(db)
+    etag = f'"statistics-{generation}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ):
+        return Response(status_code=304, headers=headers)
+
+    statistics = response_cache.get("statistics", generation)
+    if statistics is None:
+        statistics = await AsyncStatisticsRepository.get_statistics(db)
+        response_cache.set("statistics", generation, statistics)
+    response.headers.update(headers)
+    return statistics
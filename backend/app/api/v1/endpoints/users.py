@@ -1,13 +1,13 @@
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 
 from backend.app.api import deps
-from backend.app.database import get_db
+from backend.app.core.security import get_password_hash
 from backend.app.models import User
 from backend.app.repositories import UserRepository
 from backend.app.schemas import UserUpdatePassword
+from backend.app.write_dispatcher import write_dispatcher
 
 router = APIRouter()
 
@@ -15,18 +15,22 @@ router = APIRouter()
 @router.post("/change-password", response_model=Any)
 def change_password(
     user_update: UserUpdatePassword,
-    db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Change password for a user. Only accessible by admin.
     """
-    user = UserRepository.get_by_username(db, username=user_update.username)
-    if not user:
+    # Hashed here: hashing is slow on purpose and would hold up the writer
+    hashed_password = get_password_hash(user_update.password)
+    updated = write_dispatcher.submit(
+        UserRepository.set_password_hash,
+        user_update.username,
+        hashed_password,
+        groupable=True,
+    )
+    if not updated:
         raise HTTPException(
             status_code=404,
             detail="User not found",
         )
-
-    UserRepository.update_password(db, user, user_update.password)
     return {"message": "Password updated successfully"}
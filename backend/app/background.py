@@ -0,0 +1,28 @@
+"""The background workers that write to the database or the image directory:
+the write dispatcher, cover downloads and thumbnails."""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.app.cover_downloads import cover_downloader
+from backend.app.thumbnails import thumbnail_worker
+from backend.app.write_dispatcher import write_dispatcher
+
+
+@asynccontextmanager
+async def background_work_paused() -> AsyncIterator[None]:
+    """Hold back queued writes, cover downloads and thumbnails while the
+    database or the images are copied, moved or replaced. Work in progress
+    finishes first; downloads go first as they end in a write."""
+    gates = (cover_downloader.gate, thumbnail_worker.gate, write_dispatcher.gate)
+    paused = []
+    try:
+        for gate in gates:
+            await run_in_threadpool(gate.pause)
+            paused.append(gate)
+        yield
+    finally:
+        for gate in reversed(paused):
+            gate.resume()
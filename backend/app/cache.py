@@ -0,0 +1,65 @@
+"""In-process response caches invalidated by the database's data generation.
+
+Every write to the library tables bumps a counter in the database (see
+``ddl.DATA_GENERATION_TABLE``). A cached value is stored together with the
+generation it was computed at and is only served while the database still
+reports that generation, so there is nothing to invalidate explicitly and
+caches in different server processes stay correct.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.app.ddl import DATA_GENERATION_TABLE
+
+_generation = table(DATA_GENERATION_TABLE, column("epoch"), column("generation"))
+
+_DATA_GENERATION = select(_generation.c.epoch, _generation.c.generation)
+
+
+def _format(row) -> str:
+    return f"{row.epoch}-{row.generation}" if row else "0"
+
+
+def get_data_generation(db: Session) -> str:
+    """Opaque version string of the library data."""
+    return _format(db.execute(_DATA_GENERATION).first())
+
+
+async def get_data_generation_async(db: AsyncSession) -> str:
+    return _format((await db.execute(_DATA_GENERATION)).first())
+
+
+class VersionedCache:
+    """Keeps the latest value per key together with the data generation it
+    belongs to.
+
+    Read the generation *before* computing a value: a write landing in
+    between then only makes the cached value newer than its key, never older.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, generation: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] != generation:
+            return None
+        return entry[1]
+
+    def set(self, key: str, generation: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (generation, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = VersionedCache()
@@ -0,0 +1,183 @@
+"""Background downloads of cover images given as URLs.
+
+Creating a manga with a cover URL stores it as ``cover_url`` with
+``cover_status`` pending and returns right away; the image is fetched here
+by a small pool of worker threads sharing one HTTP session (connection reuse,
+timeouts, retries with backoff). The result is written through the write
+dispatcher: the content-addressed name and ``ready``, or ``failed``.
+Downloads still pending when the server stopped are queued again on startup.
+"""
+
+import logging
+import os
+import queue
+import threading
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend.app import images, settings
+from backend.app.pausing import PauseGate
+from backend.app.thumbnails import thumbnail_worker
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 4
+MAX_QUEUE_SIZE = 1024
+# Seconds to connect and between bytes read
+TIMEOUT = (5, 20)
+CHUNK_SIZE = 64 * 1024
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET",),
+)
+
+# Tells a worker thread to exit
+_STOP = object()
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=WORKERS, pool_maxsize=WORKERS, max_retries=RETRY
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "MyMangaDB cover downloader"
+    if os.getenv("DISABLE_SSL_VERIFY", "false").lower() == "true":
+        import urllib3
+
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        session.verify = False
+    return session
+
+
+def fetch(session: requests.Session, url: str) -> str:
+    """Download ``url`` into the image store and return the image name.
+
+    The body is streamed to disk chunk by chunk, so memory stays bounded no
+    matter how many downloads run. Bodies over ``images.MAX_IMAGE_BYTES`` and
+    anything that does not start like an image are cut off early.
+    """
+    with session.get(url, timeout=TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        max_bytes = images.MAX_IMAGE_BYTES
+        length = response.headers.get("Content-Length", "")
+        if length.isdigit() and int(length) > max_bytes:
+            raise images.ImageTooLarge(f"Cover is {length} bytes")
+        with images.ImageWriter(settings.IMAGE_SAVE_PATH, max_bytes) as writer:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                writer.write(chunk)
+            return writer.commit()
+
+
+class CoverDownloader:
+    def __init__(self, workers: int = WORKERS, max_queue_size: int = MAX_QUEUE_SIZE):
+        self.workers = workers
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._session: Optional[requests.Session] = None
+        # Paused while the database or the image directory is replaced
+        self.gate = PauseGate()
+
+    def submit(self, manga_id: int, url: str) -> bool:
+        """Queue the cover download of a manga. Returns False if the queue is
+        full; the manga then stays pending until ``requeue_pending``."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((manga_id, url))
+        except queue.Full:
+            logger.warning(
+                "Cover download queue full, manga %d stays pending", manga_id
+            )
+            return False
+        return True
+
+    def requeue_pending(self) -> int:
+        """Queue every manga whose cover download did not finish."""
+        from backend.app import database
+        from backend.app.repositories.manga import MangaRepository
+
+        db = database.SessionLocal()
+        try:
+            pending = MangaRepository.get_pending_covers(db)
+        finally:
+            db.close()
+        queued = sum(self.submit(manga_id, url) for manga_id, url in pending)
+        if queued:
+            logger.info("Queued %d pending cover downloads", queued)
+        return queued
+
+    def join(self) -> None:
+        """Wait until everything queued so far is done."""
+        self._queue.join()
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Stop after the downloads in progress. Queued ones are dropped; they
+        are still pending and queued again on the next start."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            if self._session is None:
+                self._session = _new_session()
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"cover-download-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                with self.gate.working():
+                    self._download(*item)
+            except Exception:
+                logger.exception("Cover download of manga %d failed", item[0])
+            finally:
+                self._queue.task_done()
+
+    def _download(self, manga_id: int, url: str) -> None:
+        from backend.app.repositories.manga import MangaRepository
+        from backend.app.write_dispatcher import write_dispatcher
+
+        try:
+            name = fetch(self._session, url)
+        except (requests.RequestException, images.InvalidImage) as e:
+            logger.warning("Failed to download cover image %s: %s", url, e)
+            name = None
+        except Exception:
+            # Disk full, permissions, ...: record it, or the manga stays
+            # pending and is retried on every start
+            logger.exception("Failed to store cover image %s", url)
+            name = None
+        write_dispatcher.submit(
+            MangaRepository.set_downloaded_cover, manga_id, url, name, groupable=True
+        )
+        if name is not None:
+            thumbnail_worker.submit(settings.IMAGE_SAVE_PATH, name)
+
+
+cover_downloader = CoverDownloader()
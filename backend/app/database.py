@@ -1,10 +1,16 @@
+import logging
 import os
+import re
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from ..config import DATABASE_PATH
+from ..config import DATABASE_PATH, SQLITE_PRAGMAS
+
+logger = logging.getLogger(__name__)
 
 docker_mode_value = os.getenv("DOCKER_MODE", "")
 DOCKER_MODE = docker_mode_value.lower() == "true"
@@ -14,18 +20,103 @@ if DOCKER_MODE:
 else:
     SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Pragma values end up inside the SQL text (PRAGMA does not accept bound
+# parameters), so only plain integers and keywords are accepted.
+_PRAGMA_VALUE_PATTERN = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            if not _PRAGMA_VALUE_PATTERN.match(str(value)):
+                logger.warning("Ignoring invalid value for PRAGMA %s: %r", name, value)
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(url: str, **kwargs):
+    """Create an engine for ``url`` that applies :data:`SQLITE_PRAGMAS` to
+    every new DBAPI connection."""
+    connect_args = {"check_same_thread": False}
+    connect_args.update(kwargs.pop("connect_args", {}))
+    new_engine = create_engine(url, connect_args=connect_args, **kwargs)
+    event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+def create_async_sqlite_engine(url: str, **kwargs):
+    """Async counterpart of :func:`create_sqlite_engine` on top of aiosqlite.
+    ``url`` may name the plain ``sqlite`` driver; it is switched to
+    ``sqlite+aiosqlite``."""
+    async_url = make_url(url).set(drivername="sqlite+aiosqlite")
+    new_engine = create_async_engine(async_url, **kwargs)
+    # Pool events live on the sync engine the async one wraps
+    event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+def get_effective_pragmas(target_engine) -> dict:
+    """Read back the pragmas as SQLite actually applied them."""
+    with target_engine.connect() as connection:
+        return {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in SQLITE_PRAGMAS
+        }
+
+
+def log_sqlite_pragmas(target_engine) -> None:
+    pragmas = get_effective_pragmas(target_engine)
+    logger.info(
+        "SQLite pragmas: %s",
+        ", ".join(f"{name}={value}" for name, value in pragmas.items()),
+    )
+
+
+def checkpoint_wal(target_engine, mode: str = "TRUNCATE") -> None:
+    """Fold the write-ahead log back into the main database file so it can be
+    copied on its own (export, backup, moving the database)."""
+    with target_engine.connect() as connection:
+        connection.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})")
+
+
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by read-heavy async endpoints. aiosqlite runs each connection in its
+# own thread, so waiting on SQLite does not tie up the request threadpool.
+async_engine = create_async_sqlite_engine(SQLALCHEMY_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
+def rebind_engines(url: str) -> None:
+    """Point ``engine``, ``async_engine`` and both session factories at
+    ``url``, e.g. after the database file moved. The old engines must have
+    been disposed. Modules should look the engines up here on use rather than
+    import them."""
+    global engine, async_engine
+    engine = create_sqlite_engine(url)
+    async_engine = create_async_sqlite_engine(url)
+    SessionLocal.configure(bind=engine)
+    AsyncSessionLocal.configure(bind=async_engine)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,612 @@
+"""SQLite objects that live next to the ORM tables but cannot be expressed by
+``Base.metadata``: virtual tables, denormalized counters and the triggers that
+keep them in sync.
+
+They are installed from the ``after_create`` hook of the metadata, so both a
+fresh database and ``create_all`` against an existing one pick them up.
+"""
+
+import logging
+from typing import List, Tuple
+
+from backend.app.normalize import search_key, sort_key
+
+logger = logging.getLogger(__name__)
+
+# Full-text index over mangas. ``rowid`` is the manga id; author and genre
+# names are denormalized into space-separated columns so one MATCH covers them.
+MANGA_FTS_TABLE = "manga_fts"
+
+# Column weights for bm25(), in the column order of the FTS table.
+MANGA_FTS_WEIGHTS = (10.0, 5.0, 1.0, 3.0, 2.0)
+
+_MANGA_FTS_CREATE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {MANGA_FTS_TABLE} USING fts5(
+    title, japanese_title, summary, authors, genres,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+_MANGA_FTS_ROWS = """
+SELECT m.id, m.title, m.japanese_title, m.summary,
+    (SELECT group_concat(a.name, ' ') FROM authors a
+        JOIN manga_author ma ON ma.author_id = a.id WHERE ma.manga_id = m.id),
+    (SELECT group_concat(g.name, ' ') FROM genres g
+        JOIN manga_genre mg ON mg.genre_id = g.id WHERE mg.manga_id = m.id)
+FROM mangas m
+"""
+
+
+def _refresh_fts_statements(manga_ids: str) -> List[str]:
+    """SQL that re-indexes the mangas selected by the ``manga_ids`` subquery."""
+    return [
+        f"DELETE FROM {MANGA_FTS_TABLE} WHERE rowid IN ({manga_ids})",
+        f"""INSERT INTO {MANGA_FTS_TABLE}
+        (rowid, title, japanese_title, summary, authors, genres)
+        {_MANGA_FTS_ROWS} WHERE m.id IN ({manga_ids})""",
+    ]
+
+
+def _refresh_fts_rows(manga_ids: str) -> str:
+    """``_refresh_fts_statements`` as a trigger body."""
+    return "".join(
+        f"{statement};\n" for statement in _refresh_fts_statements(manga_ids)
+    )
+
+
+# Mangas whose FTS row is out of date. Writing a manga and its N author and
+# genre links would otherwise rebuild its FTS row N + 1 times; the triggers
+# only mark it here and ``refresh_fulltext_index`` rebuilds every marked row
+# once, after the links are written. Renaming an author or genre still
+# re-indexes its mangas right away.
+MANGA_FTS_STALE_TABLE = "manga_fts_stale"
+
+_MANGA_FTS_STALE_CREATE = f"""
+CREATE TABLE IF NOT EXISTS {MANGA_FTS_STALE_TABLE} (manga_id INTEGER PRIMARY KEY)
+"""
+
+
+def _mark_stale(manga_id: str) -> str:
+    return (
+        f"INSERT OR IGNORE INTO {MANGA_FTS_STALE_TABLE} (manga_id) "
+        f"VALUES ({manga_id});"
+    )
+
+
+_MANGA_FTS_TRIGGERS = {
+    "manga_fts_manga_insert": f"""
+        AFTER INSERT ON mangas BEGIN
+        {_mark_stale("new.id")}
+        END""",
+    "manga_fts_manga_update": f"""
+        AFTER UPDATE OF title, japanese_title, summary ON mangas BEGIN
+        {_mark_stale("new.id")}
+        END""",
+    "manga_fts_manga_delete": f"""
+        AFTER DELETE ON mangas BEGIN
+        DELETE FROM {MANGA_FTS_TABLE} WHERE rowid = old.id;
+        DELETE FROM {MANGA_FTS_STALE_TABLE} WHERE manga_id = old.id;
+        END""",
+    "manga_fts_author_link": f"""
+        AFTER INSERT ON manga_author BEGIN
+        {_mark_stale("new.manga_id")}
+        END""",
+    "manga_fts_author_unlink": f"""
+        AFTER DELETE ON manga_author BEGIN
+        {_mark_stale("old.manga_id")}
+        END""",
+    "manga_fts_genre_link": f"""
+        AFTER INSERT ON manga_genre BEGIN
+        {_mark_stale("new.manga_id")}
+        END""",
+    "manga_fts_genre_unlink": f"""
+        AFTER DELETE ON manga_genre BEGIN
+        {_mark_stale("old.manga_id")}
+        END""",
+    "manga_fts_author_rename": f"""
+        AFTER UPDATE OF name ON authors BEGIN
+        {_refresh_fts_rows(
+            "SELECT manga_id FROM manga_author WHERE author_id = new.id")}
+        END""",
+    "manga_fts_genre_rename": f"""
+        AFTER UPDATE OF name ON genres BEGIN
+        {_refresh_fts_rows(
+            "SELECT manga_id FROM manga_genre WHERE genre_id = new.id")}
+        END""",
+}
+
+
+# Trigram indexes over manga titles and author names for typo tolerant lookups.
+# They are external-content FTS5 tables: only the index is stored, the text
+# stays in the source table. Maps index table -> (source table, column). Each
+# has an fts5vocab table ``<index>_vocab`` with the document count per trigram.
+MANGA_TITLE_TRIGRAMS = "manga_title_trigrams"
+AUTHOR_NAME_TRIGRAMS = "author_name_trigrams"
+TRIGRAM_INDEXES = {
+    MANGA_TITLE_TRIGRAMS: ("mangas", "title"),
+    AUTHOR_NAME_TRIGRAMS: ("authors", "name"),
+}
+
+
+def _trigram_triggers(index: str, table: str, column: str) -> dict:
+    insert = f"INSERT INTO {index} (rowid, {column}) VALUES (new.id, new.{column});"
+    delete = (
+        f"INSERT INTO {index} ({index}, rowid, {column}) "
+        f"VALUES ('delete', old.id, old.{column});"
+    )
+    return {
+        f"{index}_insert": f"AFTER INSERT ON {table} BEGIN {insert} END",
+        f"{index}_update": (
+            f"AFTER UPDATE OF {column} ON {table} BEGIN {delete} {insert} END"
+        ),
+        f"{index}_delete": f"AFTER DELETE ON {table} BEGIN {delete} END",
+    }
+
+
+_TRIGRAM_TRIGGERS = {
+    name: body
+    for index, (table, column) in TRIGRAM_INDEXES.items()
+    for name, body in _trigram_triggers(index, table, column).items()
+}
+
+
+# ``manga_count`` of authors and genres, maintained by the link tables so a
+# write costs one indexed UPDATE instead of a recount in Python.
+_COUNTED_LINKS = (
+    ("authors", "manga_author", "author_id"),
+    ("genres", "manga_genre", "genre_id"),
+)
+
+
+def _counter_trigger(table: str, link: str, column: str, inserted: bool) -> str:
+    row, delta = ("new", "+ 1") if inserted else ("old", "- 1")
+    return f"""
+        AFTER {"INSERT" if inserted else "DELETE"} ON {link} BEGIN
+        UPDATE {table} SET manga_count = coalesce(manga_count, 0) {delta}
+            WHERE id = {row}.{column};
+        END"""
+
+
+_COUNTER_TRIGGERS = {
+    f"{link}_count_{'insert' if inserted else 'delete'}": _counter_trigger(
+        table, link, column, inserted
+    )
+    for table, link, column in _COUNTED_LINKS
+    for inserted in (True, False)
+}
+
+
+# ``images.refcount``: references to each stored image from the cover columns,
+# so an image file can be removed once the last one is gone (see images.py).
+# The row is created by the first reference.
+_IMAGE_REFERENCES = ("mangas", "volumes")
+
+
+def _image_reference(row: str, delta: str) -> str:
+    name = f"{row}.cover_image"
+    created = (
+        f"INSERT OR IGNORE INTO images (name) SELECT {name} WHERE {name} != '';"
+        if delta == "+ 1"
+        else ""
+    )
+    return f"""
+        {created}
+        UPDATE images SET refcount = refcount {delta} WHERE name = {name};"""
+
+
+_IMAGE_REFCOUNT_TRIGGERS = {
+    **{
+        f"image_refcount_{table}_insert": f"""
+        AFTER INSERT ON {table} BEGIN{_image_reference("new", "+ 1")}
+        END"""
+        for table in _IMAGE_REFERENCES
+    },
+    **{
+        f"image_refcount_{table}_update": f"""
+        AFTER UPDATE OF cover_image ON {table}
+        WHEN old.cover_image IS NOT new.cover_image BEGIN{
+            _image_reference("old", "- 1")}{_image_reference("new", "+ 1")}
+        END"""
+        for table in _IMAGE_REFERENCES
+    },
+    **{
+        f"image_refcount_{table}_delete": f"""
+        AFTER DELETE ON {table} BEGIN{_image_reference("old", "- 1")}
+        END"""
+        for table in _IMAGE_REFERENCES
+    },
+}
+
+
+# Statistics rollup: one row per (dimension, value) with the number of rows
+# having that value, e.g. ("category", "manga", 12) or ("total", "volumes", 80).
+# Triggers keep it current, so the statistics page reads a handful of rows
+# instead of aggregating the whole library. ``value`` has no type affinity and
+# keeps the original value (text, real or NULL).
+STATISTICS_TABLE = "statistics_rollup"
+
+# Distribution dimensions, i.e. the ``mangas`` columns counted per value
+STATISTICS_DIMENSIONS = ("reading_status", "overall_status", "category", "star_rating")
+
+# Tables whose row count is kept under the ``total`` dimension
+_STATISTICS_TOTALS = ("mangas", "volumes", "authors", "genres", "lists")
+
+# Volumes are rows in ``volumes`` plus the lengths of the ``volume_ranges``
+_RANGE_LENGTH = "({row}.last_volume - {row}.first_volume + 1)"
+_VOLUME_TOTAL = (
+    "(SELECT count(*) FROM volumes) + (SELECT coalesce(sum("
+    f"{_RANGE_LENGTH.format(row='volume_ranges')}), 0) FROM volume_ranges)"
+)
+
+_STATISTICS_CREATE = f"""
+CREATE TABLE IF NOT EXISTS {STATISTICS_TABLE} (
+    dimension TEXT NOT NULL,
+    value,
+    count INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def _bump(dimension: str, value: str, delta: str) -> str:
+    """SQL adding ``delta`` to the rollup row of ``dimension`` and ``value``,
+    creating the row first if needed. ``IS`` so NULL values get a row too."""
+    where = f"dimension = '{dimension}' AND value IS {value}"
+    return f"""
+        INSERT INTO {STATISTICS_TABLE} (dimension, value)
+            SELECT '{dimension}', {value}
+            WHERE NOT EXISTS (SELECT 1 FROM {STATISTICS_TABLE} WHERE {where});
+        UPDATE {STATISTICS_TABLE} SET count = count {delta} WHERE {where};"""
+
+
+def _statistics_manga_trigger(event: str) -> str:
+    if event == "UPDATE":
+        on = f"UPDATE OF {', '.join(STATISTICS_DIMENSIONS)} ON mangas"
+        changes = [("old", "- 1"), ("new", "+ 1")]
+    else:
+        on = f"{event} ON mangas"
+        changes = [("new", "+ 1")] if event == "INSERT" else [("old", "- 1")]
+    body = "".join(
+        _bump(dimension, f"{row}.{dimension}", delta)
+        for row, delta in changes
+        for dimension in STATISTICS_DIMENSIONS
+    )
+    if event != "UPDATE":
+        body += _bump("total", "'mangas'", changes[0][1])
+    return f"""
+        AFTER {on} BEGIN{body}
+        END"""
+
+
+def _statistics_total_trigger(table: str, event: str) -> str:
+    delta = "+ 1" if event == "INSERT" else "- 1"
+    return f"""
+        AFTER {event} ON {table} BEGIN{_bump("total", f"'{table}'", delta)}
+        END"""
+
+
+def _statistics_range_trigger(event: str) -> str:
+    changes = {
+        "INSERT": [("new", "+")],
+        "UPDATE": [("old", "-"), ("new", "+")],
+        "DELETE": [("old", "-")],
+    }[event]
+    body = "".join(
+        _bump("total", "'volumes'", f"{sign} {_RANGE_LENGTH.format(row=row)}")
+        for row, sign in changes
+    )
+    return f"""
+        AFTER {event} ON volume_ranges BEGIN{body}
+        END"""
+
+
+_STATISTICS_TRIGGERS = {
+    **{
+        f"statistics_manga_{event.lower()}": _statistics_manga_trigger(event)
+        for event in ("INSERT", "UPDATE", "DELETE")
+    },
+    **{
+        f"statistics_{table}_{event.lower()}": _statistics_total_trigger(table, event)
+        for table in _STATISTICS_TOTALS
+        if table != "mangas"
+        for event in ("INSERT", "DELETE")
+    },
+    **{
+        f"statistics_volume_ranges_{event.lower()}": _statistics_range_trigger(event)
+        for event in ("INSERT", "UPDATE", "DELETE")
+    },
+}
+
+
+# Single-row counter bumped by every write to the library tables. Response
+# caches compare it to decide whether a cached payload is still current; it is
+# read from the database, so all server processes agree on it. ``epoch`` is
+# random per database file, so a generation number is never mistaken for the
+# same one of a different (e.g. freshly imported) database.
+DATA_GENERATION_TABLE = "data_generation"
+
+_DATA_GENERATION_CREATE = f"""
+CREATE TABLE IF NOT EXISTS {DATA_GENERATION_TABLE} (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    epoch TEXT NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+_GENERATION_TABLES = (
+    "mangas",
+    "volumes",
+    "volume_ranges",
+    "authors",
+    "genres",
+    "lists",
+    "manga_author",
+    "manga_genre",
+    "manga_list",
+)
+
+_DATA_GENERATION_TRIGGERS = {
+    f"data_generation_{table}_{event.lower()}": f"""
+        AFTER {event} ON {table} BEGIN
+        UPDATE {DATA_GENERATION_TABLE} SET generation = generation + 1;
+        END"""
+    for table in _GENERATION_TABLES
+    for event in ("INSERT", "UPDATE", "DELETE")
+}
+
+
+def _exists(connection, name: str) -> bool:
+    row = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    ).first()
+    return row is not None
+
+
+def install_fulltext_index(connection) -> None:
+    """Create the FTS table and its triggers if missing. A newly created index
+    is populated from the existing rows."""
+    created = not _exists(connection, MANGA_FTS_TABLE)
+    connection.exec_driver_sql(_MANGA_FTS_CREATE)
+    connection.exec_driver_sql(_MANGA_FTS_STALE_CREATE)
+    for name, body in _MANGA_FTS_TRIGGERS.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if created:
+        rebuild_fulltext_index(connection)
+
+
+def refresh_fulltext_index(connection) -> None:
+    """Re-index the mangas marked stale by the triggers, each once."""
+    stale = f"SELECT manga_id FROM {MANGA_FTS_STALE_TABLE}"
+    for statement in _refresh_fts_statements(stale):
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(f"DELETE FROM {MANGA_FTS_STALE_TABLE}")
+
+
+def rebuild_fulltext_index(connection) -> None:
+    connection.exec_driver_sql(f"DELETE FROM {MANGA_FTS_TABLE}")
+    connection.exec_driver_sql(f"DELETE FROM {MANGA_FTS_STALE_TABLE}")
+    connection.exec_driver_sql(
+        f"INSERT INTO {MANGA_FTS_TABLE} "
+        f"(rowid, title, japanese_title, summary, authors, genres) {_MANGA_FTS_ROWS}"
+    )
+    logger.info("Rebuilt full-text index %s", MANGA_FTS_TABLE)
+
+
+def drop_fulltext_index(connection) -> None:
+    for name in _MANGA_FTS_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {MANGA_FTS_TABLE}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {MANGA_FTS_STALE_TABLE}")
+
+
+def install_trigram_indexes(connection) -> None:
+    """Create the trigram indexes and their triggers if missing. A newly
+    created index is built from the existing rows."""
+    for index, (table, column) in TRIGRAM_INDEXES.items():
+        created = not _exists(connection, index)
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+            f"{column}, content = '{table}', content_rowid = 'id', "
+            "tokenize = 'trigram')"
+        )
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index}_vocab "
+            f"USING fts5vocab({index}, 'row')"
+        )
+        if created:
+            connection.exec_driver_sql(
+                f"INSERT INTO {index} ({index}) VALUES ('rebuild')"
+            )
+    for name, body in _TRIGRAM_TRIGGERS.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def rebuild_trigram_indexes(connection) -> None:
+    for index in TRIGRAM_INDEXES:
+        connection.exec_driver_sql(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+    logger.info("Rebuilt trigram indexes")
+
+
+def drop_trigram_indexes(connection) -> None:
+    for name in _TRIGRAM_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    for index in TRIGRAM_INDEXES:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {index}_vocab")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {index}")
+
+
+def rebuild_title_keys(connection) -> None:
+    """Recompute the normalized ``title_search`` and ``title_sort`` columns,
+    e.g. after the normalization rules changed."""
+    rows = connection.exec_driver_sql("SELECT id, title, language FROM mangas").all()
+    if rows:
+        connection.exec_driver_sql(
+            "UPDATE mangas SET title_search = ?, title_sort = ? WHERE id = ?",
+            [
+                (search_key(title), sort_key(title, language), id_)
+                for id_, title, language in rows
+            ],
+        )
+    logger.info("Recomputed normalized titles of %d mangas", len(rows))
+
+
+def install_counter_triggers(connection) -> None:
+    """Create the ``manga_count`` triggers if missing. Counters of a database
+    that did not have them yet are reconciled once."""
+    created = not _exists(connection, next(iter(_COUNTER_TRIGGERS)))
+    for name, body in _COUNTER_TRIGGERS.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if created:
+        reconcile_manga_counts(connection)
+
+
+def reconcile_manga_counts(connection) -> None:
+    """Recompute every ``manga_count`` from the link tables."""
+    for table, link, column in _COUNTED_LINKS:
+        connection.exec_driver_sql(
+            f"UPDATE {table} SET manga_count = "
+            f"(SELECT count(*) FROM {link} WHERE {link}.{column} = {table}.id)"
+        )
+    logger.info("Reconciled author and genre manga counts")
+
+
+def install_image_refcounts(connection) -> None:
+    """Create the image reference count triggers if missing. Counts of a
+    database that did not have them yet are reconciled once."""
+    created = not _exists(connection, next(iter(_IMAGE_REFCOUNT_TRIGGERS)))
+    for name, body in _IMAGE_REFCOUNT_TRIGGERS.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if created:
+        reconcile_image_refcounts(connection)
+
+
+def reconcile_image_refcounts(connection) -> None:
+    """Recompute every ``images.refcount`` from the cover columns, adding rows
+    for covers that have none."""
+    references = " UNION ALL ".join(
+        f"SELECT cover_image FROM {table} WHERE cover_image != ''"
+        for table in _IMAGE_REFERENCES
+    )
+    connection.exec_driver_sql(f"INSERT OR IGNORE INTO images (name) {references}")
+    connection.exec_driver_sql("UPDATE images SET refcount = 0")
+    connection.exec_driver_sql(
+        "UPDATE images SET refcount = refs.count FROM (SELECT cover_image AS name, "
+        f"count(*) AS count FROM ({references}) GROUP BY cover_image) AS refs "
+        "WHERE images.name = refs.name"
+    )
+    logger.info("Reconciled image reference counts")
+
+
+def drop_image_refcounts(connection) -> None:
+    for name in _IMAGE_REFCOUNT_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def install_statistics_rollup(connection) -> None:
+    """Create the statistics rollup and its triggers if missing. A newly
+    created rollup is filled from the existing rows."""
+    created = not _exists(connection, STATISTICS_TABLE)
+    connection.exec_driver_sql(_STATISTICS_CREATE)
+    connection.exec_driver_sql(
+        f"CREATE INDEX IF NOT EXISTS ix_{STATISTICS_TABLE}_dimension_value "
+        f"ON {STATISTICS_TABLE} (dimension, value)"
+    )
+    for name, body in _STATISTICS_TRIGGERS.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if created:
+        rebuild_statistics(connection, check=False)
+
+
+def _statistics_queries() -> List[Tuple[str, str]]:
+    """``(rollup rows, fresh rows)`` per dimension and total: a condition on
+    ``statistics`` and the query recomputing those rows. Kept apart rather
+    than in one UNION ALL, whose columns take a single affinity and would turn
+    star ratings into text."""
+    queries = [
+        (
+            f"dimension = '{dimension}'",
+            f"SELECT '{dimension}', {dimension}, count(*) FROM mangas "
+            f"GROUP BY {dimension}",
+        )
+        for dimension in STATISTICS_DIMENSIONS
+    ]
+    for table in _STATISTICS_TOTALS:
+        count = _VOLUME_TOTAL if table == "volumes" else f"count(*) FROM {table}"
+        queries.append(
+            (
+                f"dimension = 'total' AND value = '{table}'",
+                f"SELECT 'total', '{table}', {count}",
+            )
+        )
+    return queries
+
+
+def rebuild_statistics(connection, check: bool = True) -> int:
+    """Recompute the statistics rollup from scratch. Returns the number of
+    rows that differed from the incrementally maintained ones, which should
+    be 0; not compared with ``check`` off, for a rollup just created."""
+    drift = 0
+    for live, fresh in _statistics_queries():
+        # Rows counting 0 are left behind by deletes and do not count as drift
+        if check:
+            drift += connection.exec_driver_sql(
+                f"WITH expected(dimension, value, count) AS ({fresh}), "
+                "nonzero AS (SELECT * FROM expected WHERE count != 0), "
+                "live AS (SELECT dimension, value, count "
+                f"FROM {STATISTICS_TABLE} WHERE {live} AND count != 0) "
+                "SELECT (SELECT count(*) FROM (SELECT * FROM nonzero EXCEPT "
+                "SELECT * FROM live)) + (SELECT count(*) FROM (SELECT * FROM live "
+                "EXCEPT SELECT * FROM nonzero))"
+            ).scalar()
+        connection.exec_driver_sql(f"DELETE FROM {STATISTICS_TABLE} WHERE {live}")
+        connection.exec_driver_sql(
+            f"INSERT INTO {STATISTICS_TABLE} (dimension, value, count) {fresh}"
+        )
+    if drift:
+        logger.warning("Statistics rollup was off in %d rows, rebuilt", drift)
+    elif check:
+        logger.info("Rebuilt statistics rollup, no drift")
+    else:
+        logger.info("Filled statistics rollup")
+    return drift
+
+
+def drop_statistics_rollup(connection) -> None:
+    for name in _STATISTICS_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {STATISTICS_TABLE}")
+
+
+def install_data_generation(connection) -> None:
+    """Create the data generation row and the triggers bumping it."""
+    connection.exec_driver_sql(_DATA_GENERATION_CREATE)
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {DATA_GENERATION_TABLE} (id, epoch) "
+        "VALUES (1, lower(hex(randomblob(8))))"
+    )
+    for name, body in _DATA_GENERATION_TRIGGERS.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def drop_data_generation(connection) -> None:
+    for name in _DATA_GENERATION_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {DATA_GENERATION_TABLE}")
+
+
+def create_sqlite_objects(target, connection, **kw) -> None:
+    """``after_create`` hook for ``Base.metadata``."""
+    install_fulltext_index(connection)
+    install_trigram_indexes(connection)
+    install_counter_triggers(connection)
+    install_image_refcounts(connection)
+    install_statistics_rollup(connection)
+    install_data_generation(connection)
+
+
+def drop_sqlite_objects(target, connection, **kw) -> None:
+    """``before_drop`` hook for ``Base.metadata``."""
+    drop_fulltext_index(connection)
+    drop_trigram_indexes(connection)
+    drop_image_refcounts(connection)
+    drop_statistics_rollup(connection)
+    drop_data_generation(connection)
@@ -0,0 +1,356 @@
+"""Content-addressed store for cover images.
+
+An image is named after the SHA-256 of its bytes, ``<hash>.<ext>``, and kept
+at ``<image dir>/<hash[:2]>/<hash[2:4]>/<name>``. Saving the same cover twice
+(re-imports, other language editions) stores it once, and a name never
+changes content, so it can be cached forever.
+
+``images`` counts the references to each name from ``mangas.cover_image`` and
+``volumes.cover_image``; triggers keep the counts current (see
+``ddl.install_image_refcounts``). Uploads and downloads go through
+``ImageWriter``. Files are only removed once nothing refers to them: after a
+commit for covers passed to ``release``, or by ``collect_garbage``.
+
+Covers saved before the store existed keep their flat names in the image
+directory and are served from there.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Collection, Hashable, Iterator, Optional
+
+from sqlalchemy import delete, event
+from sqlalchemy.orm import Session
+
+from backend.app.models import Image as ImageModel
+
+logger = logging.getLogger(__name__)
+
+CONTENT_NAME = re.compile(r"(?P<hash>[0-9a-f]{64})\.[a-z0-9]+")
+
+# Cap for uploads and downloads; cover art fits well under it
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Files nothing refers to are only collected once they are this old, so an
+# upload is not removed before the manga that uses it is saved
+GARBAGE_GRACE_SECONDS = 60 * 60
+
+# Scaled-down variants, see ``thumbnails``
+THUMBNAIL_DIR = ".thumbnails"
+# Partially written files, renamed into place when complete
+_INCOMING_DIR = ".incoming"
+# Directories in the image directory that hold no stored images; left out of
+# scans and exports
+WORK_DIRS = (THUMBNAIL_DIR, _INCOMING_DIR)
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+
+# Enough of the start of a file for ``sniff``
+_HEAD_BYTES = 16
+_NOT_AN_IMAGE = "Data is not a JPEG, PNG, GIF, WebP, AVIF or BMP"
+
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "gif", "webp", "avif", "bmp")
+
+
+class InvalidImage(ValueError):
+    """The data is not an image of a supported type."""
+
+    pass
+
+
+class ImageTooLarge(InvalidImage):
+    pass
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """File extension for the image type ``head`` starts with, or None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "avif"
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def path(image_dir: str, name: str) -> str:
+    """Location of the image ``name``; flat names are pre-store covers."""
+    match = CONTENT_NAME.fullmatch(name)
+    if match is None:
+        return os.path.join(image_dir, name)
+    digest = match["hash"]
+    return os.path.join(image_dir, digest[:2], digest[2:4], name)
+
+
+class ImageWriter:
+    """Writes one image into the store chunk by chunk::
+
+        with ImageWriter(image_dir) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+            name = writer.commit()
+
+    Data goes to a temporary file and is hashed on the way; ``commit`` moves
+    it to its content address, or drops it if that image is already stored.
+    Leaving the block without committing discards it.
+    """
+
+    def __init__(self, image_dir: str, max_bytes: int = MAX_IMAGE_BYTES):
+        self.image_dir = image_dir
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._head = b""
+        self._hash = hashlib.sha256()
+        incoming = os.path.join(image_dir, _INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        fd, self._partial = tempfile.mkstemp(dir=incoming)
+        self._file = os.fdopen(fd, "wb")
+
+    def __enter__(self) -> "ImageWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.discard()
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise ImageTooLarge(
+                f"Image exceeds the maximum size of {self.max_bytes} bytes"
+            )
+        if len(self._head) < _HEAD_BYTES:
+            self._head += chunk[: _HEAD_BYTES - len(self._head)]
+            # Stop reading as soon as it is clear this is no image
+            if len(self._head) == _HEAD_BYTES and sniff(self._head) is None:
+                raise InvalidImage(_NOT_AN_IMAGE)
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> str:
+        """Store the image and return its name."""
+        extension = sniff(self._head)
+        if extension is None:
+            raise InvalidImage(_NOT_AN_IMAGE)
+        name = f"{self._hash.hexdigest()}.{extension}"
+        target = path(self.image_dir, name)
+        self._file.close()
+        if os.path.exists(target):
+            # Already stored; touch it so garbage collection spares it
+            os.utime(target)
+            os.remove(self._partial)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(self._partial, target)
+        self._partial = None
+        return name
+
+    def discard(self) -> None:
+        if self._partial is None:
+            return
+        self._file.close()
+        try:
+            os.remove(self._partial)
+        except OSError:
+            pass
+        self._partial = None
+
+
+class ResolvedPaths:
+    """Bounded LRU map from content-addressed images (and their variants) to
+    what serving them needs, e.g. path and ``os.stat`` result. Their files
+    never change, so hot covers skip the filesystem checks; removing an image
+    through this module drops its entries. Keys are tuples starting with the
+    image directory and the image name."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, image_dir: str, name: Hashable) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[:2] == (image_dir, name)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+resolved_paths = ResolvedPaths()
+
+
+def store(image_dir: str, data: bytes) -> str:
+    """Store ``data`` and return its name, see ``ImageWriter``."""
+    with ImageWriter(image_dir) as writer:
+        writer.write(data)
+        return writer.commit()
+
+
+# ``Session.info`` keys: images passed to ``release``, and those of them
+# found unreferenced, until the transaction ends
+_RELEASED = "released_images"
+_UNREFERENCED = "unreferenced_images"
+
+
+def release(db: Session, image_dir: str, names: Collection[Optional[str]]) -> None:
+    """Note that ``db`` drops references to the images ``names``. When it
+    commits, those nothing refers to anymore are forgotten and their files
+    removed; with group commit (see ``write_dispatcher``) that is when the
+    whole group commits."""
+    released = db.info.setdefault(_RELEASED, {})
+    released.update((name, image_dir) for name in names if name)
+
+
+@event.listens_for(Session, "before_commit")
+def _forget_released(session: Session) -> None:
+    released = session.info.pop(_RELEASED, None)
+    if not released:
+        return
+    session.flush()
+    names = session.execute(
+        delete(ImageModel)
+        .where(ImageModel.name.in_(released), ImageModel.refcount <= 0)
+        .returning(ImageModel.name)
+    ).scalars()
+    session.info[_UNREFERENCED] = (
+        time.time(),
+        [(released[name], name) for name in names],
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_unreferenced(session: Session) -> None:
+    unreferenced = session.info.pop(_UNREFERENCED, None)
+    if not unreferenced:
+        return
+    released_at, names = unreferenced
+    by_dir = defaultdict(list)
+    for image_dir, name in names:
+        by_dir[image_dir].append(name)
+    for image_dir, names in by_dir.items():
+        remove_files(image_dir, names, released_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_released(session: Session) -> None:
+    session.info.pop(_RELEASED, None)
+    session.info.pop(_UNREFERENCED, None)
+
+
+def remove_files(
+    image_dir: str, names: Collection[str], released_at: Optional[float] = None
+) -> None:
+    """Delete the files of released images and their thumbnails. Files
+    stored again since ``released_at`` are kept: a new upload of the same
+    image just reused them."""
+    for name in names:
+        file_path = path(image_dir, name)
+        try:
+            if released_at is None or os.path.getmtime(file_path) < released_at:
+                os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Failed to remove image %s: %s", name, e)
+        remove_thumbnails(image_dir, name)
+        resolved_paths.discard(image_dir, name)
+
+
+def remove_thumbnails(image_dir: str, name: str) -> None:
+    """Delete all variants of the image ``name``."""
+    resolved_paths.discard(image_dir, name)
+    pattern = os.path.join(image_dir, THUMBNAIL_DIR, "*", glob.escape(name) + ".*")
+    for variant in glob.glob(pattern):
+        try:
+            os.remove(variant)
+        except OSError as e:
+            logger.warning("Failed to remove thumbnail %s: %s", variant, e)
+
+
+def collect_garbage(connection, image_dir: str) -> int:
+    """Remove images nothing refers to: released rows, and files without a
+    reference older than ``GARBAGE_GRACE_SECONDS``. Returns the number of
+    files removed."""
+    connection.exec_driver_sql("DELETE FROM images WHERE refcount <= 0")
+    referenced = {
+        name for (name,) in connection.exec_driver_sql("SELECT name FROM images")
+    }
+    cutoff = time.time() - GARBAGE_GRACE_SECONDS
+    removed = []
+    for name, file_path in stored_files(image_dir):
+        if name in referenced:
+            continue
+        try:
+            if os.path.getmtime(file_path) < cutoff:
+                os.remove(file_path)
+                removed.append(name)
+        except OSError as e:
+            logger.warning("Failed to remove image %s: %s", name, e)
+    for name in removed:
+        remove_thumbnails(image_dir, name)
+    logger.info("Removed %d unreferenced images", len(removed))
+    return len(removed)
+
+
+def stored_files(image_dir: str) -> Iterator[tuple]:
+    """``(name, path)`` of every image file, flat and content-addressed."""
+    for root, dirs, files in os.walk(image_dir):
+        dirs[:] = [d for d in dirs if d not in WORK_DIRS]
+        for name in files:
+            if name.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS:
+                yield name, os.path.join(root, name)
+
+
+def migrate_flat_images(connection, image_dir: str) -> int:
+    """Move covers saved before the store into it and point their references
+    to the new names. The flat files are left for ``collect_garbage``.
+    Returns the number of names moved."""
+    moved = 0
+    for (name,) in connection.exec_driver_sql(
+        "SELECT name FROM images WHERE refcount > 0"
+    ).all():
+        if CONTENT_NAME.fullmatch(name):
+            continue
+        try:
+            with open(os.path.join(image_dir, name), "rb") as f:
+                new_name = store(image_dir, f.read())
+        except (OSError, InvalidImage) as e:
+            logger.warning("Cannot move image %s into the store: %s", name, e)
+            continue
+        for table in ("mangas", "volumes"):
+            connection.exec_driver_sql(
+                f"UPDATE {table} SET cover_image = ? WHERE cover_image = ?",
+                (new_name, name),
+            )
+        moved += 1
+    logger.info("Moved %d images into the content-addressed store", moved)
+    return moved
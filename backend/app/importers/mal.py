@@ -3,6 +3,7 @@ import logging
 import xml.etree.ElementTree as ET
 
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from backend.app.handlers.jikan import JikanHandler
@@ -13,9 +14,15 @@ from backend.app.schemas import (
     ReadingStatus,
     VolumeCreate,
 )
+from backend.app.write_dispatcher import write_dispatcher
 
 logger = logging.getLogger(__name__)
 
+# Mangas looked up on Jikan before they are written in one create_batch call;
+# a long list is not held in memory, and a failure near the end does not lose
+# the lookups before it
+BATCH_SIZE = 50
+
 
 class MALImporter:
     def __init__(self, db: Session):
@@ -23,16 +30,33 @@ class MALImporter:
         self.jikan = JikanHandler()
 
     async def import_list(self, file: UploadFile) -> ImportResponse:
+        content = await file.read()
+        # Jikan lookups and database writes block, keep them off the event loop
+        return await run_in_threadpool(self.import_content, content)
+
+    def import_content(self, content: bytes) -> ImportResponse:
         total = 0
         imported = 0
         skipped = 0
         failed = 0
         logs = []
+        # (MAL title, MangaCreate) pairs not written yet
+        to_create = []
+
+        def write_batch():
+            nonlocal imported, skipped, failed
+            result = write_dispatcher.submit(
+                MangaRepository.create_batch,
+                [manga_create for _, manga_create in to_create],
+            )
+            imported += result.imported
+            skipped += result.skipped
+            failed += result.failed
+            for (title, _), detail in zip(to_create, result.logs):
+                logs.append(detail.model_copy(update={"title": title}))
+            to_create.clear()
 
         try:
-            # Read the file content
-            content = await file.read()
-
             # Try to decompress if it's gzipped
             try:
                 xml_content = gzip.decompress(content)
@@ -154,16 +178,7 @@ class MALImporter:
                         except ValueError:
                             pass
 
-                    # Create in DB
-                    MangaRepository.create(self.db, manga_create)
-                    imported += 1
-                    logs.append(
-                        ImportResultDetail(
-                            title=title,
-                            status="imported",
-                            info_code="IMPORTED_SUCCESS",
-                        )
-                    )
+                    to_create.append((title, manga_create))
 
                 except Exception as e:
                     logger.error(f"Error importing manga '{title}': {e}")
@@ -176,6 +191,12 @@ class MALImporter:
                         )
                     )
 
+                if len(to_create) >= BATCH_SIZE:
+                    write_batch()
+
+            if to_create:
+                write_batch()
+
         except Exception as e:
             logger.error(f"Fatal error during import: {e}")
             failed = total - imported - skipped
@@ -4,18 +4,23 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from backend.config import get_config_path, get_default_paths, save_config
 
-from . import models
 from .api.v1 import api_router
-from .database import SessionLocal, engine
+from .cover_downloads import cover_downloader
+from .database import SessionLocal, engine, log_sqlite_pragmas
+from .migrations import upgrade_database
 from .models import Role
 from .repositories import UserRepository
 from .repositories.source import SourceRepository
 from .schemas import SourceCreate, UserCreate
+from .settings import IMAGE_SAVE_PATH
+from .thumbnails import thumbnail_worker
+from .write_dispatcher import WriteQueueFull, write_dispatcher
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -47,8 +52,9 @@ def initialize_application():
     # Create images directory if it doesn't exist
     os.makedirs(config["image_path"], exist_ok=True)
 
-    # Create database tables
-    models.Base.metadata.create_all(bind=engine)
+    # Create database tables and apply pending schema migrations
+    upgrade_database(engine)
+    log_sqlite_pragmas(engine)
 
     # Initialize default sources and users
     db = SessionLocal()
@@ -85,8 +91,16 @@ def initialize_application():
 async def lifespan(app: FastAPI):
     print("Startup event triggered")
     initialize_application()
+    # Covers saved before thumbnails existed, or while the server was down
+    thumbnail_worker.backfill(IMAGE_SAVE_PATH)
+    # Cover downloads interrupted by the last shutdown
+    cover_downloader.requeue_pending()
     yield
     print("Shutdown event triggered")
+    # Before the writer, which records finished downloads
+    cover_downloader.shutdown(timeout=10)
+    write_dispatcher.shutdown(timeout=30)
+    thumbnail_worker.shutdown(timeout=5)
 
 
 # Initialize FastAPI app
@@ -111,11 +125,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Possible-Duplicates"],
 )
 
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.exception_handler(WriteQueueFull)
+async def write_queue_full_handler(request: Request, exc: WriteQueueFull):
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Manga API"}
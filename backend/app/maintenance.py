@@ -0,0 +1,66 @@
+"""One-shot maintenance commands for an existing database.
+
+Run from the repository root, e.g.::
+
+    python -m backend.app.maintenance reconcile-counts
+"""
+
+import argparse
+import logging
+from functools import partial
+
+from backend.app import ddl, images
+from backend.app.database import engine
+from backend.app.settings import IMAGE_SAVE_PATH
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = {
+    "reconcile-counts": (
+        ddl.reconcile_manga_counts,
+        "Recompute author and genre manga counts from the link tables",
+    ),
+    "rebuild-trigrams": (
+        ddl.rebuild_trigram_indexes,
+        "Rebuild the trigram indexes over manga titles and author names",
+    ),
+    "rebuild-title-keys": (
+        ddl.rebuild_title_keys,
+        "Recompute the normalized title search and sort columns",
+    ),
+    "rebuild-statistics": (
+        ddl.rebuild_statistics,
+        "Recompute the statistics rollup and report rows that had drifted",
+    ),
+    "reconcile-images": (
+        ddl.reconcile_image_refcounts,
+        "Recompute the reference counts of stored cover images",
+    ),
+    "migrate-images": (
+        partial(images.migrate_flat_images, image_dir=IMAGE_SAVE_PATH),
+        "Move covers saved under their own names into the content-addressed "
+        "store (run collect-images afterwards to remove the old files)",
+    ),
+    "collect-images": (
+        partial(images.collect_garbage, image_dir=IMAGE_SAVE_PATH),
+        "Remove cover images nothing refers to",
+    ),
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.app.maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text)
+    args = parser.parse_args(argv)
+
+    command, _ = COMMANDS[args.command]
+    with engine.begin() as connection:
+        command(connection)
+    logger.info("Finished %s", args.command)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
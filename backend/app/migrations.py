@@ -0,0 +1,230 @@
+"""Versioned schema migrations.
+
+``create_all`` only creates missing tables, so anything added to an existing
+table later (indexes, columns, triggers) needs a migration. Every migration
+runs once per database, in version order, inside the startup transaction; the
+applied versions are recorded in ``schema_version``. Migrations must be
+idempotent, because a freshly created database already has the current schema
+and still runs all of them once.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, List
+
+from sqlalchemy.engine import Connection, Engine
+
+from backend.app import ddl, volumes
+from backend.app.models import Base
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _install_sqlite_objects(connection: Connection) -> None:
+    ddl.install_fulltext_index(connection)
+    ddl.install_counter_triggers(connection)
+
+
+def _add_lookup_indexes(connection: Connection) -> None:
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_volumes_manga_id ON volumes (manga_id)",
+        "CREATE INDEX IF NOT EXISTS ix_manga_author_author_id "
+        "ON manga_author (author_id, manga_id)",
+        "CREATE INDEX IF NOT EXISTS ix_manga_genre_genre_id "
+        "ON manga_genre (genre_id, manga_id)",
+        "CREATE INDEX IF NOT EXISTS ix_manga_list_list_id "
+        "ON manga_list (list_id, manga_id)",
+        # Superseded by ix_mangas_title_language, which leads with title
+        "DROP INDEX IF EXISTS ix_mangas_title",
+    ):
+        connection.exec_driver_sql(statement)
+
+    duplicates = connection.exec_driver_sql(
+        "SELECT title, language FROM mangas WHERE language IS NOT NULL "
+        "GROUP BY title, language HAVING count(*) > 1"
+    ).all()
+    if duplicates:
+        # Existing duplicates would make the unique index fail. Keep a plain
+        # index so lookups are still fast and let the user clean up.
+        logger.warning(
+            "Not enforcing unique (title, language): duplicates exist for %s",
+            ", ".join(f"{title!r} ({language})" for title, language in duplicates),
+        )
+        unique = ""
+    else:
+        unique = "UNIQUE "
+    connection.exec_driver_sql(
+        f"CREATE {unique}INDEX IF NOT EXISTS ix_mangas_title_language "
+        "ON mangas (title, language)"
+    )
+
+
+def _add_statistics_rollup(connection: Connection) -> None:
+    for table in ("authors", "genres"):
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_manga_count "
+            f"ON {table} (manga_count)"
+        )
+    ddl.install_statistics_rollup(connection)
+
+
+def _add_facet_indexes(connection: Connection) -> None:
+    for column in (
+        "category",
+        "reading_status",
+        "overall_status",
+        "language",
+        "star_rating",
+    ):
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_mangas_{column} ON mangas ({column})"
+        )
+
+
+def _add_title_keys(connection: Connection) -> None:
+    columns = {
+        row[1] for row in connection.exec_driver_sql("PRAGMA table_info(mangas)")
+    }
+    for column in ("title_search", "title_sort"):
+        if column not in columns:
+            connection.exec_driver_sql(
+                f"ALTER TABLE mangas ADD COLUMN {column} VARCHAR"
+            )
+    ddl.rebuild_title_keys(connection)
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_mangas_title_search ON mangas (title_search)",
+        "CREATE INDEX IF NOT EXISTS ix_mangas_title_sort_id "
+        "ON mangas (title_sort, id)",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+def _add_volume_sort_keys(connection: Connection) -> None:
+    columns = {
+        row[1] for row in connection.exec_driver_sql("PRAGMA table_info(volumes)")
+    }
+    if "sort_key" not in columns:
+        connection.exec_driver_sql("ALTER TABLE volumes ADD COLUMN sort_key FLOAT")
+    rows = connection.exec_driver_sql("SELECT id, volume_number FROM volumes").all()
+    if rows:
+        connection.exec_driver_sql(
+            "UPDATE volumes SET sort_key = ? WHERE id = ?",
+            [(volumes.sort_key(number), id_) for id_, number in rows],
+        )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_volumes_manga_id_sort_key "
+        "ON volumes (manga_id, sort_key)"
+    )
+
+
+def _compact_volumes(connection: Connection) -> None:
+    """Move plain whole volumes from ``volumes`` rows into ``volume_ranges``,
+    merged with the ranges a manga already has."""
+    plain = {}
+    for id_, manga_id, number, cover in connection.exec_driver_sql(
+        "SELECT id, manga_id, volume_number, cover_image FROM volumes"
+    ):
+        if volumes.is_plain(number, cover):
+            plain.setdefault(manga_id, []).append((id_, int(number)))
+    if not plain:
+        return
+    for manga_id, rows in plain.items():
+        numbers = [number for _, number in rows]
+        for first, last in connection.exec_driver_sql(
+            "SELECT first_volume, last_volume FROM volume_ranges WHERE manga_id = ?",
+            (manga_id,),
+        ):
+            numbers.extend(range(first, last + 1))
+        connection.exec_driver_sql(
+            "DELETE FROM volume_ranges WHERE manga_id = ?", (manga_id,)
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO volume_ranges (manga_id, first_volume, last_volume) "
+            "VALUES (?, ?, ?)",
+            [(manga_id, first, last) for first, last in volumes.to_ranges(numbers)],
+        )
+        connection.exec_driver_sql(
+            "DELETE FROM volumes WHERE id = ?", [(id_,) for id_, _ in rows]
+        )
+    logger.info("Compacted the volumes of %d mangas into ranges", len(plain))
+
+
+def _add_cover_status(connection: Connection) -> None:
+    columns = {
+        row[1] for row in connection.exec_driver_sql("PRAGMA table_info(mangas)")
+    }
+    for column, type_ in (("cover_url", "VARCHAR"), ("cover_status", "VARCHAR(7)")):
+        if column not in columns:
+            connection.exec_driver_sql(
+                f"ALTER TABLE mangas ADD COLUMN {column} {type_}"
+            )
+    connection.exec_driver_sql(
+        "UPDATE mangas SET cover_status = 'ready' "
+        "WHERE cover_image IS NOT NULL AND cover_status IS NULL"
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Full-text index and manga_count triggers", _install_sqlite_objects),
+    Migration(
+        2, "Foreign key, join table and title lookup indexes", _add_lookup_indexes
+    ),
+    Migration(3, "Statistics rollup table", _add_statistics_rollup),
+    Migration(4, "Data generation counter", ddl.install_data_generation),
+    Migration(5, "Manga filter and facet indexes", _add_facet_indexes),
+    Migration(6, "Title and author trigram indexes", ddl.install_trigram_indexes),
+    Migration(7, "Normalized title search and sort keys", _add_title_keys),
+    Migration(8, "Numeric volume sort keys", _add_volume_sort_keys),
+    Migration(9, "Owned volumes as ranges", _compact_volumes),
+    Migration(10, "Image reference counts", ddl.reconcile_image_refcounts),
+    Migration(11, "Background cover downloads", _add_cover_status),
+]
+
+
+def get_schema_version(connection: Connection) -> int:
+    connection.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, description TEXT NOT NULL, "
+        "applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    version = connection.exec_driver_sql(
+        f"SELECT max(version) FROM {SCHEMA_VERSION_TABLE}"
+    ).scalar()
+    return version or 0
+
+
+def run_migrations(connection: Connection) -> int:
+    """Apply all pending migrations and return the resulting schema version."""
+    version = get_schema_version(connection)
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        logger.info(
+            "Applying migration %d: %s", migration.version, migration.description
+        )
+        migration.upgrade(connection)
+        connection.exec_driver_sql(
+            f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (?, ?)",
+            (migration.version, migration.description),
+        )
+        version = migration.version
+    return version
+
+
+def upgrade_database(engine: Engine) -> int:
+    """Bring the database behind ``engine`` to the current schema: create
+    missing tables, then apply pending migrations."""
+    with engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        version = run_migrations(connection)
+    logger.info("Database schema version %d", version)
+    return version
@@ -1,8 +1,25 @@
 import enum
 
-from sqlalchemy import Column, Enum, Float, ForeignKey, Integer, String, Table, Text
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+    event,
+    func,
+    select,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+
+from . import ddl, volumes
+from .normalize import search_key, sort_key
 
 Base = declarative_base()
 
@@ -34,12 +51,20 @@ class Role(enum.Enum):
     guest = "guest"
 
 
+class CoverStatus(enum.Enum):
+    pending = "pending"
+    ready = "ready"
+    failed = "failed"
+
+
 # Many-to-Many relationship tables
 manga_author = Table(
     "manga_author",
     Base.metadata,
     Column("manga_id", Integer, ForeignKey("mangas.id"), primary_key=True),
     Column("author_id", Integer, ForeignKey("authors.id"), primary_key=True),
+    # Reverse lookups; the primary key only serves manga_id-first queries
+    Index("ix_manga_author_author_id", "author_id", "manga_id"),
 )
 
 manga_genre = Table(
@@ -47,6 +72,8 @@ manga_genre = Table(
     Base.metadata,
     Column("manga_id", Integer, ForeignKey("mangas.id"), primary_key=True),
     Column("genre_id", Integer, ForeignKey("genres.id"), primary_key=True),
+    # Reverse lookups; the primary key only serves manga_id-first queries
+    Index("ix_manga_genre_genre_id", "genre_id", "manga_id"),
 )
 
 manga_list = Table(
@@ -54,6 +81,8 @@ manga_list = Table(
     Base.metadata,
     Column("manga_id", Integer, ForeignKey("mangas.id"), primary_key=True),
     Column("list_id", Integer, ForeignKey("lists.id"), primary_key=True),
+    # Reverse lookups; the primary key only serves manga_id-first queries
+    Index("ix_manga_list_list_id", "list_id", "manga_id"),
 )
 
 
@@ -62,14 +91,14 @@ class Author(Base):
     __tablename__ = "authors"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    manga_count = Column(Integer, default=0)
+    manga_count = Column(Integer, default=0, index=True)
 
 
 class Genre(Base):
     __tablename__ = "genres"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    manga_count = Column(Integer, default=0)
+    manga_count = Column(Integer, default=0, index=True)
 
 
 class List(Base):
@@ -80,32 +109,167 @@ class List(Base):
 
 class Volume(Base):
     __tablename__ = "volumes"
+    __table_args__ = (
+        # Ordered volumes of a manga, gap checks
+        Index("ix_volumes_manga_id_sort_key", "manga_id", "sort_key"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     volume_number = Column(String, index=True)
+    # Numeric value of volume_number (see volumes.sort_key), NULL if it has none
+    sort_key = Column(Float)
     cover_image = Column(String)
-    manga_id = Column(Integer, ForeignKey("mangas.id"))
+    manga_id = Column(Integer, ForeignKey("mangas.id"), index=True)
+
+    @validates("volume_number")
+    def _derive_sort_key(self, key, value):
+        self.sort_key = volumes.sort_key(value)
+        return value
+
+
+class VolumeRange(Base):
+    """Run of owned whole volumes without data of their own, see
+    ``volumes.compact``."""
+
+    __tablename__ = "volume_ranges"
+    __table_args__ = (
+        Index("ix_volume_ranges_manga_id_first", "manga_id", "first_volume"),
+    )
+    id = Column(Integer, primary_key=True)
+    manga_id = Column(Integer, ForeignKey("mangas.id"), nullable=False)
+    first_volume = Column(Integer, nullable=False)
+    last_volume = Column(Integer, nullable=False)
+
+
+def owned_volume_count(manga_id):
+    """SQL expression for the number of volumes of the manga ``manga_id``:
+    its volume rows plus the lengths of its ranges."""
+    rows = (
+        select(func.count(Volume.id))
+        .where(Volume.manga_id == manga_id)
+        .scalar_subquery()
+    )
+    in_ranges = (
+        select(
+            func.coalesce(
+                func.sum(VolumeRange.last_volume - VolumeRange.first_volume + 1), 0
+            )
+        )
+        .where(VolumeRange.manga_id == manga_id)
+        .scalar_subquery()
+    )
+    return rows + in_ranges
 
 
 class Manga(Base):
     __tablename__ = "mangas"
+    __table_args__ = (
+        # (title_sort, id) backs sorting and keyset pagination
+        Index("ix_mangas_title_sort_id", "title_sort", "id"),
+        Index("ix_mangas_title_language", "title", "language", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True)
+    title = Column(String)
+    # Derived from title and language (see normalize), kept current by
+    # _derive_title_keys and set explicitly by bulk inserts
+    title_search = Column(String, index=True)
+    title_sort = Column(String)
     japanese_title = Column(String)
-    reading_status = Column(Enum(ReadingStatus))
-    overall_status = Column(Enum(OverallStatus))
-    star_rating = Column(Float)  # 1 to 5 stars
-    language = Column(String)
-    category = Column(Enum(Category))
+    reading_status = Column(Enum(ReadingStatus), index=True)
+    overall_status = Column(Enum(OverallStatus), index=True)
+    star_rating = Column(Float, index=True)  # 1 to 5 stars
+    language = Column(String, index=True)
+    category = Column(Enum(Category), index=True)
     summary = Column(Text)
     cover_image = Column(String)
+    # Cover given as a URL: fetched in the background into cover_image (see
+    # cover_downloads) while cover_status is pending
+    cover_url = Column(String)
+    cover_status = Column(Enum(CoverStatus))
 
     authors = relationship("Author", secondary=manga_author, back_populates="mangas")
     genres = relationship("Genre", secondary=manga_genre, back_populates="mangas")
     lists = relationship("List", secondary=manga_list, back_populates="mangas")
-    volumes = relationship(
-        "Volume", back_populates="manga", cascade="all, delete-orphan"
+    # Volumes that need a row; plain whole volumes are in volume_ranges. Read
+    # and assign both through ``volumes``.
+    volume_rows = relationship(
+        "Volume",
+        back_populates="manga",
+        cascade="all, delete-orphan",
+        order_by=lambda: (
+            Volume.sort_key.asc().nulls_last(),
+            Volume.volume_number,
+            Volume.id,
+        ),
+    )
+    volume_ranges = relationship(
+        "VolumeRange",
+        cascade="all, delete-orphan",
+        order_by=lambda: VolumeRange.first_volume,
     )
 
+    @property
+    def volumes(self):
+        """All volumes in natural order, ranges expanded on access. A tuple:
+        appending to it would change nothing, assign a new list instead."""
+        expanded = volumes.expand(
+            self.id,
+            ((run.first_volume, run.last_volume) for run in self.volume_ranges),
+        )
+        return tuple(
+            sorted(
+                [*self.volume_rows, *expanded],
+                key=lambda volume: (
+                    volume.sort_key is None,
+                    volume.sort_key or 0,
+                    volume.volume_number or "",
+                    volume.id or 0,
+                ),
+            )
+        )
+
+    @volumes.setter
+    def volumes(self, value):
+        """Replace all volumes: plain whole ones become ranges, the others
+        ``Volume`` rows."""
+        ranges, rows = volumes.compact(value)
+        self.volume_rows = rows
+        self.volume_ranges = [
+            VolumeRange(first_volume=first, last_volume=last) for first, last in ranges
+        ]
+
+    @property
+    def owned_volumes(self) -> str:
+        """Owned whole volumes in range notation, e.g. "1-42,44,46-50"."""
+        numbers = [
+            number
+            for run in self.volume_ranges
+            for number in range(run.first_volume, run.last_volume + 1)
+        ]
+        numbers += [
+            int(volume.sort_key)
+            for volume in self.volume_rows
+            if volume.sort_key is not None and volume.sort_key.is_integer()
+        ]
+        return volumes.format_ranges(volumes.to_ranges(numbers))
+
+    @validates("title", "language")
+    def _derive_title_keys(self, key, value):
+        title = value if key == "title" else self.title
+        language = value if key == "language" else self.language
+        self.title_search = search_key(title)
+        self.title_sort = sort_key(title, language)
+        return value
+
+
+class Image(Base):
+    """A stored cover image, see ``images``. ``refcount`` is maintained by
+    triggers on the cover columns."""
+
+    __tablename__ = "images"
+    name = Column(String, primary_key=True)
+    refcount = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
 
 class Source(Base):
     __tablename__ = "sources"
@@ -132,4 +296,8 @@ class User(Base):
 Author.mangas = relationship("Manga", secondary=manga_author, back_populates="authors")
 Genre.mangas = relationship("Manga", secondary=manga_genre, back_populates="genres")
 List.mangas = relationship("Manga", secondary=manga_list, back_populates="lists")
-Volume.manga = relationship("Manga", back_populates="volumes")
+Volume.manga = relationship("Manga", back_populates="volume_rows")
+
+# Full-text index and other SQLite-only objects (see ``ddl.py``)
+event.listen(Base.metadata, "after_create", ddl.create_sqlite_objects)
+event.listen(Base.metadata, "before_drop", ddl.drop_sqlite_objects)
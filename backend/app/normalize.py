@@ -0,0 +1,92 @@
+"""Text normalization for matching titles and names.
+
+``fold`` maps the spellings a user would consider equal ("Attack On Titan",
+"attack on titan", "Ａｔｔａｃｋ ｏｎ Ｔｉｔａｎ", "Pokémon"/"Pokemon") to the same
+string. Trigrams of folded text give a typo tolerant similarity.
+
+``search_key`` and ``sort_key`` are stored next to a manga's title, so
+searching and sorting compare plain strings with SQLite's binary collation.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+")
+
+# Leading articles ignored when sorting, by language code
+LEADING_ARTICLES = {
+    "en": ("the", "a", "an"),
+    "de": ("der", "die", "das", "ein", "eine"),
+    "fr": ("le", "la", "les", "l'", "un", "une"),
+    "es": ("el", "la", "los", "las", "un", "una"),
+    "it": ("il", "lo", "la", "i", "gli", "le", "l'", "un", "una"),
+}
+# For titles without a known language
+DEFAULT_ARTICLES = LEADING_ARTICLES["en"] + LEADING_ARTICLES["de"]
+
+# Numbers are zero-padded to this many digits so "2" sorts before "10"
+NUMBER_WIDTH = 10
+
+
+def fold(text: str) -> str:
+    """NFKC, casefolded, without diacritics and with collapsed whitespace."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(
+        char
+        for char in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(char)
+    )
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def search_key(title: Optional[str]) -> Optional[str]:
+    """Stored form of a title for searching, see ``fold``."""
+    return None if title is None else fold(title)
+
+
+def sort_key(title: Optional[str], language: Optional[str] = None) -> Optional[str]:
+    """Stored form of a title for sorting: folded, without a leading article
+    of its language and with numbers compared by value."""
+    if title is None:
+        return None
+    key = fold(title)
+    code = (language or "").strip().lower()[:2]
+    for article in LEADING_ARTICLES.get(code, DEFAULT_ARTICLES):
+        separator = "" if article.endswith("'") else " "
+        prefix = article + separator
+        if key.startswith(prefix) and len(key) > len(prefix):
+            key = key[len(prefix) :]
+            break
+    return _NUMBER.sub(lambda match: str(int(match[0])).zfill(NUMBER_WIDTH), key)
+
+
+# Cached: ranking compares one query against many candidates
+@lru_cache(maxsize=4096)
+def trigrams(text: str) -> FrozenSet[str]:
+    """Trigrams of the folded ``text``, padded so short words and word starts
+    carry weight."""
+    folded = fold(text)
+    if not folded:
+        return frozenset()
+    padded = f"  {folded} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: str, b: str) -> float:
+    """Share of trigrams ``a`` and ``b`` have in common, from 0 to 1."""
+    first, second = trigrams(a), trigrams(b)
+    if not (first and second):
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def word_similarity(query: str, text: str) -> float:
+    """Share of the trigrams of ``query`` found in ``text``: how well
+    ``query`` matches a part of ``text``, e.g. one word of a longer title."""
+    first, second = trigrams(query), trigrams(text)
+    if not (first and second):
+        return 0.0
+    return len(first & second) / len(first)
@@ -0,0 +1,44 @@
+"""Holding background workers while the database or image directory is
+swapped out from under them (import, export).
+
+Workers wrap each unit of work in ``gate.working()``; ``gate.pause()`` waits
+for the units in progress to finish and keeps new ones from starting until
+``gate.resume()``. Pausing and resuming may happen on different threads.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class PauseGate:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._paused = 0
+        self._active = 0
+
+    @contextmanager
+    def working(self) -> Iterator[None]:
+        with self._condition:
+            while self._paused:
+                self._condition.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def pause(self) -> None:
+        """Block until no work is in progress; later work waits for
+        ``resume``."""
+        with self._condition:
+            self._paused += 1
+            while self._active:
+                self._condition.wait()
+
+    def resume(self) -> None:
+        with self._condition:
+            self._paused -= 1
+            self._condition.notify_all()
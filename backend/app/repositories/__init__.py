@@ -1,11 +1,13 @@
 from .author import AuthorRepository
 from .genre import GenreRepository
-from .list import ListRepository
-from .manga import MangaRepository
+from .list import AsyncListRepository, ListRepository
+from .manga import AsyncMangaRepository, MangaRepository
 from .source import SourceRepository
 from .user import UserRepository
 
 __all__ = [
+    "AsyncListRepository",
+    "AsyncMangaRepository",
     "AuthorRepository",
     "GenreRepository",
     "ListRepository",
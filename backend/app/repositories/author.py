@@ -2,9 +2,11 @@ from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
+from backend.app.ddl import AUTHOR_NAME_TRIGRAMS
 from backend.app.models import Author as AuthorModel
-from backend.app.schemas import Author, AuthorCreate
+from backend.app.schemas import Author, AuthorCreate, SimilarMatch
 
+from . import similarity
 from .base import BaseRepository, RepositoryError
 
 
@@ -19,6 +21,19 @@ class AuthorRepository:
         author = db.query(AuthorModel).filter(AuthorModel.id == author_id).first()
         return Author.model_validate(author) if author else None
 
+    @staticmethod
+    def find_similar(
+        db: Session,
+        name: str,
+        limit: int = 10,
+        threshold: float = similarity.DEFAULT_THRESHOLD,
+    ) -> List[SimilarMatch]:
+        """Authors whose name resembles ``name``, most similar first."""
+        stmt = similarity.candidates_statement(AUTHOR_NAME_TRIGRAMS, name)
+        if stmt is None:
+            return []
+        return similarity.rank(name, db.execute(stmt).all(), limit, threshold)
+
     @staticmethod
     def create(db: Session, author: AuthorCreate) -> Author:
         existing = db.query(AuthorModel).filter(AuthorModel.name == author.name).first()
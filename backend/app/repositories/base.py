@@ -1,7 +1,13 @@
-from typing import Any, Type
+from typing import Any, Callable, Optional, Type
 
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
+# ``Session.info`` flag set by the write dispatcher while it runs several writes
+# in one transaction; commit_session then only flushes, and leaves rolling back
+# to the savepoint the dispatcher wraps each write in.
+GROUP_COMMIT = "group_commit"
+
 
 class RepositoryError(Exception):
     """Custom exception for repository errors."""
@@ -11,13 +17,43 @@ class RepositoryError(Exception):
 
 class BaseRepository:
     @staticmethod
-    def commit_session(db: Session) -> None:
+    def commit_session(
+        db: Session, before_commit: Optional[Callable[[Session], Any]] = None
+    ) -> None:
+        """Commit ``db``; ``before_commit`` runs once everything is flushed."""
         try:
-            db.commit()
+            if before_commit is not None:
+                db.flush()
+                before_commit(db)
+            if db.info.get(GROUP_COMMIT):
+                db.flush()
+            else:
+                db.commit()
         except Exception as e:
-            db.rollback()
+            if not db.info.get(GROUP_COMMIT):
+                db.rollback()
             raise RepositoryError("Database commit failed") from e
 
+    @staticmethod
+    def begin(db: Session) -> None:
+        """Make sure the database transaction of ``db`` has begun. pysqlite
+        only begins one before DML; without it, releasing a savepoint taken
+        first would commit on its own."""
+        connection = db.connection()
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN")
+
+    @staticmethod
+    def after_commit(db: Session, callback: Callable[[], Any]) -> None:
+        """Run ``callback`` once the write made through ``db`` is committed:
+        right away after ``commit_session``, or under group commit when the
+        whole group commits. Dropped if the write is rolled back."""
+        if not db.info.get(GROUP_COMMIT):
+            callback()
+            return
+        transaction = db.get_nested_transaction() or db.get_transaction()
+        db.info.setdefault(_AFTER_COMMIT, []).append((transaction, callback))
+
     @staticmethod
     def flush_and_return(db: Session, instance: Any) -> Any:
         db.flush()
@@ -44,3 +80,31 @@ class BaseRepository:
         instance = model(**data)
         db.add(instance)
         return BaseRepository.flush_and_return(db, instance)
+
+
+# ``Session.info`` key: callbacks passed to ``after_commit`` under group commit,
+# with the savepoint of the write that queued them
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def _within(transaction, ancestor) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back_callbacks(session: Session, previous_transaction) -> None:
+    callbacks = session.info.get(_AFTER_COMMIT)
+    if callbacks:
+        session.info[_AFTER_COMMIT] = [
+            item for item in callbacks if not _within(item[0], previous_transaction)
+        ]
+
+
+@event.listens_for(Session, "after_commit")
+def _run_committed_callbacks(session: Session) -> None:
+    for _, callback in session.info.pop(_AFTER_COMMIT, ()):
+        callback()
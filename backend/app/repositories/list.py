@@ -1,24 +1,56 @@
 from typing import List as TypedList
 from typing import Optional
 
+from sqlalchemy import asc, desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from backend.app.models import List as ListModel
+from backend.app.models import manga_list, owned_volume_count
 from backend.app.schemas import ListCreate
 from backend.app.schemas import ListModel as ListSchema
 
 from .base import BaseRepository, RepositoryError
 
 
+def _page_statement(skip: int, limit: int):
+    return select(ListModel).offset(skip).limit(limit)
+
+
+def _by_id_statement(list_id: int):
+    return select(ListModel).where(ListModel.id == list_id)
+
+
+def _with_counts_statement(
+    skip: int, limit: Optional[int], sort: str, descending: bool
+):
+    """Lists with their number of mangas and of volumes across those mangas,
+    aggregated in one GROUP BY over ``manga_list``."""
+    manga_count = func.count(manga_list.c.manga_id).label("mangaCount")
+    volume_count = func.coalesce(
+        func.sum(owned_volume_count(manga_list.c.manga_id)), 0
+    ).label("volumeCount")
+    sort_column = {"name": ListModel.name, "count": manga_count}[sort]
+    direction = desc if descending else asc
+    return (
+        select(ListModel.id, ListModel.name, manga_count, volume_count)
+        .outerjoin(manga_list, manga_list.c.list_id == ListModel.id)
+        .group_by(ListModel.id)
+        .order_by(direction(sort_column), direction(ListModel.id))
+        .offset(skip)
+        .limit(limit)
+    )
+
+
 class ListRepository:
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 10) -> TypedList[ListSchema]:
-        lists_ = db.query(ListModel).offset(skip).limit(limit).all()
+        lists_ = db.scalars(_page_statement(skip, limit))
         return [ListSchema.model_validate(item) for item in lists_]
 
     @staticmethod
     def get_by_id(db: Session, list_id: int) -> Optional[ListSchema]:
-        list_ = db.query(ListModel).filter(ListModel.id == list_id).first()
+        list_ = db.scalars(_by_id_statement(list_id)).first()
         return ListSchema.model_validate(list_) if list_ else None
 
     @staticmethod
@@ -64,12 +96,41 @@ class ListRepository:
         return ListSchema.model_validate(list_)
 
     @staticmethod
-    def get_with_manga_count(db: Session) -> TypedList[dict]:
-        lists_ = db.query(ListModel).all()
-        result = []
-        for list_ in lists_:
-            manga_count = len(list_.mangas)
-            result.append(
-                {"id": list_.id, "name": list_.name, "mangaCount": manga_count}
-            )
-        return result
+    def get_with_manga_count(
+        db: Session,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        sort: str = "name",
+        descending: bool = False,
+    ) -> TypedList[dict]:
+        """Lists with ``mangaCount`` and ``volumeCount``, sorted by ``name`` or
+        manga ``count``."""
+        stmt = _with_counts_statement(skip, limit, sort, descending)
+        return [dict(row) for row in db.execute(stmt).mappings()]
+
+
+class AsyncListRepository:
+    """Read-only ``ListRepository`` for ``AsyncSession``."""
+
+    @staticmethod
+    async def get_all(
+        db: AsyncSession, skip: int = 0, limit: int = 10
+    ) -> TypedList[ListSchema]:
+        lists_ = await db.scalars(_page_statement(skip, limit))
+        return [ListSchema.model_validate(item) for item in lists_]
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, list_id: int) -> Optional[ListSchema]:
+        list_ = (await db.scalars(_by_id_statement(list_id))).first()
+        return ListSchema.model_validate(list_) if list_ else None
+
+    @staticmethod
+    async def get_with_manga_count(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        sort: str = "name",
+        descending: bool = False,
+    ) -> TypedList[dict]:
+        stmt = _with_counts_statement(skip, limit, sort, descending)
+        return [dict(row) for row in (await db.execute(stmt)).mappings()]
@@ -0,0 +1,41 @@
+from enum import Enum
+from typing import Tuple
+
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from backend.app.models import Manga as MangaModel
+
+
+class MangaLoad(Enum):
+    """Eager-loading strategies for queries that are serialized to
+    ``schemas.Manga``, which touches every relationship of the row.
+
+    ``LIST`` is meant for endpoints returning many mangas: each relationship is
+    fetched with one ``SELECT ... WHERE manga_id IN (...)`` for the whole page,
+    so a page costs a constant number of queries instead of one per row and
+    relationship. ``DETAIL`` is meant for single-row lookups, where joining the
+    small collections into the main query is cheaper than extra round trips.
+    """
+
+    LIST = "list"
+    DETAIL = "detail"
+
+    @property
+    def options(self) -> Tuple[LoaderOption, ...]:
+        if self is MangaLoad.DETAIL:
+            return (
+                joinedload(MangaModel.authors),
+                joinedload(MangaModel.genres),
+                joinedload(MangaModel.lists),
+                # A handful of rows however many volumes there are
+                joinedload(MangaModel.volume_ranges),
+                selectinload(MangaModel.volume_rows),
+            )
+        return (
+            selectinload(MangaModel.authors),
+            selectinload(MangaModel.genres),
+            selectinload(MangaModel.lists),
+            selectinload(MangaModel.volume_rows),
+            selectinload(MangaModel.volume_ranges),
+        )
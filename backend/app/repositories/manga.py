@@ -1,32 +1,179 @@
+import base64
+import json
 import logging
-import os
-import uuid
+import operator
+import re
+from enum import Enum
+from functools import partial
+from typing import Dict
 from typing import List as TypedList
-from typing import Optional
+from typing import Optional, Tuple, Union
 
-import requests
-from sqlalchemy import asc, desc
+from sqlalchemy import (
+    Float,
+    Integer,
+    Select,
+    and_,
+    asc,
+    case,
+    cast,
+    desc,
+    exists,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.app import settings
+from backend.app import images, settings
+from backend.app.cache import get_data_generation, get_data_generation_async
+from backend.app.cover_downloads import cover_downloader
+from backend.app.ddl import (
+    AUTHOR_NAME_TRIGRAMS,
+    MANGA_FTS_TABLE,
+    MANGA_FTS_WEIGHTS,
+    MANGA_TITLE_TRIGRAMS,
+    refresh_fulltext_index,
+)
 from backend.app.models import Author as AuthorModel
 from backend.app.models import Genre as GenreModel
 from backend.app.models import List as ListModel
 from backend.app.models import Manga as MangaModel
 from backend.app.models import Volume as VolumeModel
-from backend.app.schemas import Manga, MangaCreate
+from backend.app.models import VolumeRange as VolumeRangeModel
+from backend.app.models import manga_author, manga_genre, manga_list, owned_volume_count
+from backend.app.normalize import search_key, sort_key, word_similarity
+from backend.app.schemas import (
+    CoverStatus,
+    FacetCount,
+    ImportResponse,
+    ImportResultDetail,
+    Manga,
+    MangaCreate,
+    MangaFacets,
+    MangaFilters,
+    MangaSearchResult,
+    MangaSummary,
+    MangaView,
+    NextMissingVolume,
+    ReadingStatus,
+    SimilarMatch,
+    VolumeGap,
+)
+from backend.app.search_query import (
+    NUMERIC_FIELDS,
+    TEXT_FIELDS,
+    SearchTerm,
+    parse_search_query,
+)
+from backend.app.volumes import compact as compact_volumes
+from backend.app.volumes import sort_key as volume_sort_key
 
+from . import similarity
 from .base import BaseRepository, RepositoryError
+from .loading import MangaLoad
 
 logger = logging.getLogger(__name__)
 
+_BM25 = f"bm25({MANGA_FTS_TABLE}, {', '.join(map(str, MANGA_FTS_WEIGHTS))})"
+
+# Columns of the summary projection, in the field order of ``MangaSummary``.
+# Selected straight from the table; ``summary`` and volume rows are never read.
+_SUMMARY_COLUMNS = (
+    MangaModel.id,
+    MangaModel.title,
+    MangaModel.cover_image,
+    MangaModel.cover_status,
+    MangaModel.reading_status,
+    MangaModel.overall_status,
+    MangaModel.star_rating,
+    MangaModel.language,
+    MangaModel.category,
+    owned_volume_count(MangaModel.id).label("volume_count"),
+)
+
+
+# Filterable ``mangas`` columns, by ``MangaFilters`` field and facet name
+_FILTER_COLUMNS = {
+    "category": MangaModel.category,
+    "reading_status": MangaModel.reading_status,
+    "overall_status": MangaModel.overall_status,
+    "language": MangaModel.language,
+}
+
+# Facets over the link tables: facet name -> (``MangaFilters`` field, id column
+# in the link table, related model)
+_LINK_FACETS = {
+    "genres": ("genre_ids", manga_genre.c.genre_id, GenreModel),
+    "authors": ("author_ids", manga_author.c.author_id, AuthorModel),
+    "lists": ("list_ids", manga_list.c.list_id, ListModel),
+}
+
+_COMPARISONS = {
+    "=": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Options returned per link facet, most frequent first
+FACET_LIMIT = 50
+
+
+def _is_url(cover_image: Optional[str]) -> bool:
+    return bool(cover_image) and cover_image.startswith(("http://", "https://"))
+
+
+def _refresh_search_index(db: Session) -> None:
+    """Re-index the written mangas for full-text search, once their author and
+    genre links are written too."""
+    refresh_fulltext_index(db.connection())
+
+
+def _encode_cursor(values) -> str:
+    """Opaque pagination cursor holding the sort key values of a row."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+class StaleCursor(ValueError):
+    """A search cursor from before a write: relevance scores depend on the
+    whole library, so its position no longer holds."""
+
+    pass
+
+
+def _decode_cursor(cursor: str, order, suffix: list) -> list:
+    """Sort key values of ``cursor``, which must end with ``suffix``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(order) + len(suffix):
+        raise ValueError("Cursor does not match this query")
+    if values[len(order) :] != suffix:
+        raise StaleCursor("The search results changed, start from the first page")
+    return values[: len(order)]
+
 
 class MangaRepository(BaseRepository):
     @staticmethod
     def get_by_title(
         db: Session, title: str, language: Optional[str] = None
     ) -> Optional[Manga]:
-        query = db.query(MangaModel).filter(MangaModel.title == title)
+        query = (
+            db.query(MangaModel)
+            .options(*MangaLoad.DETAIL.options)
+            .filter(MangaModel.title == title)
+        )
         if language:
             query = query.filter(MangaModel.language == language)
         manga = query.first()
@@ -34,9 +181,147 @@ class MangaRepository(BaseRepository):
 
     @staticmethod
     def get_by_id(db: Session, manga_id: int) -> Optional[Manga]:
-        manga = db.query(MangaModel).filter(MangaModel.id == manga_id).first()
+        manga = (
+            db.execute(MangaRepository._by_id_statement(manga_id))
+            .unique()
+            .scalar_one_or_none()
+        )
         return Manga.model_validate(manga) if manga else None
 
+    @staticmethod
+    def get_next_missing_volume(
+        db: Session, manga_id: int
+    ) -> Optional[NextMissingVolume]:
+        """Lowest whole volume number from 1 up the manga does not have, or
+        None if there is no such manga."""
+        row = db.execute(MangaRepository._next_missing_statement(manga_id)).first()
+        return NextMissingVolume(**row._mapping) if row else None
+
+    @staticmethod
+    def get_volume_gaps(
+        db: Session,
+        filters: Optional[MangaFilters] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> TypedList[VolumeGap]:
+        """Missing whole volumes of all mangas matching ``filters``, largest
+        gaps first."""
+        stmt = MangaRepository._volume_gaps_statement(filters, skip, limit)
+        return [VolumeGap(**row._mapping) for row in db.execute(stmt).all()]
+
+    @staticmethod
+    def _volume_gaps_statement(
+        filters: Optional[MangaFilters], skip: int, limit: int
+    ) -> Select:
+        # Owned whole volumes as runs: the ranges plus single-volume runs for
+        # rows. Per manga, ordered by first volume, a gap is where a run starts
+        # more than one past the highest volume of the runs before it.
+        runs = union_all(
+            select(
+                VolumeRangeModel.manga_id,
+                VolumeRangeModel.first_volume.label("first"),
+                VolumeRangeModel.last_volume.label("last"),
+            ),
+            select(
+                VolumeModel.manga_id,
+                cast(VolumeModel.sort_key, Integer),
+                cast(VolumeModel.sort_key, Integer),
+            ).where(
+                VolumeModel.sort_key >= 1,
+                VolumeModel.sort_key == cast(VolumeModel.sort_key, Integer),
+            ),
+        ).subquery("runs")
+        covered = func.max(runs.c.last).over(
+            partition_by=runs.c.manga_id, order_by=runs.c.first, rows=(None, -1)
+        )
+        bounds = select(
+            runs.c.manga_id,
+            runs.c.first,
+            func.coalesce(covered, 0).label("covered"),
+        ).subquery("bounds")
+        missing = (bounds.c.first - bounds.c.covered - 1).label("missing")
+        stmt = (
+            select(
+                MangaModel.id.label("manga_id"),
+                MangaModel.title,
+                MangaModel.language,
+                (bounds.c.covered + 1).label("first_missing"),
+                (bounds.c.first - 1).label("last_missing"),
+                missing,
+            )
+            .join(bounds, bounds.c.manga_id == MangaModel.id)
+            .where(bounds.c.first > bounds.c.covered + 1)
+        )
+        stmt = MangaRepository._apply_filters(stmt, filters)
+        return (
+            stmt.order_by(
+                missing.desc(), MangaModel.title_sort, MangaModel.id, "first_missing"
+            )
+            .offset(skip)
+            .limit(limit)
+        )
+
+    @staticmethod
+    def _next_missing_statement(manga_id: int) -> Select:
+        # Whole volumes are owned through a range or a row. The answer is 1,
+        # or one past the end of the first run without a successor; every
+        # lookup runs on the (manga_id, first_volume/sort_key) indexes.
+        def owned(number):
+            return or_(
+                exists().where(
+                    VolumeRangeModel.manga_id == manga_id,
+                    VolumeRangeModel.first_volume <= number,
+                    VolumeRangeModel.last_volume >= number,
+                ),
+                exists().where(
+                    VolumeModel.manga_id == manga_id, VolumeModel.sort_key == number
+                ),
+            )
+
+        ends = union_all(
+            select(VolumeRangeModel.last_volume.label("end")).where(
+                VolumeRangeModel.manga_id == manga_id
+            ),
+            select(cast(VolumeModel.sort_key, Integer).label("end")).where(
+                VolumeModel.manga_id == manga_id,
+                VolumeModel.sort_key >= 1,
+                VolumeModel.sort_key == cast(VolumeModel.sort_key, Integer),
+            ),
+        ).subquery()
+        first_gap = (
+            select(func.min(ends.c.end + 1))
+            .where(~owned(ends.c.end + 1))
+            .scalar_subquery()
+        )
+        highest_range = (
+            select(func.max(VolumeRangeModel.last_volume))
+            .where(VolumeRangeModel.manga_id == manga_id)
+            .scalar_subquery()
+        )
+        highest_row = (
+            select(func.max(VolumeModel.sort_key))
+            .where(VolumeModel.manga_id == manga_id)
+            .scalar_subquery()
+        )
+        # Two-argument max() is NULL if either side is
+        highest = func.max(
+            func.coalesce(highest_range, highest_row),
+            func.coalesce(highest_row, highest_range),
+        )
+        return select(
+            MangaModel.id.label("manga_id"),
+            case((owned(1), first_gap), else_=1).label("volume_number"),
+            highest.label("highest_owned"),
+        ).where(MangaModel.id == manga_id)
+
+    @staticmethod
+    def _by_id_statement(manga_id: int) -> Select:
+        return (
+            select(MangaModel)
+            .options(*MangaLoad.DETAIL.options)
+            .where(MangaModel.id == manga_id)
+        )
+
     @staticmethod
     def get_all(
         db: Session,
@@ -44,44 +329,633 @@ class MangaRepository(BaseRepository):
         limit: int = 10,
         search: Optional[str] = None,
         sort: Optional[str] = "asc",
-    ) -> TypedList[Manga]:
+        cursor: Optional[str] = None,
+        view: MangaView = MangaView.full,
+        filters: Optional[MangaFilters] = None,
+    ) -> TypedList[Union[Manga, MangaSummary]]:
+        return MangaRepository.get_page(
+            db,
+            skip=skip,
+            limit=limit,
+            search=search,
+            sort=sort,
+            cursor=cursor,
+            view=view,
+            filters=filters,
+        )[0]
+
+    @staticmethod
+    def get_page(
+        db: Session,
+        skip: int = 0,
+        limit: int = 10,
+        search: Optional[str] = None,
+        sort: Optional[str] = "asc",
+        cursor: Optional[str] = None,
+        view: MangaView = MangaView.full,
+        filters: Optional[MangaFilters] = None,
+    ) -> Tuple[TypedList[Union[Manga, MangaSummary]], Optional[str]]:
         """
         Holt Mangas mit Paging.
-        Optional: Filter nach Titel (ILIKE '%search%'), Sortierung.
+        Optional: Volltextsuche über den FTS-Index (Titel, japanischer Titel,
+        Zusammenfassung, Autoren, Genres), Sortierung.
+        Bei einer Suche wird nach BM25-Relevanz sortiert, der Titel dient
+        nur noch als Tie-Breaker.
+
+        Mit ``cursor`` (aus dem ``next_cursor`` der vorherigen Seite) wird
+        per Keyset statt per Offset geblättert; ``skip`` wird dann ignoriert.
+        Gibt die Seite und den Cursor für die nächste Seite zurück (``None``
+        auf der letzten Seite). Der Cursor einer Suche gilt nur, solange
+        sich die Daten nicht ändern, danach wirft er ``StaleCursor``.
+
+        ``view=summary`` liefert die schlanke ``MangaSummary``-Projektion.
+        ``filters`` schränkt serverseitig ein (siehe ``MangaFilters``), die
+        passenden Facetten liefert ``get_facets``.
+
+        Findet eine reine Textsuche nichts, kommen ähnliche Titel und Mangas
+        ähnlich geschriebener Autoren zurück (Tippfehler), ohne Cursor.
         """
-        query = db.query(MangaModel)
-
-        # Volltextsuche (case-insensitive) im Titel
-        if search:
-            if search.lower().startswith("list:"):
-                list_name = search[5:].strip()
-                query = query.filter(
-                    MangaModel.lists.any(ListModel.name.ilike(f"%{list_name}%"))
+        # Read before the page: a write in between only makes the cursor stale
+        generation = get_data_generation(db) if search else None
+        stmt, order, suffix = MangaRepository._page_statement(
+            skip, limit, search, sort, cursor, view, filters, generation
+        )
+        rows = db.execute(stmt).all()
+        fuzzy = None if rows else MangaRepository._fuzzy_text(search, skip, cursor)
+        if fuzzy:
+            titles, authors = MangaRepository._fuzzy_statements(fuzzy)
+            stmt = MangaRepository._fuzzy_page_statement(
+                fuzzy,
+                db.execute(titles).all() + db.execute(authors).all(),
+                limit,
+                view,
+                filters,
+            )
+            rows = db.execute(stmt).all() if stmt is not None else []
+            return MangaRepository._rows_to_view(rows, view), None
+        return MangaRepository._page_result(rows, limit, order, view, suffix)
+
+    @staticmethod
+    def find_similar(
+        db: Session,
+        title: str,
+        limit: int = 10,
+        threshold: float = similarity.DEFAULT_THRESHOLD,
+    ) -> TypedList[SimilarMatch]:
+        """Mangas whose title resembles ``title``, most similar first."""
+        stmt = MangaRepository._similar_statement(title)
+        if stmt is None:
+            return []
+        return similarity.rank(title, db.execute(stmt).all(), limit, threshold)
+
+    @staticmethod
+    def _similar_statement(title: str):
+        return similarity.candidates_statement(
+            MANGA_TITLE_TRIGRAMS, title, columns=("language",)
+        )
+
+    @staticmethod
+    def _fuzzy_text(
+        search: Optional[str], skip: int, cursor: Optional[str]
+    ) -> Optional[str]:
+        """Text to look up by similarity after a plain text search (no fields,
+        no negation) found nothing on its first page."""
+        if not search or skip or cursor:
+            return None
+        terms = parse_search_query(search).terms
+        if not terms or any(term.field or term.negated for term in terms):
+            return None
+        fuzzy = " ".join(term.value for term in terms)
+        return fuzzy if similarity.query_trigrams(fuzzy) else None
+
+    @staticmethod
+    def _fuzzy_statements(fuzzy: str):
+        """Candidate ``(manga id, title)`` and ``(manga id, author name)`` rows
+        for ``fuzzy``."""
+        authors = text(
+            "SELECT ma.manga_id, a.name FROM authors a "
+            "JOIN manga_author ma ON ma.author_id = a.id "
+            f"WHERE a.id IN ({similarity.candidate_ids(AUTHOR_NAME_TRIGRAMS)})"
+        ).bindparams(trigrams=similarity.query_trigrams(fuzzy))
+        return similarity.candidates_statement(MANGA_TITLE_TRIGRAMS, fuzzy), authors
+
+    @staticmethod
+    def _fuzzy_page_statement(
+        fuzzy: str,
+        candidates,
+        limit: int,
+        view: MangaView,
+        filters: Optional[MangaFilters],
+    ) -> Optional[Select]:
+        # Ranked best first, so the first score seen per manga is its best
+        scores: Dict[int, float] = {}
+        for match in similarity.rank(
+            fuzzy,
+            candidates,
+            limit=None,
+            threshold=similarity.FUZZY_SEARCH_THRESHOLD,
+            measure=word_similarity,
+        ):
+            scores.setdefault(match.id, match.similarity)
+        if not scores:
+            return None
+        stmt = MangaRepository._select_view(view).where(MangaModel.id.in_(scores))
+        position = {manga_id: index for index, manga_id in enumerate(scores)}
+        stmt = MangaRepository._apply_filters(stmt, filters)
+        return stmt.order_by(case(position, value=MangaModel.id)).limit(limit)
+
+    @staticmethod
+    def _page_statement(
+        skip: int,
+        limit: int,
+        search: Optional[str],
+        sort: Optional[str],
+        cursor: Optional[str],
+        view: MangaView,
+        filters: Optional[MangaFilters] = None,
+        generation: Optional[str] = None,
+    ):
+        """Statement for one page of ``get_page``, the sort keys appended to
+        each row and the values after them in the cursor, which
+        ``_page_result`` turns into the next cursor.
+
+        Pages ranked by relevance hold only while the library is unchanged, as
+        any write re-scores every row: their cursor ends with the data
+        ``generation`` and raises ``StaleCursor`` once it is outdated.
+        """
+        stmt, order = MangaRepository._apply_search(
+            MangaRepository._select_view(view), search
+        )
+        suffix = [generation] if order else []
+        stmt = MangaRepository._apply_filters(stmt, filters)
+
+        # Sortierung nach normalisiertem Titel (ohne Artikel, Zahlen nach
+        # Wert), die ID macht die Reihenfolge eindeutig
+        ascending = sort == "asc"
+        order += [(MangaModel.title_sort, ascending), (MangaModel.id, ascending)]
+        stmt = stmt.add_columns(*(column for column, _ in order)).order_by(
+            *(asc(column) if up else desc(column) for column, up in order)
+        )
+
+        if cursor:
+            stmt = stmt.where(
+                MangaRepository._keyset_after(
+                    order, _decode_cursor(cursor, order, suffix)
                 )
-            else:
-                ilike_term = f"%{search}%"
-                query = query.filter(MangaModel.title.ilike(ilike_term))
+            )
+        else:
+            stmt = stmt.offset(skip)
+
+        # One extra row tells us whether there is a next page
+        return stmt.limit(limit + 1), order, suffix
+
+    @staticmethod
+    def _page_result(
+        rows, limit: int, order, view: MangaView, suffix: list
+    ) -> Tuple[TypedList[Union[Manga, MangaSummary]], Optional[str]]:
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor([*rows[-1][-len(order) :], *suffix])
+        items = MangaRepository._rows_to_view(
+            [row[: -len(order)] for row in rows], view
+        )
+        return items, next_cursor
+
+    @staticmethod
+    def _select_view(view: MangaView) -> Select:
+        if view == MangaView.summary:
+            return select(*_SUMMARY_COLUMNS)
+        return select(MangaModel).options(*MangaLoad.LIST.options)
+
+    @staticmethod
+    def _rows_to_view(rows, view: MangaView) -> TypedList[Union[Manga, MangaSummary]]:
+        if view == MangaView.summary:
+            return [
+                MangaSummary(**dict(zip(MangaSummary.model_fields, row)))
+                for row in rows
+            ]
+        return [Manga.model_validate(row[0]) for row in rows]
+
+    @staticmethod
+    def _apply_search(stmt: Select, search: Optional[str]):
+        """Add the search criteria to ``stmt`` and return it together with the
+        leading ``(column, ascending)`` sort keys the search implies.
 
-        # Sortierung nach Titel
-        if sort == "asc":
-            query = query.order_by(asc(MangaModel.title))
+        ``search`` uses the syntax of ``search_query``. All text terms go into
+        one FTS5 query (negated ones into a second one), the other fields into
+        indexed conditions, so the whole search stays a single statement.
+        """
+        if not search:
+            return stmt, []
+        query = parse_search_query(search)
+        matches, excluded, filtered = [], [], False
+        for term in query.terms:
+            if term.field is None or term.field in TEXT_FIELDS:
+                match = MangaRepository._fts_term_expression(term)
+                if match:
+                    (excluded if term.negated else matches).append(match)
+                continue
+            condition = MangaRepository._search_condition(term)
+            stmt = stmt.where(~condition if term.negated else condition)
+            filtered = True
+
+        if excluded:
+            stmt = stmt.where(
+                MangaModel.id.not_in(
+                    text(
+                        f"SELECT rowid AS manga_id FROM {MANGA_FTS_TABLE} "
+                        f"WHERE {MANGA_FTS_TABLE} MATCH :excluded"
+                    )
+                    .bindparams(excluded=" OR ".join(excluded))
+                    .columns(manga_id=Integer)
+                )
+            )
+        if matches:
+            fts = MangaRepository._fts_subquery(" AND ".join(matches))
+            stmt = stmt.join(fts, fts.c.manga_id == MangaModel.id)
+            return stmt, [(fts.c.score, True)]
+        if not (excluded or filtered or query.is_empty):
+            # Nothing indexable (e.g. only punctuation)
+            pattern = search_key(search)
+            return (
+                stmt.where(MangaModel.title_search.contains(pattern, autoescape=True)),
+                [],
+            )
+        return stmt, []
+
+    @staticmethod
+    def _fts_term_expression(term: SearchTerm) -> Optional[str]:
+        """FTS5 expression for a text term of the search syntax."""
+        if term.phrase:
+            words = re.findall(r"\w+", term.value)
+            match = f'"{" ".join(words)}"' if words else None
+        else:
+            match = MangaRepository._fts_match_expression(term.value)
+        if match and term.field:
+            return f"{TEXT_FIELDS[term.field]} : ({match})"
+        return f"({match})" if match else None
+
+    @staticmethod
+    def _search_condition(term: SearchTerm):
+        """Condition for a non-text field of the search syntax."""
+        if term.field == "list":
+            members = (
+                select(manga_list.c.manga_id)
+                .join(ListModel, ListModel.id == manga_list.c.list_id)
+                .where(ListModel.name.icontains(term.value, autoescape=True))
+            )
+            return MangaModel.id.in_(members)
+        if term.field == "reading" or (
+            term.field == "status" and term.value in ReadingStatus.__members__
+        ):
+            return MangaModel.reading_status == term.value
+        if term.field in ("status", "overall"):
+            return MangaModel.overall_status == term.value
+        if term.field == "lang":
+            variants = {term.value, term.value.upper(), term.value.lower()}
+            return MangaModel.language.in_(variants)
+        if term.field == "rating":
+            column = MangaModel.star_rating
         else:
-            query = query.order_by(desc(MangaModel.title))
+            column = owned_volume_count(MangaModel.id)
+        value = NUMERIC_FIELDS[term.field](term.value)
+        return _COMPARISONS[term.op](column, value)
+
+    @staticmethod
+    def _apply_filters(
+        stmt: Select, filters: Optional[MangaFilters], exclude: Optional[str] = None
+    ) -> Select:
+        """Add ``filters`` to ``stmt``, except the one of facet ``exclude``."""
+        if filters is None:
+            return stmt
+        for name, column in _FILTER_COLUMNS.items():
+            values = getattr(filters, name)
+            if values and name != exclude:
+                stmt = stmt.where(column.in_(values))
+        if exclude != "star_rating":
+            if filters.min_rating is not None:
+                stmt = stmt.where(MangaModel.star_rating >= filters.min_rating)
+            if filters.max_rating is not None:
+                stmt = stmt.where(MangaModel.star_rating <= filters.max_rating)
+        for name, (field, link_column, _) in _LINK_FACETS.items():
+            ids = getattr(filters, field)
+            if ids and name != exclude:
+                # Semi-join through the (related id, manga_id) index
+                members = select(link_column.table.c.manga_id).where(
+                    link_column.in_(ids)
+                )
+                stmt = stmt.where(MangaModel.id.in_(members))
+        return stmt
 
-        mangas = query.offset(skip).limit(limit).all()
-        return [Manga.model_validate(m) for m in mangas]
+    @staticmethod
+    def get_facets(
+        db: Session,
+        search: Optional[str] = None,
+        filters: Optional[MangaFilters] = None,
+    ) -> MangaFacets:
+        """Facet counts for the mangas ``get_page`` would return with the same
+        ``search`` and ``filters``."""
+        statements = MangaRepository._facet_statements(search, filters)
+        return MangaRepository._facets_result(
+            {name: db.execute(stmt).all() for name, stmt in statements.items()}
+        )
+
+    @staticmethod
+    def _facet_statements(
+        search: Optional[str], filters: Optional[MangaFilters]
+    ) -> Dict[str, Select]:
+        def narrow(stmt: Select, exclude: Optional[str] = None) -> Select:
+            stmt, _ = MangaRepository._apply_search(stmt, search)
+            return MangaRepository._apply_filters(stmt, filters, exclude)
+
+        count = func.count(MangaModel.id)
+        statements = {"total": narrow(select(count))}
+        columns = {**_FILTER_COLUMNS, "star_rating": MangaModel.star_rating}
+        for name, column in columns.items():
+            statements[name] = (
+                narrow(select(column, count), exclude=name)
+                .group_by(column)
+                .order_by(desc(count), column)
+            )
+        for name, (_, link_column, model) in _LINK_FACETS.items():
+            link = link_column.table
+            stmt = (
+                select(model.id, model.name, count)
+                .select_from(link)
+                .join(model, model.id == link_column)
+                .join(MangaModel, MangaModel.id == link.c.manga_id)
+            )
+            statements[name] = (
+                narrow(stmt, exclude=name)
+                .group_by(model.id)
+                .order_by(desc(count), model.name)
+                .limit(FACET_LIMIT)
+            )
+        return statements
+
+    @staticmethod
+    def _facets_result(results: Dict[str, list]) -> MangaFacets:
+        def option(value, count) -> FacetCount:
+            if isinstance(value, Enum):
+                value = value.value
+            label = "Unknown" if value is None else str(value)
+            return FacetCount(value=value, label=label, count=count)
+
+        facets = {"total": results.pop("total")[0][0]}
+        for name, rows in results.items():
+            if name in _LINK_FACETS:
+                facets[name] = [
+                    FacetCount(value=id_, label=label, count=count)
+                    for id_, label, count in rows
+                ]
+            else:
+                facets[name] = [option(value, count) for value, count in rows]
+        return MangaFacets(**facets)
+
+    @staticmethod
+    def _keyset_after(order, values):
+        """Criterion selecting the rows that sort after ``values``."""
+        if all(up for _, up in order) or not any(up for _, up in order):
+            # Row-value comparison lets SQLite seek the (title, id) index
+            position = tuple_(*(column for column, _ in order))
+            bound = tuple_(*values)
+            return position > bound if order[0][1] else position < bound
+        clauses = []
+        for i, (column, up) in enumerate(order):
+            ties = [c == v for (c, _), v in zip(order[:i], values[:i])]
+            clauses.append(
+                and_(*ties, column > values[i] if up else column < values[i])
+            )
+        return or_(*clauses)
 
     @staticmethod
-    def create_batch(db: Session, mangas: TypedList[MangaCreate]) -> TypedList[Manga]:
-        db_mangas = []
+    def search(db: Session, term: str, limit: int = 10) -> TypedList[MangaSearchResult]:
+        """Ranked full-text search with highlighted snippets."""
+        stmt = MangaRepository._search_statement(term, limit)
+        if stmt is None:
+            return []
+        return [MangaSearchResult(**row) for row in db.execute(stmt).mappings()]
+
+    @staticmethod
+    def _search_statement(term: str, limit: int):
+        match = MangaRepository._fts_match_expression(term)
+        if not match:
+            return None
+        return text(
+            f"SELECT m.id, m.title, m.cover_image, {_BM25} AS score, "
+            f"snippet({MANGA_FTS_TABLE}, -1, '<mark>', '</mark>', '…', 12) "
+            f"AS snippet FROM {MANGA_FTS_TABLE} "
+            f"JOIN mangas m ON m.id = {MANGA_FTS_TABLE}.rowid "
+            f"WHERE {MANGA_FTS_TABLE} MATCH :match ORDER BY score LIMIT :limit"
+        ).bindparams(match=match, limit=limit)
+
+    @staticmethod
+    def _fts_match_expression(term: str) -> Optional[str]:
+        """Turn free user input into an FTS5 query: every word becomes a quoted
+        prefix token, so operators and quotes typed by the user are inert."""
+        tokens = re.findall(r"\w+", term)
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    @staticmethod
+    def _fts_subquery(match: str):
+        return (
+            text(
+                f"SELECT rowid AS manga_id, {_BM25} AS score FROM {MANGA_FTS_TABLE} "
+                f"WHERE {MANGA_FTS_TABLE} MATCH :match"
+            )
+            .bindparams(match=match)
+            .columns(manga_id=Integer, score=Float)
+            .subquery("fts")
+        )
+
+    @staticmethod
+    def create_batch(db: Session, mangas: TypedList[MangaCreate]) -> ImportResponse:
+        """
+        Create many mangas in a single transaction.
+
+        Titles that already exist (same title and language, in the database or
+        earlier in the batch) are skipped. Authors, genres and lists are
+        resolved with one ``IN`` query per table, and mangas, volumes and
+        association rows are written with one bulk INSERT each. Returns a
+        per-item report like the MAL importer.
+        """
+        logs: TypedList[Optional[ImportResultDetail]] = [None] * len(mangas)
+
+        # Duplicate check in one pass
+        titles = {manga.title for manga in mangas}
+        seen = set(
+            db.execute(
+                select(MangaModel.title, MangaModel.language).where(
+                    MangaModel.title.in_(titles)
+                )
+            ).all()
+        )
+        pending = []
+        for index, manga in enumerate(mangas):
+            key = (manga.title, manga.language)
+            if key in seen:
+                logs[index] = ImportResultDetail(
+                    title=manga.title, status="skipped", info_code="MANGA_EXISTS"
+                )
+                continue
+            seen.add(key)
+            pending.append(index)
+
+        failures = {}
         try:
-            for manga in mangas:
-                db_manga = MangaRepository.create(db, manga)
-                db_mangas.append(db_manga)
-            return db_mangas
+            if pending:
+                downloads, failures = MangaRepository._insert_isolated(
+                    db, [mangas[i] for i in pending]
+                )
+                failures = {pending[i]: e for i, e in failures.items()}
+                BaseRepository.commit_session(db)
+                for manga_id, url in downloads:
+                    cover_downloader.submit(manga_id, url)
         except Exception as e:
             db.rollback()
-            raise ValueError(f"Failed to create manga batch: {e}")
+            logger.error("Failed to create manga batch: %s", e)
+            failures = {index: e for index in pending}
+
+        for index in pending:
+            if index in failures:
+                status, info_code = "failed", "IMPORT_ERROR"
+            else:
+                status, info_code = "imported", "IMPORTED_SUCCESS"
+            logs[index] = ImportResultDetail(
+                title=mangas[index].title, status=status, info_code=info_code
+            )
+        return ImportResponse(
+            total=len(mangas),
+            imported=len(pending) - len(failures),
+            skipped=len(mangas) - len(pending),
+            failed=len(failures),
+            logs=logs,
+        )
+
+    @staticmethod
+    def _insert_isolated(
+        db: Session, mangas: TypedList[MangaCreate]
+    ) -> Tuple[TypedList[Tuple[int, str]], Dict[int, Exception]]:
+        """Insert ``mangas`` so that a bad item only fails itself: in one bulk
+        insert under a savepoint, and if that fails, one by one under a
+        savepoint each. Returns the cover downloads to queue, and the
+        exceptions of the failed items by position."""
+        BaseRepository.begin(db)
+        try:
+            with db.begin_nested():
+                return MangaRepository._bulk_insert(db, mangas), {}
+        except Exception as e:
+            logger.warning("Batch insert failed, inserting one by one: %s", e)
+        downloads, failures = [], {}
+        for index, manga in enumerate(mangas):
+            try:
+                with db.begin_nested():
+                    downloads += MangaRepository._bulk_insert(db, [manga])
+            except Exception as e:
+                logger.error("Failed to create manga '%s': %s", manga.title, e)
+                failures[index] = e
+        return downloads, failures
+
+    @staticmethod
+    def _bulk_insert(
+        db: Session, mangas: TypedList[MangaCreate]
+    ) -> TypedList[Tuple[int, str]]:
+        """Insert ``mangas`` with their links and volumes. Returns the covers
+        to download as ``(manga id, url)``."""
+        authors = MangaRepository._resolve_names(
+            db, AuthorModel, {a.name for m in mangas for a in m.authors}
+        )
+        genres = MangaRepository._resolve_names(
+            db, GenreModel, {g.name for m in mangas for g in m.genres}
+        )
+        lists_ = MangaRepository._resolve_names(
+            db, ListModel, {lst.name for m in mangas for lst in m.lists}
+        )
+
+        # RETURNING order is not guaranteed for a multi-row INSERT in SQLite, so
+        # map ids back by (title, language), which is unique within the batch.
+        inserted = db.execute(
+            insert(MangaModel).returning(
+                MangaModel.title, MangaModel.language, MangaModel.id
+            ),
+            [
+                {
+                    "title": manga.title,
+                    "title_search": search_key(manga.title),
+                    "title_sort": sort_key(manga.title, manga.language),
+                    "japanese_title": manga.japanese_title,
+                    "reading_status": manga.reading_status,
+                    "overall_status": manga.overall_status,
+                    "star_rating": manga.star_rating,
+                    "language": manga.language,
+                    "category": manga.category,
+                    "summary": manga.summary,
+                    **MangaRepository._cover_fields(manga.cover_image),
+                }
+                for manga in mangas
+            ],
+        ).all()
+        manga_ids = {(title, language): id_ for title, language, id_ in inserted}
+
+        downloads = [
+            (manga_ids[(manga.title, manga.language)], manga.cover_image)
+            for manga in mangas
+            if _is_url(manga.cover_image)
+        ]
+
+        links = {manga_author: [], manga_genre: [], manga_list: []}
+        volumes, ranges = [], []
+        for manga in mangas:
+            manga_id = manga_ids[(manga.title, manga.language)]
+            for table, column, ids, names in (
+                (manga_author, "author_id", authors, manga.authors),
+                (manga_genre, "genre_id", genres, manga.genres),
+                (manga_list, "list_id", lists_, manga.lists),
+            ):
+                # dict.fromkeys drops repeated names while keeping their order
+                for name in dict.fromkeys(item.name for item in names):
+                    links[table].append({"manga_id": manga_id, column: ids[name]})
+            runs, rows = compact_volumes(manga.volumes)
+            volumes.extend(
+                {
+                    **volume.model_dump(),
+                    "manga_id": manga_id,
+                    "sort_key": volume_sort_key(volume.volume_number),
+                }
+                for volume in rows
+            )
+            ranges.extend(
+                {"manga_id": manga_id, "first_volume": first, "last_volume": last}
+                for first, last in runs
+            )
+
+        for table, rows in links.items():
+            if rows:
+                db.execute(insert(table), rows)
+        if volumes:
+            db.execute(insert(VolumeModel), volumes)
+        if ranges:
+            db.execute(insert(VolumeRangeModel), ranges)
+        _refresh_search_index(db)
+        return downloads
+
+    @staticmethod
+    def _resolve_names(db: Session, model, names) -> Dict[str, int]:
+        """Map each name to the id of its ``model`` row, creating missing rows."""
+        if not names:
+            return {}
+        ids = dict(
+            db.execute(select(model.name, model.id).where(model.name.in_(names))).all()
+        )
+        missing = [{"name": name} for name in names if name not in ids]
+        if missing:
+            ids.update(
+                db.execute(insert(model).returning(model.name, model.id), missing).all()
+            )
+        return ids
 
     @staticmethod
     def create(db: Session, manga_create: MangaCreate) -> Manga:
@@ -116,11 +990,7 @@ class MangaRepository(BaseRepository):
             BaseRepository.find_or_create(db, ListModel, ListModel.name, lst.name)
             for lst in manga_create.lists
         ]
-        volumes = [VolumeModel(**vol.model_dump()) for vol in manga_create.volumes]
-
-        cover_image_filename = MangaRepository._handle_cover_image(
-            manga_create.cover_image
-        )
+        ranges, rows = compact_volumes(manga_create.volumes)
 
         db_manga = MangaModel(
             title=manga_create.title,
@@ -131,23 +1001,27 @@ class MangaRepository(BaseRepository):
             language=manga_create.language,
             category=manga_create.category,
             summary=manga_create.summary,
-            cover_image=cover_image_filename,
+            **MangaRepository._cover_fields(manga_create.cover_image),
             authors=authors,
             genres=genres,
             lists=lists_,
-            volumes=volumes,
+            volume_rows=[VolumeModel(**vol.model_dump()) for vol in rows],
+            volume_ranges=[
+                VolumeRangeModel(first_volume=first, last_volume=last)
+                for first, last in ranges
+            ],
         )
         db.add(db_manga)
-        BaseRepository.commit_session(db)
+        # Author and genre manga counts are maintained by triggers (ddl.py)
+        BaseRepository.commit_session(db, _refresh_search_index)
+        if _is_url(manga_create.cover_image):
+            # The manga may still be rolled back with its write group
+            BaseRepository.after_commit(
+                db,
+                partial(cover_downloader.submit, db_manga.id, manga_create.cover_image),
+            )
         db.refresh(db_manga)
 
-        # Update manga counts
-        for author in authors:
-            author.manga_count = len(author.mangas)
-        for genre in genres:
-            genre.manga_count = len(genre.mangas)
-        BaseRepository.commit_session(db)
-
         return Manga.model_validate(db_manga)
 
     @staticmethod
@@ -156,22 +1030,12 @@ class MangaRepository(BaseRepository):
         if not db_manga:
             raise RepositoryError("Manga not found")
 
-        # Store old authors and genres for count update
-        old_authors = set(db_manga.authors)
-        old_genres = set(db_manga.genres)
-
-        # Handle cover image update
-        if manga_data.cover_image != db_manga.cover_image:
-            # Remove old cover image if it exists
-            if db_manga.cover_image is not None:
-                old_cover_path = os.path.join(
-                    settings.IMAGE_SAVE_PATH, str(db_manga.cover_image)
-                )
-                if os.path.exists(old_cover_path):
-                    try:
-                        os.remove(old_cover_path)
-                    except Exception as e:
-                        logger.warning("Failed to remove old cover image: %s", e)
+        # Covers no longer used by anything are removed on commit
+        images.release(
+            db,
+            settings.IMAGE_SAVE_PATH,
+            [db_manga.cover_image, *(v.cover_image for v in db_manga.volume_rows)],
+        )
 
         # Update scalar fields
         for field in [
@@ -183,9 +1047,15 @@ class MangaRepository(BaseRepository):
             "language",
             "category",
             "summary",
-            "cover_image",
         ]:
             setattr(db_manga, field, getattr(manga_data, field))
+        # A pending download keeps going until another cover is set
+        cover_changed = manga_data.cover_image != db_manga.cover_image
+        if cover_changed:
+            for field, value in MangaRepository._cover_fields(
+                manga_data.cover_image
+            ).items():
+                setattr(db_manga, field, value)
 
         # Update relationships
         db_manga.authors = [
@@ -203,30 +1073,34 @@ class MangaRepository(BaseRepository):
             for lst in manga_data.lists
         ]
 
-        # Handle volumes update
-        # Filter out id=0 (new volumes) to avoid conflicts with persistent instances
-        new_volumes = []
-        for vol in manga_data.volumes:
-            vol_data = vol.model_dump()
-            if vol_data.get("id") == 0:
-                del vol_data["id"]
-            new_volumes.append(VolumeModel(**vol_data))
-
-        db_manga.volumes = new_volumes
+        # Handle volumes update: plain volumes become ranges, which are only
+        # rewritten if they changed; other volumes keep their rows by id
+        ranges, rows = compact_volumes(manga_data.volumes)
+        stored = [(run.first_volume, run.last_volume) for run in db_manga.volume_ranges]
+        if ranges != stored:
+            db_manga.volume_ranges = [
+                VolumeRangeModel(first_volume=first, last_volume=last)
+                for first, last in ranges
+            ]
+        existing = {volume.id: volume for volume in db_manga.volume_rows}
+        volume_rows = []
+        for vol in rows:
+            volume = existing.pop(vol.id, None) or VolumeModel()
+            if volume.volume_number != vol.volume_number:
+                volume.volume_number = vol.volume_number
+            if volume.cover_image != vol.cover_image:
+                volume.cover_image = vol.cover_image
+            volume_rows.append(volume)
+        db_manga.volume_rows = volume_rows
 
-        BaseRepository.commit_session(db)
+        BaseRepository.commit_session(db, _refresh_search_index)
+        if cover_changed and _is_url(manga_data.cover_image):
+            BaseRepository.after_commit(
+                db,
+                partial(cover_downloader.submit, db_manga.id, manga_data.cover_image),
+            )
         db.refresh(db_manga)
 
-        # Update manga counts for both old and new authors/genres
-        all_authors = set(db_manga.authors) | old_authors
-        all_genres = set(db_manga.genres) | old_genres
-
-        for author in all_authors:
-            author.manga_count = len(author.mangas)
-        for genre in all_genres:
-            genre.manga_count = len(genre.mangas)
-        BaseRepository.commit_session(db)
-
         return Manga.model_validate(db_manga)
 
     @staticmethod
@@ -235,95 +1109,231 @@ class MangaRepository(BaseRepository):
         if not db_manga:
             raise RepositoryError("Manga not found")
 
-        # Store authors and genres for count update
-        authors = set(db_manga.authors)
-        genres = set(db_manga.genres)
+        deleted = Manga.model_validate(db_manga)
 
-        # Remove the cover image file if it exists.
-        if db_manga.cover_image is not None:
-            cover_path = os.path.join(
-                settings.IMAGE_SAVE_PATH, str(db_manga.cover_image)
-            )
-            if os.path.exists(cover_path):
-                try:
-                    os.remove(cover_path)
-                except Exception as e:
-                    logger.warning("Failed to remove cover image file: %s", e)
+        # Covers no longer used by anything are removed on commit
+        images.release(
+            db,
+            settings.IMAGE_SAVE_PATH,
+            [db_manga.cover_image, *(v.cover_image for v in db_manga.volume_rows)],
+        )
 
         db.delete(db_manga)
         BaseRepository.commit_session(db)
 
-        # Update manga counts
-        for author in authors:
-            author.manga_count = len(author.mangas)
-        for genre in genres:
-            genre.manga_count = len(genre.mangas)
-        BaseRepository.commit_session(db)
+        return deleted
 
-        return Manga.model_validate(db_manga)
+    @staticmethod
+    def get_by_genre(
+        db: Session, genre_id: int, view: MangaView = MangaView.full
+    ) -> TypedList[Union[Manga, MangaSummary]]:
+        stmt = MangaRepository._linked_statement(view, MangaModel.genres, genre_id)
+        return MangaRepository._rows_to_view(db.execute(stmt).all(), view)
 
     @staticmethod
-    def get_by_genre(db: Session, genre_id: int) -> TypedList[Manga]:
-        mangas = (
-            db.query(MangaModel)
-            .join(GenreModel, MangaModel.genres)
-            .filter(GenreModel.id == genre_id)
-            .all()
+    def get_by_author(
+        db: Session, author_id: int, view: MangaView = MangaView.full
+    ) -> TypedList[Union[Manga, MangaSummary]]:
+        stmt = MangaRepository._linked_statement(view, MangaModel.authors, author_id)
+        return MangaRepository._rows_to_view(db.execute(stmt).all(), view)
+
+    @staticmethod
+    def get_by_list(
+        db: Session, list_id: int, view: MangaView = MangaView.full
+    ) -> TypedList[Union[Manga, MangaSummary]]:
+        stmt = MangaRepository._linked_statement(view, MangaModel.lists, list_id)
+        return MangaRepository._rows_to_view(db.execute(stmt).all(), view)
+
+    @staticmethod
+    def _linked_statement(view: MangaView, relationship, related_id: int) -> Select:
+        """Mangas linked to the author, genre or list ``related_id`` through
+        ``relationship``."""
+        related = relationship.property.mapper.class_
+        return (
+            MangaRepository._select_view(view)
+            .join(relationship)
+            .where(related.id == related_id)
         )
+
+    @staticmethod
+    def get_by_star_rating(db: Session, rating: float) -> TypedList[Manga]:
+        mangas = db.scalars(MangaRepository._star_rating_statement(rating))
         return [Manga.model_validate(manga) for manga in mangas]
 
     @staticmethod
-    def get_by_author(db: Session, author_id: int) -> TypedList[Manga]:
-        mangas = (
-            db.query(MangaModel)
-            .join(AuthorModel, MangaModel.authors)
-            .filter(AuthorModel.id == author_id)
-            .all()
+    def _star_rating_statement(rating: float) -> Select:
+        return (
+            select(MangaModel)
+            .options(*MangaLoad.LIST.options)
+            .where(MangaModel.star_rating == rating)
         )
-        return [Manga.model_validate(manga) for manga in mangas]
 
     @staticmethod
-    def get_by_list(db: Session, list_id: int) -> TypedList[Manga]:
-        mangas = (
-            db.query(MangaModel)
-            .join(ListModel, MangaModel.lists)
-            .filter(ListModel.id == list_id)
-            .all()
+    def _cover_fields(cover_image: Optional[str]) -> dict:
+        """Column values for a cover given as an uploaded image name or as a
+        URL (from Mangapassion). URLs are downloaded in the background once
+        the manga is saved, see ``cover_downloads``."""
+        if _is_url(cover_image):
+            return {
+                "cover_image": None,
+                "cover_url": cover_image,
+                "cover_status": CoverStatus.pending,
+            }
+        return {
+            "cover_image": cover_image or None,
+            "cover_url": None,
+            "cover_status": CoverStatus.ready if cover_image else None,
+        }
+
+    @staticmethod
+    def set_downloaded_cover(
+        db: Session, manga_id: int, url: str, image: Optional[str]
+    ) -> bool:
+        """Record the download of ``url``: the stored ``image``, or None if it
+        failed. Ignored if the manga got another cover in the meantime."""
+        result = db.execute(
+            update(MangaModel)
+            .where(
+                MangaModel.id == manga_id,
+                MangaModel.cover_url == url,
+                MangaModel.cover_status == CoverStatus.pending,
+            )
+            .values(
+                cover_image=image,
+                cover_status=CoverStatus.ready if image else CoverStatus.failed,
+            )
         )
-        return [Manga.model_validate(manga) for manga in mangas]
+        BaseRepository.commit_session(db)
+        return result.rowcount > 0
 
     @staticmethod
-    def get_by_star_rating(db: Session, rating: float) -> TypedList[Manga]:
-        mangas = db.query(MangaModel).filter(MangaModel.star_rating == rating).all()
-        return [Manga.model_validate(manga) for manga in mangas]
+    def get_pending_covers(db: Session) -> TypedList[Tuple[int, str]]:
+        """``(manga id, url)`` of the covers still to download."""
+        return db.execute(
+            select(MangaModel.id, MangaModel.cover_url)
+            .where(MangaModel.cover_status == CoverStatus.pending)
+            .order_by(MangaModel.id)
+        ).all()
+
+
+class AsyncMangaRepository:
+    """Read-only counterpart of :class:`MangaRepository` for ``AsyncSession``.
+
+    Statements and row mapping are shared with the sync repository, only the
+    execution is awaited. All relationships are eager-loaded, so validating
+    the result never triggers lazy IO.
+    """
 
     @staticmethod
-    def _handle_cover_image(cover_image_url: Optional[str]) -> Optional[str]:
-        if not cover_image_url:
-            return None
+    async def get_by_id(db: AsyncSession, manga_id: int) -> Optional[Manga]:
+        result = await db.execute(MangaRepository._by_id_statement(manga_id))
+        manga = result.unique().scalar_one_or_none()
+        return Manga.model_validate(manga) if manga else None
 
-        # If it's a URL (from Mangapassion), download it
-        if cover_image_url.startswith(("http://", "https://")):
-            unique_id = str(uuid.uuid4())
-            filename = f"{unique_id}.jpg"
-            save_path = os.path.join(settings.IMAGE_SAVE_PATH, filename)
-            os.makedirs(settings.IMAGE_SAVE_PATH, exist_ok=True)
-            try:
-                # Check for SSL verification disable
-                verify_ssl = os.getenv("DISABLE_SSL_VERIFY", "false").lower() != "true"
-                if not verify_ssl:
-                    import urllib3
-
-                    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-                response = requests.get(cover_image_url, verify=verify_ssl)
-                response.raise_for_status()
-                with open(save_path, "wb") as f:
-                    f.write(response.content)
-                return filename
-            except Exception as e:
-                logger.warning("Failed to download cover image: %s", e)
-                return None
-        # If it's a filename (from direct upload), just return it
-        else:
-            return cover_image_url
+    @staticmethod
+    async def get_page(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 10,
+        search: Optional[str] = None,
+        sort: Optional[str] = "asc",
+        cursor: Optional[str] = None,
+        view: MangaView = MangaView.full,
+        filters: Optional[MangaFilters] = None,
+    ) -> Tuple[TypedList[Union[Manga, MangaSummary]], Optional[str]]:
+        generation = await get_data_generation_async(db) if search else None
+        stmt, order, suffix = MangaRepository._page_statement(
+            skip, limit, search, sort, cursor, view, filters, generation
+        )
+        rows = (await db.execute(stmt)).all()
+        fuzzy = None if rows else MangaRepository._fuzzy_text(search, skip, cursor)
+        if fuzzy:
+            titles, authors = MangaRepository._fuzzy_statements(fuzzy)
+            stmt = MangaRepository._fuzzy_page_statement(
+                fuzzy,
+                (await db.execute(titles)).all() + (await db.execute(authors)).all(),
+                limit,
+                view,
+                filters,
+            )
+            rows = (await db.execute(stmt)).all() if stmt is not None else []
+            return MangaRepository._rows_to_view(rows, view), None
+        return MangaRepository._page_result(rows, limit, order, view, suffix)
+
+    @staticmethod
+    async def get_next_missing_volume(
+        db: AsyncSession, manga_id: int
+    ) -> Optional[NextMissingVolume]:
+        stmt = MangaRepository._next_missing_statement(manga_id)
+        row = (await db.execute(stmt)).first()
+        return NextMissingVolume(**row._mapping) if row else None
+
+    @staticmethod
+    async def get_volume_gaps(
+        db: AsyncSession,
+        filters: Optional[MangaFilters] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> TypedList[VolumeGap]:
+        stmt = MangaRepository._volume_gaps_statement(filters, skip, limit)
+        return [VolumeGap(**row._mapping) for row in (await db.execute(stmt)).all()]
+
+    @staticmethod
+    async def find_similar(
+        db: AsyncSession,
+        title: str,
+        limit: int = 10,
+        threshold: float = similarity.DEFAULT_THRESHOLD,
+    ) -> TypedList[SimilarMatch]:
+        stmt = MangaRepository._similar_statement(title)
+        if stmt is None:
+            return []
+        rows = (await db.execute(stmt)).all()
+        return similarity.rank(title, rows, limit, threshold)
+
+    @staticmethod
+    async def get_facets(
+        db: AsyncSession,
+        search: Optional[str] = None,
+        filters: Optional[MangaFilters] = None,
+    ) -> MangaFacets:
+        statements = MangaRepository._facet_statements(search, filters)
+        return MangaRepository._facets_result(
+            {name: (await db.execute(stmt)).all() for name, stmt in statements.items()}
+        )
+
+    @staticmethod
+    async def search(
+        db: AsyncSession, term: str, limit: int = 10
+    ) -> TypedList[MangaSearchResult]:
+        stmt = MangaRepository._search_statement(term, limit)
+        if stmt is None:
+            return []
+        rows = (await db.execute(stmt)).mappings()
+        return [MangaSearchResult(**row) for row in rows]
+
+    @staticmethod
+    async def get_by_genre(
+        db: AsyncSession, genre_id: int, view: MangaView = MangaView.full
+    ) -> TypedList[Union[Manga, MangaSummary]]:
+        stmt = MangaRepository._linked_statement(view, MangaModel.genres, genre_id)
+        return MangaRepository._rows_to_view((await db.execute(stmt)).all(), view)
+
+    @staticmethod
+    async def get_by_author(
+        db: AsyncSession, author_id: int, view: MangaView = MangaView.full
+    ) -> TypedList[Union[Manga, MangaSummary]]:
+        stmt = MangaRepository._linked_statement(view, MangaModel.authors, author_id)
+        return MangaRepository._rows_to_view((await db.execute(stmt)).all(), view)
+
+    @staticmethod
+    async def get_by_list(
+        db: AsyncSession, list_id: int, view: MangaView = MangaView.full
+    ) -> TypedList[Union[Manga, MangaSummary]]:
+        stmt = MangaRepository._linked_statement(view, MangaModel.lists, list_id)
+        return MangaRepository._rows_to_view((await db.execute(stmt)).all(), view)
+
+    @staticmethod
+    async def get_by_star_rating(db: AsyncSession, rating: float) -> TypedList[Manga]:
+        mangas = await db.scalars(MangaRepository._star_rating_statement(rating))
+        return [Manga.model_validate(manga) for manga in mangas]
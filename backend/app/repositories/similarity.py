@@ -0,0 +1,100 @@
+"""Typo tolerant lookups on the trigram indexes (see ``ddl.TRIGRAM_INDEXES``).
+
+Candidates are the rows sharing the query's rarest trigrams, ranked by bm25,
+so the index only touches a bounded number of postings however common the
+other trigrams of the query are. Only those few candidates are compared
+exactly; nothing is computed over the whole table.
+"""
+
+import json
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from backend.app.ddl import TRIGRAM_INDEXES
+from backend.app.normalize import fold, similarity
+from backend.app.schemas import SimilarMatch
+
+# Candidates taken from the index before ranking by similarity
+CANDIDATES = 50
+
+# Trigrams of the query are used rarest first until they cover this many
+# index entries (at least one, at most MAX_TRIGRAMS)
+CANDIDATE_POSTINGS = 1000
+MAX_TRIGRAMS = 8
+
+# Minimum similarity of a match
+DEFAULT_THRESHOLD = 0.3
+
+# Similarity from which a new title is reported as a possible duplicate
+DUPLICATE_THRESHOLD = 0.6
+
+# Word similarity required of search results found by the typo fallback
+FUZZY_SEARCH_THRESHOLD = 0.5
+
+
+def query_trigrams(query: str) -> Optional[str]:
+    """The trigrams of ``query`` as the JSON array bound to ``:trigrams``, or
+    None if ``query`` is too short to look up."""
+    folded = fold(query)
+    grams = {folded[i : i + 3] for i in range(len(folded) - 2)}
+    grams = sorted(gram for gram in grams if gram.strip())
+    return json.dumps(grams) if grams else None
+
+
+def candidate_ids(index: str) -> str:
+    """Subquery for the ids of the best candidates; binds ``:trigrams``."""
+    rarest = (
+        f"SELECT term, doc, sum(doc) OVER (ORDER BY doc, term) AS postings "
+        f"FROM {index}_vocab WHERE term IN (SELECT value FROM json_each(:trigrams))"
+    )
+    # Trigrams not in the index at all are dropped by the join with the vocab
+    # table; without any left, the empty phrase matches nothing
+    match = (
+        "SELECT coalesce(group_concat("
+        "'\"' || replace(term, '\"', '\"\"') || '\"', ' OR '), '\"\"') "
+        f"FROM (SELECT term FROM ({rarest}) WHERE postings - doc < "
+        f"{CANDIDATE_POSTINGS} ORDER BY postings LIMIT {MAX_TRIGRAMS})"
+    )
+    return (
+        f"SELECT rowid FROM {index} WHERE {index} MATCH ({match}) "
+        f"ORDER BY rank LIMIT {CANDIDATES}"
+    )
+
+
+def candidates_statement(
+    index: str, query: str, columns: Sequence[str] = ()
+) -> Optional[TextClause]:
+    """Select ``id``, the indexed column and ``columns`` of the candidate
+    rows for ``query``, or None if ``query`` is too short to look up."""
+    trigrams = query_trigrams(query)
+    if trigrams is None:
+        return None
+    table, column = TRIGRAM_INDEXES[index]
+    selected = ", ".join(["id", column, *columns])
+    return text(
+        f"SELECT {selected} FROM {table} WHERE id IN ({candidate_ids(index)})"
+    ).bindparams(trigrams=trigrams)
+
+
+def rank(
+    query: str,
+    rows: Iterable,
+    limit: Optional[int],
+    threshold: float = DEFAULT_THRESHOLD,
+    measure: Callable[[str, str], float] = similarity,
+) -> List[SimilarMatch]:
+    """Most similar of the ``(id, name[, language])`` candidate rows."""
+    matches = []
+    for row in rows:
+        score = measure(query, row[1] or "")
+        if score >= threshold:
+            language = row[2] if len(row) > 2 else None
+            matches.append(
+                SimilarMatch(
+                    id=row[0], name=row[1], language=language, similarity=score
+                )
+            )
+    matches.sort(key=lambda match: (-match.similarity, match.name, match.id))
+    return matches[:limit]
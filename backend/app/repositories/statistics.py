@@ -1,95 +1,105 @@
 from enum import Enum
+from typing import List as TypedList
 
-from sqlalchemy import desc, func
+from sqlalchemy import column, desc, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.app.models import (
-    Author,
-    Genre,
-    List,
-    Manga,
-    Volume,
-    manga_author,
-    manga_genre,
-)
+from backend.app.ddl import STATISTICS_TABLE
+from backend.app.models import Author, Genre
 from backend.app.schemas import StatisticCount, Statistics
 
 
+def _label(label) -> str:
+    if label is None:
+        return "Unknown"
+    if isinstance(label, Enum):
+        return label.value
+    return str(label)
+
+
+def _rating_label(label) -> str:
+    if label == 0 or label is None:
+        return "Unrated"
+    return str(label)
+
+
+# Statistics field and label transform of each rollup dimension
+_DISTRIBUTIONS = {
+    "reading_status": ("reading_status_distribution", _label),
+    "overall_status": ("overall_status_distribution", _label),
+    "category": ("category_distribution", _label),
+    "star_rating": ("rating_distribution", _rating_label),
+}
+
+_rollup = table(STATISTICS_TABLE, column("dimension"), column("value"), column("count"))
+
+# Maintained by triggers, see ddl.py
+_ROLLUP = (
+    select(_rollup.c.dimension, _rollup.c.value, _rollup.c.count)
+    .where(_rollup.c.count > 0)
+    .order_by(_rollup.c.dimension, _rollup.c.value)
+)
+
+
+def _top(model):
+    # ``manga_count`` is kept current by triggers and indexed
+    return (
+        select(model.name, model.manga_count)
+        .where(model.manga_count > 0)
+        .order_by(desc(model.manga_count))
+        .limit(10)
+    )
+
+
+_TOP_LISTS = {
+    "top_genres": _top(Genre),
+    "top_authors": _top(Author),
+}
+
+
+def _from_rollup(rows) -> dict:
+    fields = {
+        "total_mangas": 0,
+        "total_volumes": 0,
+        "total_authors": 0,
+        "total_genres": 0,
+        "total_lists": 0,
+        **{name: [] for name, _ in _DISTRIBUTIONS.values()},
+    }
+    for dimension, value, count in rows:
+        if dimension == "total":
+            fields[f"total_{value}"] = count
+        else:
+            name, transform = _DISTRIBUTIONS[dimension]
+            fields[name].append(StatisticCount(label=transform(value), count=count))
+    return fields
+
+
+def _counts(rows) -> TypedList[StatisticCount]:
+    return [StatisticCount(label=name, count=count) for name, count in rows]
+
+
 class StatisticsRepository:
     @staticmethod
     def get_statistics(db: Session) -> Statistics:
-        # Total Counts
-        total_mangas = db.query(func.count(Manga.id)).scalar() or 0
-        total_volumes = db.query(func.count(Volume.id)).scalar() or 0
-        total_authors = db.query(func.count(Author.id)).scalar() or 0
-        total_genres = db.query(func.count(Genre.id)).scalar() or 0
-        total_lists = db.query(func.count(List.id)).scalar() or 0
-
-        # Helper for distributions
-        def get_distribution(model_field, transform_label=None):
-            results = db.query(model_field, func.count()).group_by(model_field).all()
-
-            dist_list = []
-            for label, count in results:
-                if transform_label:
-                    label_str = transform_label(label)
-                else:
-                    label_str = "Unknown"
-                    if label is not None:
-                        if isinstance(label, Enum):
-                            label_str = label.value
-                        else:
-                            label_str = str(label)
-                dist_list.append(StatisticCount(label=label_str, count=count))
-            return dist_list
-
-        def rating_transform(label):
-            if label == 0 or label is None:
-                return "Unrated"
-            return str(label)
-
-        reading_status_dist = get_distribution(Manga.reading_status)
-        overall_status_dist = get_distribution(Manga.overall_status)
-        category_dist = get_distribution(Manga.category)
-        rating_dist = get_distribution(
-            Manga.star_rating, transform_label=rating_transform
-        )
-
-        # Top Lists
-        top_genres = (
-            db.query(Genre.name, func.count(manga_genre.c.manga_id))
-            .join(manga_genre)
-            .group_by(Genre.id)
-            .order_by(desc(func.count(manga_genre.c.manga_id)))
-            .limit(10)
-            .all()
-        )
-        top_genres_list = [
-            StatisticCount(label=name, count=count) for name, count in top_genres
-        ]
-
-        top_authors = (
-            db.query(Author.name, func.count(manga_author.c.manga_id))
-            .join(manga_author)
-            .group_by(Author.id)
-            .order_by(desc(func.count(manga_author.c.manga_id)))
-            .limit(10)
-            .all()
-        )
-        top_authors_list = [
-            StatisticCount(label=name, count=count) for name, count in top_authors
-        ]
-
-        return Statistics(
-            total_mangas=total_mangas,
-            total_volumes=total_volumes,
-            total_authors=total_authors,
-            total_genres=total_genres,
-            total_lists=total_lists,
-            reading_status_distribution=reading_status_dist,
-            overall_status_distribution=overall_status_dist,
-            category_distribution=category_dist,
-            rating_distribution=rating_dist,
-            top_genres=top_genres_list,
-            top_authors=top_authors_list,
-        )
+        """Read the statistics from the trigger-maintained rollup and counters:
+        three small indexed queries, independent of the library size."""
+        rollup = _from_rollup(db.execute(_ROLLUP).all())
+        top_lists = {
+            name: _counts(db.execute(stmt).all()) for name, stmt in _TOP_LISTS.items()
+        }
+        return Statistics(**rollup, **top_lists)
+
+
+class AsyncStatisticsRepository:
+    """``StatisticsRepository`` for ``AsyncSession``, running the same queries."""
+
+    @staticmethod
+    async def get_statistics(db: AsyncSession) -> Statistics:
+        rollup = _from_rollup((await db.execute(_ROLLUP)).all())
+        top_lists = {
+            name: _counts((await db.execute(stmt)).all())
+            for name, stmt in _TOP_LISTS.items()
+        }
+        return Statistics(**rollup, **top_lists)
@@ -25,9 +25,12 @@ class UserRepository(BaseRepository):
         return db_user
 
     @staticmethod
-    def update_password(db: Session, user: User, password: str) -> User:
-        user.hashed_password = get_password_hash(password)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        return user
+    def set_password_hash(db: Session, username: str, hashed_password: str) -> bool:
+        """Store a password hashed with ``get_password_hash``. Returns False if
+        there is no such user."""
+        user = UserRepository.get_by_username(db, username)
+        if not user:
+            return False
+        user.hashed_password = hashed_password
+        BaseRepository.commit_session(db)
+        return True
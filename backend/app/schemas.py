@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -31,6 +31,12 @@ class Role(str, Enum):
     guest = "guest"
 
 
+class CoverStatus(str, Enum):
+    pending = "pending"
+    ready = "ready"
+    failed = "failed"
+
+
 # Schemas
 class AuthorBase(BaseModel):
     name: str
@@ -91,6 +97,9 @@ class VolumeCreate(VolumeBase):
 class Volume(VolumeBase):
     id: int
     manga_id: int
+    # Numeric value of volume_number, set by the server; volumes are returned
+    # ordered by it
+    sort_key: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -121,11 +130,111 @@ class Manga(MangaBase):
     genres: List[Genre]
     lists: List[ListModel]
     volumes: List[Volume]
+    # Owned whole volumes in range notation, e.g. "1-42,44,46-50"; read only
+    owned_volumes: str = ""
+    # Download state of a cover given as a URL; read only. The cover is
+    # missing while pending, show a placeholder.
+    cover_status: Optional[CoverStatus] = None
 
     class Config:
         from_attributes = True
 
 
+class MangaView(str, Enum):
+    full = "full"
+    summary = "summary"
+
+
+class MangaSummary(BaseModel):
+    """Slim projection of a manga for list views (Dashboard cards)."""
+
+    id: int
+    title: str
+    cover_image: Optional[str] = None
+    cover_status: Optional[CoverStatus] = None
+    reading_status: Optional[ReadingStatus] = None
+    overall_status: Optional[OverallStatus] = None
+    star_rating: Optional[float] = None
+    language: Optional[str] = None
+    category: Category
+    volume_count: int = 0
+
+
+class MangaSearchResult(BaseModel):
+    id: int
+    title: str
+    cover_image: Optional[str] = None
+    score: float
+    snippet: Optional[str] = None
+
+
+class NextMissingVolume(BaseModel):
+    manga_id: int
+    # Lowest whole volume number from 1 up that is not owned
+    volume_number: int
+    highest_owned: Optional[float] = None
+
+
+class VolumeGap(BaseModel):
+    """A run of whole volumes missing between owned ones (or before the first
+    owned one)."""
+
+    manga_id: int
+    title: str
+    language: Optional[str] = None
+    first_missing: int
+    last_missing: int
+    # Number of volumes in the gap
+    missing: int
+
+
+class SimilarMatch(BaseModel):
+    """A manga title or author name resembling the one looked up."""
+
+    id: int
+    name: str
+    language: Optional[str] = None
+    # Share of common trigrams, 1.0 for equal names after normalization
+    similarity: float
+
+
+class MangaFilters(BaseModel):
+    """Server-side filters for manga lists. Several values of one filter
+    match any of them; different filters must all match."""
+
+    category: List[Category] = []
+    reading_status: List[ReadingStatus] = []
+    overall_status: List[OverallStatus] = []
+    language: List[str] = []
+    min_rating: Optional[float] = Field(None, ge=0, le=5)
+    max_rating: Optional[float] = Field(None, ge=0, le=5)
+    genre_ids: List[int] = []
+    author_ids: List[int] = []
+    list_ids: List[int] = []
+
+
+class FacetCount(BaseModel):
+    # Enum value, language, rating, or the id of a genre/author/list
+    value: Optional[Union[int, float, str]] = None
+    label: str
+    count: int
+
+
+class MangaFacets(BaseModel):
+    """Number of mangas per filter option. Each facet applies all filters
+    except its own, so the counts show what selecting an option would add."""
+
+    total: int
+    category: List[FacetCount]
+    reading_status: List[FacetCount]
+    overall_status: List[FacetCount]
+    language: List[FacetCount]
+    star_rating: List[FacetCount]
+    genres: List[FacetCount]
+    authors: List[FacetCount]
+    lists: List[FacetCount]
+
+
 class SourceBase(BaseModel):
     name: str
     language: str
@@ -217,3 +326,21 @@ class ImportResponse(BaseModel):
     skipped: int
     failed: int
     logs: List[ImportResultDetail]
+
+
+class WriteQueueStats(BaseModel):
+    """Counters of the single-writer queue (see ``write_dispatcher``)."""
+
+    depth: int = 0
+    max_queue_size: int
+    max_depth: int = 0
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    batches: int = 0
+    # Jobs committed as part of a group, and groups retried job by job
+    grouped: int = 0
+    group_retries: int = 0
+    last_wait_ms: float = 0.0
+    last_run_ms: float = 0.0
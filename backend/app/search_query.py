@@ -0,0 +1,119 @@
+"""Parser for the search syntax of the manga list.
+
+A search is a sequence of whitespace separated terms, all of which must match:
+
+- ``naruto``, ``"one piece"``: free text and phrases, full-text searched
+- ``author:oda``, ``genre:"slice of life"``: full-text search in one column
+- ``list:favorites``: member of a list whose name contains the value
+  (``%`` and ``_`` are matched literally)
+- ``reading:completed``, ``overall:completed``: reading status, overall
+  (publication) status
+- ``status:completed``: reading status, or overall status for values only it
+  has, e.g. ``ongoing``; ``completed`` is taken as the reading status
+- ``lang:en``: language
+- ``rating>=4``, ``volumes>10``: comparisons with ``=``, ``<``, ``<=``, ``>``,
+  ``>=`` (``rating:4`` means ``rating=4``)
+- a leading ``-`` negates a term: ``-genre:horror``, ``-"box set"``
+
+Unknown prefixes are searched as text, so titles like ``Re:Zero`` still work.
+Parsing is cached because the list is paged and the same query comes in again
+for every page.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from backend.app.schemas import OverallStatus, ReadingStatus
+
+# Fields matched in a column of the full-text index
+TEXT_FIELDS = {"author": "authors", "genre": "genres"}
+# Fields compared with a number
+NUMERIC_FIELDS = {"rating": float, "volumes": int}
+# Fields naming a status, with the statuses each can take in matching order
+STATUS_FIELDS = {
+    "status": (ReadingStatus, OverallStatus),
+    "reading": (ReadingStatus,),
+    "overall": (OverallStatus,),
+}
+FIELDS = {*TEXT_FIELDS, *NUMERIC_FIELDS, *STATUS_FIELDS, "list", "lang"}
+
+COMPARISONS = ("=", "<", "<=", ">", ">=")
+
+_TOKEN = re.compile(
+    r"""
+    (?P<negated>-)?
+    (?:(?P<field>[a-z]+)(?P<op>:|>=|<=|>|<|=))?
+    (?:"(?P<quoted>[^"]*)"?|(?P<word>\S+))
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+@dataclass(frozen=True)
+class SearchTerm:
+    # None for free text
+    field: Optional[str]
+    value: str
+    op: str = ":"
+    negated: bool = False
+    # Quoted: match the words as a phrase
+    phrase: bool = False
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    terms: Tuple[SearchTerm, ...]
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.terms
+
+
+@lru_cache(maxsize=256)
+def parse_search_query(search: str) -> SearchQuery:
+    """Parse ``search`` into its terms. Raises ``ValueError`` for values a
+    field cannot take, e.g. ``rating>=high``."""
+    terms = []
+    for match in _TOKEN.finditer(search):
+        field = (match["field"] or "").lower()
+        op = match["op"]
+        phrase = match["quoted"] is not None
+        value = match["quoted"] if phrase else match["word"]
+        negated = bool(match["negated"])
+
+        if field not in FIELDS or (op != ":" and field not in NUMERIC_FIELDS):
+            # Not a field term: search the whole thing as text
+            text = match.group(0)[1:] if negated else match.group(0)
+            if field:
+                phrase = False
+                value = text
+            terms.append(SearchTerm(None, value, negated=negated, phrase=phrase))
+            continue
+        if not value.strip():
+            continue
+        if field in NUMERIC_FIELDS:
+            value = _number(field, value)
+            op = "=" if op == ":" else op
+        elif field in STATUS_FIELDS:
+            value = _status(field, value)
+        terms.append(SearchTerm(field, value, op, negated, phrase))
+    return SearchQuery(tuple(terms))
+
+
+def _number(field: str, value: str) -> str:
+    try:
+        NUMERIC_FIELDS[field](value)
+    except ValueError:
+        raise ValueError(f"{field} needs a number, got {value!r}")
+    return value
+
+
+def _status(field: str, value: str) -> str:
+    normalized = re.sub(r"[\s-]+", "_", value.strip().lower())
+    enums = STATUS_FIELDS[field]
+    if any(normalized in enum.__members__ for enum in enums):
+        return normalized
+    known = sorted({member for enum in enums for member in enum.__members__})
+    raise ValueError(f"Unknown {field} {value!r}, expected one of {', '.join(known)}")
@@ -1,17 +1,15 @@
 import os
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
 from ..config import IMAGE_PATH
-from .database import DOCKER_MODE, SQLALCHEMY_DATABASE_URL
+from .database import DOCKER_MODE, SQLALCHEMY_DATABASE_URL, create_sqlite_engine
 
 
 def get_image_path():
     # Create a temporary engine to read settings
-    temp_engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
+    temp_engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=temp_engine)
     db = SessionLocal()
 
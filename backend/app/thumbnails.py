@@ -0,0 +1,201 @@
+"""Resized variants of cover images.
+
+Covers are stored as downloaded or uploaded, often 1-3 MB, while the grid
+shows them 200px wide. Variants in a few fixed widths and formats are cached
+in ``.thumbnails`` inside the image directory, named after the original and
+regenerated whenever the original is newer. They are made on first request,
+or ahead of time by ``thumbnail_worker``; ``images`` removes them with their
+original.
+"""
+
+import logging
+import os
+import queue
+import threading
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from backend.app import images
+from backend.app.images import THUMBNAIL_DIR
+from backend.app.pausing import PauseGate
+
+logger = logging.getLogger(__name__)
+
+# Width in pixels; height follows the aspect ratio
+SIZES = {"small": 200, "medium": 400, "large": 800}
+
+# Pillow format, media type and encoder options, in order of preference
+_ENCODERS = {
+    "avif": ("AVIF", "image/avif", {"quality": 60, "speed": 8}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True}),
+}
+# AVIF and WebP depend on how Pillow was built
+FORMATS = {
+    name: encoder
+    for name, encoder in _ENCODERS.items()
+    if name == "jpeg" or features.check(name)
+}
+
+# Made ahead of time: the sizes the grid and the detail page use
+PREGENERATED_SIZES = ("small", "medium")
+
+
+class ThumbnailError(Exception):
+    """The original is missing or not an image Pillow can read."""
+
+    pass
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Best format the client accepts according to its ``Accept`` header;
+    JPEG is understood by everyone."""
+    accepted = {}
+    for part in (accept or "").lower().split(","):
+        media_type, *params = (item.strip() for item in part.split(";"))
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    pass
+        accepted[media_type] = quality
+    for name, (_, media_type, _) in FORMATS.items():
+        if accepted.get(media_type, 0) > 0:
+            return name
+    return "jpeg"
+
+
+def media_type(fmt: str) -> str:
+    return FORMATS[fmt][1]
+
+
+def thumbnail_path(image_dir: str, filename: str, size: str, fmt: str) -> str:
+    return os.path.join(image_dir, THUMBNAIL_DIR, size, f"{filename}.{fmt}")
+
+
+def _is_current(path: str, source: str) -> bool:
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def get_thumbnail(image_dir: str, filename: str, size: str, fmt: str) -> str:
+    """Path of the ``size`` variant of ``filename`` in ``fmt``, made first if
+    it is missing or older than the original."""
+    source = images.path(image_dir, filename)
+    target = thumbnail_path(image_dir, filename, size, fmt)
+    if not _is_current(target, source):
+        make_thumbnail(source, target, SIZES[size], fmt)
+    return target
+
+
+def make_thumbnail(source: str, target: str, width: int, fmt: str) -> None:
+    """Scale ``source`` down to ``width`` and write it to ``target``. The
+    file is renamed into place, so readers never see a partial variant."""
+    pillow_format, _, options = FORMATS[fmt]
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            # Never scales up
+            image.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+            if pillow_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGB" if pillow_format == "JPEG" else "RGBA")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            partial = f"{target}.{threading.get_ident()}.tmp"
+            try:
+                image.save(partial, pillow_format, **options)
+                os.replace(partial, target)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f"Cannot make a thumbnail of {source}: {e}") from e
+
+
+def pregenerate(image_dir: str, filename: str) -> None:
+    for size in PREGENERATED_SIZES:
+        for fmt in FORMATS:
+            get_thumbnail(image_dir, filename, size, fmt)
+
+
+class ThumbnailWorker:
+    """Background thread making the pregenerated variants of new covers and,
+    on startup, of any existing ones still missing them."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Paused while the image directory is replaced
+        self.gate = PauseGate()
+
+    def submit(self, image_dir: str, filename: str) -> None:
+        self._ensure_started()
+        self._queue.put((image_dir, filename))
+
+    def backfill(self, image_dir: str) -> None:
+        """Queue every image in ``image_dir`` that lacks a variant. The
+        directory is scanned on the worker thread, a large library would
+        hold up the caller."""
+        self._ensure_started()
+        self._queue.put((image_dir, None))
+
+    def _scan(self, image_dir: str) -> None:
+        queued = 0
+        for filename, source in images.stored_files(image_dir):
+            if not all(
+                _is_current(thumbnail_path(image_dir, filename, size, fmt), source)
+                for size in PREGENERATED_SIZES
+                for fmt in FORMATS
+            ):
+                self.submit(image_dir, filename)
+                queued += 1
+        if queued:
+            logger.info("Queued %d images for thumbnails", queued)
+
+    def join(self) -> None:
+        """Wait until everything queued so far is done."""
+        self._queue.join()
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="thumbnail-worker", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                image_dir, filename = item
+                with self.gate.working():
+                    if filename is None:
+                        self._scan(image_dir)
+                    else:
+                        pregenerate(image_dir, filename)
+            except ThumbnailError as e:
+                logger.warning("%s", e)
+            except Exception:
+                logger.exception(
+                    "Thumbnail generation failed for %s", item[1] or item[0]
+                )
+            finally:
+                self._queue.task_done()
+
+
+thumbnail_worker = ThumbnailWorker()
@@ -0,0 +1,87 @@
+"""Volume numbers and their storage.
+
+``volume_number`` is free text ("10", "3.5", "Vol. 4", "Special"). Its numeric
+value is stored as ``sort_key`` so volumes can be ordered and checked for gaps
+in SQL; numbers without a value ("Special") get no key and sort last.
+"""
+
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+_VOLUME_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+T = TypeVar("T")
+
+
+def sort_key(volume_number: Optional[str]) -> Optional[float]:
+    """Numeric value of the first number in ``volume_number``."""
+    if not volume_number:
+        return None
+    match = _VOLUME_NUMBER.search(volume_number)
+    if match is None:
+        return None
+    return float(match[0].replace(",", "."))
+
+
+# Whole volumes without data of their own (no cover) are stored as runs in
+# ``volume_ranges``: "1-42,44,46-50" takes three rows, not 48. Storage and
+# update cost grow with the number of gaps. Everything else stays a row in
+# ``volumes``.
+
+
+class RangeVolume(NamedTuple):
+    """A volume expanded from a range; looks like a ``volumes`` row without
+    an id of its own."""
+
+    id: int
+    manga_id: int
+    volume_number: str
+    cover_image: Optional[str]
+    sort_key: float
+
+
+def is_plain(volume_number: Optional[str], cover_image: Optional[str]) -> bool:
+    """Whether a volume can be stored as part of a range: a whole number in
+    canonical form ("7", not "07" or "Vol. 7") and no cover."""
+    return (
+        not cover_image
+        and volume_number is not None
+        and volume_number.isascii()
+        and volume_number.isdigit()
+        and volume_number == str(int(volume_number))
+    )
+
+
+def to_ranges(numbers: Iterable[int]) -> List[Tuple[int, int]]:
+    """Runs of consecutive ``numbers`` as ``(first, last)`` pairs."""
+    ranges: List[Tuple[int, int]] = []
+    for number in sorted(set(numbers)):
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], number)
+        else:
+            ranges.append((number, number))
+    return ranges
+
+
+def format_ranges(ranges: Iterable[Tuple[int, int]]) -> str:
+    return ",".join(
+        str(first) if first == last else f"{first}-{last}" for first, last in ranges
+    )
+
+
+def compact(volumes: Iterable[T]) -> Tuple[List[Tuple[int, int]], List[T]]:
+    """Split ``volumes`` into the ranges of plain volumes and the volumes that
+    need a row."""
+    plain, rows = [], []
+    for volume in volumes:
+        if is_plain(volume.volume_number, volume.cover_image):
+            plain.append(int(volume.volume_number))
+        else:
+            rows.append(volume)
+    return to_ranges(plain), rows
+
+
+def expand(manga_id: int, ranges: Iterable[Tuple[int, int]]) -> Iterator[RangeVolume]:
+    for first, last in ranges:
+        for number in range(first, last + 1):
+            yield RangeVolume(0, manga_id, str(number), None, float(number))
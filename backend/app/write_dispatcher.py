@@ -0,0 +1,203 @@
+"""Single writer for all mutating repository calls.
+
+SQLite allows one write transaction at a time. Writes from request threads and
+imports that run concurrently wait on each other's locks and fail with
+"database is locked" once ``busy_timeout`` runs out. Instead, writes are put on
+a bounded queue and executed one after another by a dedicated writer thread.
+Reads keep using their own sessions from the pool.
+
+Small writes can opt into group commit: consecutive groupable jobs run in one
+transaction and share a single commit. Each job runs under its own savepoint,
+so a failing job is rolled back alone and never takes the others down with
+it. Only if the shared commit itself fails are the jobs retried one by one.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.app import database
+from backend.app.pausing import PauseGate
+from backend.app.repositories.base import GROUP_COMMIT, BaseRepository, RepositoryError
+from backend.app.schemas import WriteQueueStats
+
+logger = logging.getLogger(__name__)
+
+# Tells the writer thread to exit
+_STOP = object()
+
+
+class WriteQueueFull(RepositoryError):
+    """Raised when a write could not be queued within the submit timeout."""
+
+    pass
+
+
+@dataclass
+class _Job:
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    groupable: bool
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class WriteDispatcher:
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        max_queue_size: int = 256,
+        max_group_size: int = 32,
+        submit_timeout: float = 10.0,
+    ):
+        # Looked up on use, so tests and the database import can swap it
+        self._session_factory = session_factory or (lambda: database.SessionLocal())
+        self.max_group_size = max_group_size
+        self.submit_timeout = submit_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = WriteQueueStats(max_queue_size=max_queue_size)
+        # Paused while the database file is copied or replaced
+        self.gate = PauseGate()
+
+    def submit(self, fn: Callable[..., Any], *args, groupable: bool = False, **kwargs):
+        """Run ``fn(session, *args, **kwargs)`` on the writer thread and return
+        its result, re-raising whatever it raised.
+
+        Blocks the calling thread until the write is done. ``groupable`` marks
+        short writes that may share a commit with other queued writes; bulk
+        operations that manage their own transaction must leave it off.
+        """
+        self._ensure_started()
+        job = _Job(fn, args, kwargs, groupable)
+        try:
+            self._queue.put(job, timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats.rejected += 1
+            raise WriteQueueFull("Too many pending writes, try again later")
+        with self._lock:
+            self._stats.submitted += 1
+            self._stats.max_depth = max(self._stats.max_depth, self._queue.qsize())
+        return job.future.result()
+
+    def stats(self) -> WriteQueueStats:
+        with self._lock:
+            return self._stats.model_copy(update={"depth": self._queue.qsize()})
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Finish the queued writes, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        # Started lazily: the app's lifespan does not run under every server or
+        # test client
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="db-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        carry = None
+        while True:
+            job = carry if carry is not None else self._queue.get()
+            carry = None
+            if job is _STOP:
+                return
+            group = [job]
+            while job.groupable and len(group) < self.max_group_size:
+                try:
+                    queued = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if queued is _STOP or not queued.groupable:
+                    carry = queued
+                    break
+                group.append(queued)
+            with self.gate.working():
+                self._execute(group)
+
+    def _execute(self, group) -> None:
+        started = time.monotonic()
+        wait_ms = max(started - job.enqueued_at for job in group) * 1000
+        if len(group) == 1 or not self._run_group(group):
+            for job in group:
+                self._run_single(job)
+        with self._lock:
+            self._stats.batches += 1
+            self._stats.last_wait_ms = round(wait_ms, 3)
+            self._stats.last_run_ms = round((time.monotonic() - started) * 1000, 3)
+
+    def _run_group(self, group) -> bool:
+        """Run ``group`` in one transaction, each job under a savepoint: a job
+        that raises is rolled back alone and gets its exception. Returns
+        False, with everything rolled back, if the commit failed."""
+        db = self._session_factory()
+        db.info[GROUP_COMMIT] = True
+        outcomes = []
+        try:
+            BaseRepository.begin(db)
+            for job in group:
+                savepoint = db.begin_nested()
+                try:
+                    result = job.fn(db, *job.args, **job.kwargs)
+                except Exception as e:
+                    savepoint.rollback()
+                    outcomes.append((False, e))
+                else:
+                    savepoint.commit()
+                    outcomes.append((True, result))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.info(
+                "Group of %d writes failed (%s), retrying one by one", len(group), e
+            )
+            with self._lock:
+                self._stats.group_retries += 1
+            return False
+        finally:
+            db.close()
+        for job, (succeeded, outcome) in zip(group, outcomes):
+            if succeeded:
+                job.future.set_result(outcome)
+            else:
+                job.future.set_exception(outcome)
+        with self._lock:
+            failed = sum(not succeeded for succeeded, _ in outcomes)
+            self._stats.completed += len(group) - failed
+            self._stats.failed += failed
+            self._stats.grouped += len(group)
+        return True
+
+    def _run_single(self, job: _Job) -> None:
+        db = self._session_factory()
+        try:
+            result = job.fn(db, *job.args, **job.kwargs)
+        except BaseException as e:
+            job.future.set_exception(e)
+            with self._lock:
+                self._stats.failed += 1
+        else:
+            job.future.set_result(result)
+            with self._lock:
+                self._stats.completed += 1
+        finally:
+            db.close()
+
+
+write_dispatcher = WriteDispatcher()
@@ -60,9 +60,39 @@ def save_config(config):
         json.dump(config, f, indent=4)
 
 
+# SQLite connection tuning applied to every new connection. ``busy_timeout``
+# comes first so the remaining pragmas (especially switching the journal mode)
+# wait for a lock instead of failing immediately.
+DEFAULT_SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # negative values are KiB, i.e. 64 MiB
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+
+def get_sqlite_pragmas(config):
+    """Merge the default pragmas with the optional ``sqlite_pragmas`` section of
+    config.json and ``SQLITE_<PRAGMA>`` environment overrides (e.g.
+    ``SQLITE_JOURNAL_MODE=DELETE``). Unknown pragma names are ignored."""
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    for name, value in config.get("sqlite_pragmas", {}).items():
+        if name in DEFAULT_SQLITE_PRAGMAS:
+            pragmas[name] = value
+    for name in DEFAULT_SQLITE_PRAGMAS:
+        env_value = os.getenv(f"SQLITE_{name.upper()}")
+        if env_value:
+            pragmas[name] = env_value
+    return pragmas
+
+
 # Load configuration
 config = load_config()
 
 # Export settings
 DATABASE_PATH = config["database_path"]
 IMAGE_PATH = config["image_path"]
+SQLITE_PRAGMAS = get_sqlite_pragmas(config)
@@ -1,11 +1,15 @@
 import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 from typing import AsyncGenerator, Generator
 
 import pytest
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 # Set env vars for testing
 os.environ["API_TOKEN"] = "test-token"
@@ -15,32 +19,58 @@ from backend.app.api.deps import (  # noqa: E402
     get_current_active_superuser,
     get_current_user,
 )
-from backend.app.database import get_db  # noqa: E402
+from backend.app.database import (  # noqa: E402
+    create_async_sqlite_engine,
+    create_sqlite_engine,
+    get_async_db,
+    get_db,
+)
 from backend.app.main import app  # noqa: E402
 from backend.app.models import Base, Role, User  # noqa: E402
 from backend.app.repositories.source import SourceRepository  # noqa: E402
 from backend.app.schemas import SourceCreate  # noqa: E402
 
-# Use in-memory SQLite database for tests
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Use a throwaway SQLite file for tests: the sync session and the async
+# endpoints open separate connections and must see the same database
+TEST_DB_DIR = tempfile.mkdtemp(prefix="mymangadb-tests-")
+TEST_DB_PATH = os.path.join(TEST_DB_DIR, "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# With the production pragmas (WAL, foreign keys, busy timeout)
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# aiosqlite connections must not outlive the per-test event loop
+async_engine = create_async_sqlite_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 # Override the production SessionLocal and engine with the test one
 from backend.app import database, main  # noqa: E402
 
 database.SessionLocal = TestingSessionLocal
 database.engine = engine
+database.async_engine = async_engine
+database.AsyncSessionLocal = TestingAsyncSessionLocal
 main.SessionLocal = TestingSessionLocal
 main.engine = engine
 
 
+@pytest.fixture(scope="session", autouse=True)
+def test_database_file() -> Generator:
+    yield TEST_DB_PATH
+    engine.dispose()
+    shutil.rmtree(TEST_DB_DIR, ignore_errors=True)
+
+
+async def override_get_async_db() -> AsyncGenerator:
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
+
 @pytest.fixture(scope="function")
 def db_session() -> Generator:
     # Create tables
@@ -63,9 +93,16 @@ def db_session() -> Generator:
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+async def async_db_session(db_session) -> AsyncGenerator:
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
+
 @pytest.fixture(scope="function")
 async def client(db_session) -> AsyncGenerator:
     app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
     # Override auth
     mock_user = User(id=1, username="testuser", role=Role.admin)
@@ -79,3 +116,34 @@ async def client(db_session) -> AsyncGenerator:
         yield ac
 
     app.dependency_overrides.clear()
+
+
+class QueryCounter:
+    """Counts the SQL statements executed on ``engine`` while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @contextmanager
+    def __call__(self):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@pytest.fixture(scope="function")
+def count_queries() -> QueryCounter:
+    """``with count_queries() as counter: ...`` then assert on
+    ``counter.count`` to pin the number of queries a repository call issues."""
+    return QueryCounter(engine)
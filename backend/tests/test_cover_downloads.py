@@ -0,0 +1,200 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+import requests
+from sqlalchemy.orm import Session
+
+from backend.app import cover_downloads, images
+from backend.app.cover_downloads import CoverDownloader, cover_downloader, fetch
+from backend.app.repositories.base import RepositoryError
+from backend.app.repositories.manga import MangaRepository
+from backend.app.schemas import Category, CoverStatus, MangaCreate
+from backend.app.write_dispatcher import WriteDispatcher
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"cover"
+URL = "https://example.com/covers/1.jpg"
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    with patch("backend.app.settings.IMAGE_SAVE_PATH", str(tmp_path)):
+        yield tmp_path
+
+
+class StaticAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with ``body``, streamed like a socket."""
+
+    def __init__(self, body: bytes, headers=None):
+        super().__init__()
+        self.body = body
+        self.headers = headers or {}
+        self.read = 0
+
+    def send(self, request, **kwargs):
+        adapter = self
+
+        class Body(io.BytesIO):
+            def read(self, size=-1, **kwargs):
+                chunk = super().read(size)
+                adapter.read += len(chunk)
+                return chunk
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers.update(self.headers)
+        response.raw = Body(self.body)
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def _session(body: bytes, headers=None):
+    session = requests.Session()
+    adapter = StaticAdapter(body, headers)
+    session.mount("https://", adapter)
+    return session, adapter
+
+
+def test_fetch_streams_into_the_store(image_dir):
+    big = PNG + b"\0" * (1024 * 1024)
+    session, _ = _session(big)
+    name = fetch(session, URL)
+    assert name.endswith(".png")
+    assert os.path.getsize(images.path(str(image_dir), name)) == len(big)
+
+    with patch.object(images, "MAX_IMAGE_BYTES", 1024):
+        session, adapter = _session(big, {"Content-Length": str(len(big))})
+        with pytest.raises(images.ImageTooLarge):
+            fetch(session, URL)
+        assert adapter.read == 0
+        session, adapter = _session(big)
+        with pytest.raises(images.ImageTooLarge):
+            fetch(session, URL)
+        assert adapter.read < len(big)
+    session, adapter = _session(b"<!DOCTYPE html><html>" + b" " * (1024 * 1024))
+    with pytest.raises(images.InvalidImage):
+        fetch(session, URL)
+    assert adapter.read <= cover_downloads.CHUNK_SIZE
+    assert os.listdir(image_dir / ".incoming") == []
+
+
+def _manga(title: str, cover_image=URL) -> MangaCreate:
+    return MangaCreate(
+        title=title,
+        category=Category.manga,
+        cover_image=cover_image,
+        authors=[],
+        genres=[],
+        lists=[],
+        volumes=[],
+    )
+
+
+def test_create_queues_cover_url(db_session: Session, image_dir):
+    with patch.object(cover_downloader, "submit") as submit:
+        manga = MangaRepository.create(db_session, _manga("Queued"))
+        MangaRepository.create_batch(
+            db_session, [_manga("Batched"), _manga("Uploaded", "cover.jpg")]
+        )
+
+    assert manga.cover_image is None
+    assert manga.cover_status == CoverStatus.pending
+    batched = MangaRepository.get_by_title(db_session, "Batched")
+    uploaded = MangaRepository.get_by_title(db_session, "Uploaded")
+    assert [call.args for call in submit.call_args_list] == [
+        (manga.id, URL),
+        (batched.id, URL),
+    ]
+    assert uploaded.cover_status == CoverStatus.ready
+    assert MangaRepository.get_pending_covers(db_session) == [
+        (manga.id, URL),
+        (batched.id, URL),
+    ]
+
+    name = images.store(str(image_dir), PNG)
+    assert MangaRepository.set_downloaded_cover(db_session, manga.id, URL, name)
+    # Only a pending download of the same URL is recorded
+    assert not MangaRepository.set_downloaded_cover(db_session, manga.id, URL, None)
+    db_session.expire_all()
+    manga = MangaRepository.get_by_title(db_session, "Queued")
+    assert (manga.cover_image, manga.cover_status) == (name, CoverStatus.ready)
+
+
+def test_grouped_create_queues_download_after_commit(db_session: Session, image_dir):
+    def create_and_fail(db, manga):
+        MangaRepository.create(db, manga)
+        raise RepositoryError("Rejected")
+
+    dispatcher = WriteDispatcher()
+    started, release = threading.Event(), threading.Event()
+    threading.Thread(
+        target=dispatcher.submit,
+        args=(lambda db: started.set() or release.wait(5),),
+        daemon=True,
+    ).start()
+    started.wait(5)
+    with patch.object(cover_downloader, "submit") as submit, ThreadPoolExecutor(
+        2
+    ) as pool:
+        rejected = pool.submit(
+            dispatcher.submit,
+            create_and_fail,
+            _manga("Rejected", "https://example.com/rejected.jpg"),
+            groupable=True,
+        )
+        while dispatcher.stats().depth < 1:
+            time.sleep(0.01)
+        kept = pool.submit(
+            dispatcher.submit, MangaRepository.create, _manga("Kept"), groupable=True
+        )
+        while dispatcher.stats().depth < 2:
+            time.sleep(0.01)
+        release.set()
+        kept = kept.result(timeout=5)
+        with pytest.raises(RepositoryError):
+            rejected.result(timeout=5)
+    dispatcher.shutdown(timeout=5)
+
+    # Queued once the group committed, not for the rolled back manga
+    assert [call.args for call in submit.call_args_list] == [(kept.id, URL)]
+
+
+def test_workers_record_downloads(db_session: Session, image_dir):
+    def fetch(session, url):
+        if url.endswith("missing.jpg"):
+            raise requests.HTTPError("404 Client Error")
+        if url.endswith("unwritable.jpg"):
+            raise PermissionError("Permission denied")
+        return images.store(str(image_dir), PNG)
+
+    with patch.object(cover_downloader, "submit"):
+        found = MangaRepository.create(db_session, _manga("Found"))
+        missing = MangaRepository.create(
+            db_session, _manga("Missing", "https://example.com/missing.jpg")
+        )
+        MangaRepository.create(
+            db_session, _manga("Unwritable", "https://example.com/unwritable.jpg")
+        )
+
+    downloader = CoverDownloader(workers=2)
+    with patch.object(cover_downloads, "fetch", fetch):
+        assert downloader.requeue_pending() == 3
+        downloader.join()
+    downloader.shutdown(timeout=5)
+
+    db_session.expire_all()
+    found = MangaRepository.get_by_title(db_session, "Found")
+    missing = MangaRepository.get_by_title(db_session, "Missing")
+    assert found.cover_status == CoverStatus.ready
+    assert found.cover_image == images.store(str(image_dir), PNG)
+    assert (missing.cover_image, missing.cover_status) == (None, CoverStatus.failed)
+    unwritable = MangaRepository.get_by_title(db_session, "Unwritable")
+    assert unwritable.cover_status == CoverStatus.failed
+    assert MangaRepository.get_pending_covers(db_session) == []
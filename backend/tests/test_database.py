@@ -0,0 +1,159 @@
+import asyncio
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from backend.app import database
+from backend.app.api.v1.endpoints import database as database_endpoint
+from backend.app.api.v1.endpoints import settings as settings_endpoint
+from backend.app.database import (
+    create_async_sqlite_engine,
+    create_sqlite_engine,
+    get_effective_pragmas,
+)
+from backend.app.write_dispatcher import write_dispatcher
+from backend.config import get_sqlite_pragmas
+
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    try:
+        pragmas = get_effective_pragmas(engine)
+    finally:
+        engine.dispose()
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["foreign_keys"] == 1
+    assert pragmas["busy_timeout"] == 5000
+    assert pragmas["temp_store"] == 2  # MEMORY
+
+
+def test_suite_runs_with_production_pragmas(db_session):
+    pragmas = get_effective_pragmas(database.engine)
+    assert (pragmas["journal_mode"], pragmas["foreign_keys"]) == ("wal", 1)
+
+
+def test_sqlite_pragmas_config_and_env_overrides(monkeypatch):
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "FULL")
+    pragmas = get_sqlite_pragmas(
+        {"sqlite_pragmas": {"cache_size": -2000, "not_a_pragma": 1}}
+    )
+
+    assert pragmas["cache_size"] == -2000
+    assert pragmas["synchronous"] == "FULL"
+    assert pragmas["journal_mode"] == "WAL"
+    assert "not_a_pragma" not in pragmas
+
+
+async def test_moving_the_database_keeps_wal_commits(tmp_path, monkeypatch):
+    old_path, new_path = tmp_path / "old.db", tmp_path / "moved" / "new.db"
+    old_url = f"sqlite:///{old_path}"
+    monkeypatch.setattr(database, "engine", create_sqlite_engine(old_url))
+    monkeypatch.setattr(database, "async_engine", create_async_sqlite_engine(old_url))
+    config = {"database_path": str(old_path)}
+    monkeypatch.setattr(settings_endpoint, "load_config", lambda: config)
+    monkeypatch.setattr(settings_endpoint, "save_config", config.update)
+    bindings = database.SessionLocal.kw["bind"], database.AsyncSessionLocal.kw["bind"]
+    try:
+        with database.engine.begin() as connection:
+            connection.exec_driver_sql("CREATE TABLE kept (value TEXT)")
+            connection.exec_driver_sql("INSERT INTO kept VALUES ('committed')")
+        # The commit is still in the write-ahead log only
+        assert os.path.getsize(f"{old_path}-wal") > 0
+
+        await settings_endpoint.create_or_update_setting(
+            "database_path", str(new_path), migrate=True
+        )
+
+        assert not any(
+            os.path.exists(f"{old_path}{suffix}") for suffix in ("", "-wal", "-shm")
+        )
+        assert database.engine.url.database == str(new_path)
+        with database.SessionLocal() as db:
+            assert db.execute(text("SELECT value FROM kept")).scalar() == "committed"
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(text("SELECT count(*) FROM kept"))
+            assert result.scalar() == 1
+        assert config["database_path"] == str(new_path)
+    finally:
+        database.engine.dispose()
+        await database.async_engine.dispose()
+        database.SessionLocal.configure(bind=bindings[0])
+        database.AsyncSessionLocal.configure(bind=bindings[1])
+
+
+async def _until(condition, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def test_switching_the_database_holds_queued_writes(tmp_path, monkeypatch):
+    old_path, new_path = tmp_path / "old.db", tmp_path / "moved" / "new.db"
+    old_url = f"sqlite:///{old_path}"
+    monkeypatch.setattr(database, "engine", create_sqlite_engine(old_url))
+    monkeypatch.setattr(database, "async_engine", create_async_sqlite_engine(old_url))
+    config = {"database_path": str(old_path)}
+    monkeypatch.setattr(settings_endpoint, "load_config", lambda: config)
+    monkeypatch.setattr(settings_endpoint, "save_config", config.update)
+    bindings = database.SessionLocal.kw["bind"], database.AsyncSessionLocal.kw["bind"]
+
+    def insert(db, value):
+        db.execute(text("INSERT INTO kept VALUES (:value)"), {"value": value})
+        db.commit()
+
+    started, release = threading.Event(), threading.Event()
+    try:
+        with database.engine.begin() as connection:
+            connection.exec_driver_sql("CREATE TABLE kept (value TEXT)")
+        with ThreadPoolExecutor(4) as pool:
+            pool.submit(
+                write_dispatcher.submit, lambda db: started.set() or release.wait(5)
+            )
+            started.wait(5)
+            writes = [pool.submit(write_dispatcher.submit, insert, i) for i in range(3)]
+            await _until(lambda: write_dispatcher.stats().depth == 3)
+            switch = asyncio.ensure_future(
+                settings_endpoint.create_or_update_setting(
+                    "database_path", str(new_path), migrate=True
+                )
+            )
+            # The switch waits for the write in progress, the queued ones wait
+            # for the switch
+            await _until(lambda: write_dispatcher.gate._paused)
+            release.set()
+            await switch
+            for write in writes:
+                write.result(timeout=5)
+
+        assert not os.path.exists(old_path)
+        with database.SessionLocal() as db:
+            assert db.execute(text("SELECT count(*) FROM kept")).scalar() == 3
+            # The schema is brought up to date on the new path
+            assert db.execute(text("SELECT count(*) FROM mangas")).scalar() == 0
+    finally:
+        release.set()
+        database.engine.dispose()
+        await database.async_engine.dispose()
+        database.SessionLocal.configure(bind=bindings[0])
+        database.AsyncSessionLocal.configure(bind=bindings[1])
+
+
+def test_export_archive_leaves_out_work_dirs(tmp_path, monkeypatch):
+    image_dir = tmp_path / "images"
+    for relative in ("a.png", ".thumbnails/256/a.webp", ".incoming/partial"):
+        (image_dir / relative).parent.mkdir(parents=True, exist_ok=True)
+        (image_dir / relative).write_bytes(b"image")
+    monkeypatch.setattr(database_endpoint, "IMAGE_PATH", str(image_dir))
+    monkeypatch.setattr(database_endpoint, "DATABASE_PATH", str(tmp_path / "no.db"))
+
+    database_endpoint._write_export_archive(str(tmp_path / "export.zip"))
+
+    with zipfile.ZipFile(tmp_path / "export.zip") as archive:
+        assert archive.namelist() == ["images/a.png"]
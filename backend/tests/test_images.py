@@ -0,0 +1,160 @@
+import hashlib
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.orm import Session
+
+from backend.app import images
+from backend.app.main import app
+from backend.app.repositories.manga import MangaRepository
+from backend.app.schemas import Category, MangaCreate, VolumeCreate
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"cover"
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    with patch("backend.app.settings.IMAGE_SAVE_PATH", str(tmp_path)), patch(
+        "backend.app.api.v1.endpoints.image.IMAGE_SAVE_PATH", str(tmp_path)
+    ):
+        yield tmp_path
+
+
+def _refcount(db_session: Session, name: str):
+    return (
+        db_session.connection()
+        .exec_driver_sql("SELECT refcount FROM images WHERE name = ?", (name,))
+        .scalar()
+    )
+
+
+def test_store_names_images_by_content(image_dir):
+    name = images.store(str(image_dir), PNG)
+    assert name == hashlib.sha256(PNG).hexdigest() + ".png"
+    assert images.path(str(image_dir), name) == os.path.join(
+        str(image_dir), name[:2], name[2:4], name
+    )
+    assert images.store(str(image_dir), PNG) == name
+    assert [found for found, _ in images.stored_files(str(image_dir))] == [name]
+    # Legacy covers keep their flat location
+    assert images.path(str(image_dir), "cover.jpg") == str(image_dir / "cover.jpg")
+
+    with pytest.raises(images.InvalidImage):
+        images.store(str(image_dir), b"<html>")
+    with pytest.raises(images.ImageTooLarge):
+        with images.ImageWriter(str(image_dir), max_bytes=4) as writer:
+            writer.write(PNG)
+    assert os.listdir(image_dir / ".incoming") == []
+
+
+def test_covers_are_removed_with_their_last_reference(db_session: Session, image_dir):
+    name = images.store(str(image_dir), PNG)
+    for title in ("Shared", "Sharing"):
+        MangaRepository.create(
+            db_session,
+            MangaCreate(
+                title=title,
+                category=Category.manga,
+                cover_image=name,
+                authors=[],
+                genres=[],
+                lists=[],
+                volumes=[VolumeCreate(volume_number="1", cover_image=name)],
+            ),
+        )
+    assert _refcount(db_session, name) == 4
+    first, second = (
+        MangaRepository.get_by_title(db_session, title)
+        for title in ("Shared", "Sharing")
+    )
+
+    first.cover_image = None
+    first.volumes = []
+    MangaRepository.update(db_session, first)
+    assert _refcount(db_session, name) == 2
+    MangaRepository.delete(db_session, second.id)
+    assert _refcount(db_session, name) is None
+    assert not os.path.exists(images.path(str(image_dir), name))
+
+
+def test_collect_garbage_spares_recent_and_referenced_files(
+    db_session: Session, image_dir
+):
+    old = images.store(str(image_dir), PNG + b"old")
+    recent = images.store(str(image_dir), PNG + b"recent")
+    used = images.store(str(image_dir), PNG + b"used")
+    long_ago = time.time() - images.GARBAGE_GRACE_SECONDS - 60
+    for name in (old, used):
+        os.utime(images.path(str(image_dir), name), (long_ago, long_ago))
+    MangaRepository.create(
+        db_session,
+        MangaCreate(
+            title="Kept",
+            category=Category.manga,
+            cover_image=used,
+            authors=[],
+            genres=[],
+            lists=[],
+            volumes=[],
+        ),
+    )
+
+    assert images.collect_garbage(db_session.connection(), str(image_dir)) == 1
+    remaining = {name for name, _ in images.stored_files(str(image_dir))}
+    assert remaining == {recent, used}
+
+
+def test_migrate_flat_images(db_session: Session, image_dir):
+    (image_dir / "legacy.jpg").write_bytes(PNG)
+    MangaRepository.create(
+        db_session,
+        MangaCreate(
+            title="Old",
+            category=Category.manga,
+            cover_image="legacy.jpg",
+            authors=[],
+            genres=[],
+            lists=[],
+            volumes=[],
+        ),
+    )
+    connection = db_session.connection()
+    assert images.migrate_flat_images(connection, str(image_dir)) == 1
+    name = hashlib.sha256(PNG).hexdigest() + ".png"
+    assert MangaRepository.get_by_title(db_session, "Old").cover_image == name
+    assert _refcount(db_session, name) == 1
+    assert _refcount(db_session, "legacy.jpg") == 0
+
+
+async def test_image_responses_are_cacheable(image_dir):
+    name = images.store(str(image_dir), PNG)
+    (image_dir / "legacy.png").write_bytes(PNG)
+    url = f"/api/v1/images/manga/{name}"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get(url)
+        etag = first.headers["etag"]
+        revalidated = await client.get(url, headers={"If-None-Match": etag})
+        partial = await client.get(url, headers={"Range": "bytes=0-3"})
+        legacy = await client.get("/api/v1/images/volume/legacy.png")
+        legacy_since = await client.get(
+            "/api/v1/images/volume/legacy.png",
+            headers={"If-Modified-Since": legacy.headers["last-modified"]},
+        )
+        images.remove_files(str(image_dir), [name])
+        removed = await client.get(url)
+
+    assert first.status_code == 200
+    assert etag == f'"{name.split(".")[0]}"'
+    assert "immutable" in first.headers["cache-control"]
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert partial.status_code == 206
+    assert partial.content == PNG[:4]
+    assert legacy.headers["cache-control"] == "no-cache"
+    assert legacy_since.status_code == 304
+    # Removing an image drops its cached path
+    assert removed.status_code == 404
@@ -1,6 +1,10 @@
 import pytest
 from httpx import AsyncClient
 
+from backend.app.core.security import verify_password
+from backend.app.repositories import UserRepository
+from backend.app.schemas import UserCreate
+
 
 @pytest.mark.asyncio
 async def test_read_root(client: AsyncClient):
@@ -18,3 +22,191 @@ async def test_get_sources(client: AsyncClient):
     names = [source["name"] for source in data]
     assert "MangaPassion" in names
     assert "Jikan" in names
+
+
+@pytest.mark.asyncio
+async def test_get_mangas_returns_next_cursor(client: AsyncClient):
+    for title in ["Akira", "Berserk", "Claymore"]:
+        response = await client.post(
+            "/api/v1/mangas/create",
+            json={
+                "title": title,
+                "category": "manga",
+                "authors": [],
+                "genres": [],
+                "lists": [],
+                "volumes": [],
+            },
+        )
+        assert response.status_code == 201
+
+    response = await client.get("/api/v1/mangas/getAll", params={"limit": 2})
+    assert [m["title"] for m in response.json()] == ["Akira", "Berserk"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await client.get(
+        "/api/v1/mangas/getAll", params={"limit": 2, "cursor": cursor}
+    )
+    assert [m["title"] for m in response.json()] == ["Claymore"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = await client.get("/api/v1/mangas/getAll", params={"cursor": "x"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_mangas_summary_view(client: AsyncClient):
+    response = await client.post(
+        "/api/v1/mangas/create",
+        json={
+            "title": "Akira",
+            "category": "manga",
+            "summary": "Neo-Tokyo",
+            "authors": [],
+            "genres": [],
+            "lists": [],
+            "volumes": [{"volume_number": "1"}, {"volume_number": "2"}],
+        },
+    )
+    assert response.status_code == 201
+
+    response = await client.get("/api/v1/mangas/getAll", params={"view": "summary"})
+    assert response.status_code == 200
+    (card,) = response.json()
+    assert card["title"] == "Akira"
+    assert card["volume_count"] == 2
+    assert "summary" not in card
+    assert "volumes" not in card
+
+    response = await client.get("/api/v1/mangas/getAll")
+    assert response.json()[0]["summary"] == "Neo-Tokyo"
+
+
+@pytest.mark.asyncio
+async def test_async_read_routes(client: AsyncClient):
+    response = await client.post(
+        "/api/v1/mangas/create",
+        json={
+            "title": "Monster",
+            "category": "manga",
+            "authors": [],
+            "genres": [],
+            "lists": [{"name": "Favorites"}],
+            "volumes": [],
+        },
+    )
+    manga_id = response.json()["id"]
+
+    response = await client.get(f"/api/v1/mangas/{manga_id}")
+    assert response.status_code == 200
+    assert response.json()["title"] == "Monster"
+
+    response = await client.get("/api/v1/lists/getAll/withCount")
+    assert response.json() == [
+        {"id": 1, "name": "Favorites", "mangaCount": 1, "volumeCount": 0}
+    ]
+
+    response = await client.get(
+        "/api/v1/mangas/getAll",
+        params={"category": ["novel", "manga"], "list_ids": 1, "view": "summary"},
+    )
+    assert [manga["title"] for manga in response.json()] == ["Monster"]
+    response = await client.post(
+        "/api/v1/mangas/create",
+        json={
+            "title": "MONSTER",
+            "category": "manga",
+            "authors": [],
+            "genres": [],
+            "lists": [],
+            "volumes": [],
+        },
+    )
+    assert response.status_code == 201
+    assert response.headers["X-Possible-Duplicates"] == str(manga_id)
+    response = await client.get("/api/v1/mangas/similar", params={"title": "monstr"})
+    assert [match["name"] for match in response.json()] == ["MONSTER", "Monster"]
+
+    response = await client.get("/api/v1/mangas/facets", params={"list_ids": 2})
+    assert response.json()["total"] == 0
+    assert response.json()["lists"] == [{"value": 1, "label": "Favorites", "count": 1}]
+
+    response = await client.get("/api/v1/statistics/")
+    assert response.json()["total_mangas"] == 2
+
+
+@pytest.mark.asyncio
+async def test_statistics_etag(client: AsyncClient):
+    response = await client.get("/api/v1/statistics/")
+    etag = response.headers["ETag"]
+    assert response.json()["total_mangas"] == 0
+
+    response = await client.get("/api/v1/statistics/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    await client.post(
+        "/api/v1/mangas/create",
+        json={
+            "title": "Dorohedoro",
+            "category": "manga",
+            "authors": [],
+            "genres": [],
+            "lists": [],
+            "volumes": [],
+        },
+    )
+    response = await client.get("/api/v1/statistics/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["total_mangas"] == 1
+
+
+@pytest.mark.asyncio
+async def test_source_and_password_writes(client: AsyncClient, db_session):
+    response = await client.post(
+        "/api/v1/sources/create", json={"name": "MangaDex", "language": "EN"}
+    )
+    assert response.status_code == 200
+    response = await client.post(
+        "/api/v1/sources/create", json={"name": "MangaDex", "language": "EN"}
+    )
+    assert response.status_code == 400
+
+    UserRepository.create(db_session, UserCreate(username="reader", password="old"))
+    response = await client.post(
+        "/api/v1/users/change-password", json={"username": "reader", "password": "new"}
+    )
+    assert response.status_code == 200
+    db_session.expire_all()
+    user = UserRepository.get_by_username(db_session, "reader")
+    assert verify_password("new", user.hashed_password)
+    response = await client.post(
+        "/api/v1/users/change-password", json={"username": "nobody", "password": "x"}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_stale_search_cursor_conflicts(client: AsyncClient):
+    def manga(title):
+        return {
+            "title": title,
+            "category": "manga",
+            "authors": [],
+            "genres": [],
+            "lists": [],
+            "volumes": [],
+        }
+
+    for title in ["Dragon Ball", "Dragon Head"]:
+        await client.post("/api/v1/mangas/create", json=manga(title))
+    params = {"limit": 1, "search": "dragon"}
+    response = await client.get("/api/v1/mangas/getAll", params=params)
+    cursor = response.headers["X-Next-Cursor"]
+
+    await client.post("/api/v1/mangas/create", json=manga("Dragon Quest"))
+    response = await client.get(
+        "/api/v1/mangas/getAll", params={**params, "cursor": cursor}
+    )
+    assert response.status_code == 409
@@ -1,7 +1,32 @@
+import pytest
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from backend.app.repositories.manga import MangaRepository
-from backend.app.schemas import Category, MangaCreate, OverallStatus, ReadingStatus
+from backend.app.ddl import (
+    MANGA_FTS_STALE_TABLE,
+    rebuild_statistics,
+    reconcile_manga_counts,
+)
+from backend.app.models import Genre as GenreModel
+from backend.app.repositories.author import AuthorRepository
+from backend.app.repositories.manga import (
+    AsyncMangaRepository,
+    MangaRepository,
+    StaleCursor,
+)
+from backend.app.schemas import (
+    AuthorCreate,
+    Category,
+    GenreCreate,
+    ListCreate,
+    MangaCreate,
+    MangaFilters,
+    MangaSummary,
+    MangaView,
+    OverallStatus,
+    ReadingStatus,
+    VolumeCreate,
+)
 
 
 def test_create_and_get_manga(db_session: Session):
@@ -56,3 +81,624 @@ def test_get_by_title_with_language(db_session: Session):
     fetched_de = MangaRepository.get_by_title(db_session, "Naruto", "DE")
     assert fetched_de is not None
     assert fetched_de.language == "DE"
+
+
+def _create(db_session: Session, title: str, **kwargs) -> None:
+    data = {
+        "language": "EN",
+        "category": Category.manga,
+        "authors": [],
+        "genres": [],
+        "lists": [],
+        "volumes": [],
+    }
+    data.update(kwargs)
+    MangaRepository.create(db_session, MangaCreate(title=title, **data))
+
+
+def test_get_all_full_text_search(db_session: Session):
+    _create(
+        db_session,
+        "Naruto",
+        japanese_title="ナルト",
+        authors=[AuthorCreate(name="Masashi Kishimoto")],
+        genres=[GenreCreate(name="Shounen")],
+    )
+    _create(db_session, "Bleach", summary="A rival of Naruto appears.")
+    _create(db_session, "One Piece", genres=[GenreCreate(name="Adventure")])
+
+    # Title matches rank above summary matches
+    results = MangaRepository.get_all(db_session, search="naruto")
+    assert [m.title for m in results] == ["Naruto", "Bleach"]
+
+    # Prefix queries, author and genre names are searchable too
+    assert [m.title for m in MangaRepository.get_all(db_session, search="kishi")] == [
+        "Naruto"
+    ]
+    assert [m.title for m in MangaRepository.get_all(db_session, search="adv")] == [
+        "One Piece"
+    ]
+
+    # FTS operators typed by the user are treated as plain words
+    assert MangaRepository.get_all(db_session, search='"OR NOT') == []
+
+
+def test_full_text_index_follows_updates_and_deletes(db_session: Session):
+    _create(db_session, "Monster", authors=[AuthorCreate(name="Naoki Urasawa")])
+    manga = MangaRepository.get_by_title(db_session, "Monster")
+
+    manga.title = "Pluto"
+    manga.authors = []
+    MangaRepository.update(db_session, manga)
+    assert MangaRepository.get_all(db_session, search="urasawa") == []
+    assert [m.title for m in MangaRepository.get_all(db_session, search="pluto")] == [
+        "Pluto"
+    ]
+
+    MangaRepository.delete(db_session, manga.id)
+    assert MangaRepository.get_all(db_session, search="pluto") == []
+
+
+def test_full_text_index_follows_batch_creates(db_session: Session):
+    MangaRepository.create_batch(
+        db_session,
+        [
+            MangaCreate(
+                title="Planetes",
+                category=Category.manga,
+                authors=[AuthorCreate(name="Makoto Yukimura")],
+                genres=[GenreCreate(name="Sci-Fi"), GenreCreate(name="Space")],
+                lists=[],
+                volumes=[],
+            )
+        ],
+    )
+
+    assert [
+        m.title for m in MangaRepository.get_all(db_session, search="yukimura")
+    ] == ["Planetes"]
+    assert [m.title for m in MangaRepository.get_all(db_session, search="space")] == [
+        "Planetes"
+    ]
+    # Every row marked by the link triggers was re-indexed
+    stale = db_session.execute(text(f"SELECT count(*) FROM {MANGA_FTS_STALE_TABLE}"))
+    assert stale.scalar() == 0
+
+
+def test_search_returns_highlighted_snippets(db_session: Session):
+    _create(db_session, "Vinland Saga", summary="A saga about vikings.")
+
+    results = MangaRepository.search(db_session, "viking")
+    assert len(results) == 1
+    assert results[0].title == "Vinland Saga"
+    assert "<mark>vikings</mark>" in results[0].snippet
+
+
+def test_get_page_keyset_cursor(db_session: Session):
+    for title in ["Akira", "Berserk", "Claymore", "Dorohedoro", "Emma"]:
+        _create(db_session, title)
+
+    first, cursor = MangaRepository.get_page(db_session, limit=2)
+    assert [m.title for m in first] == ["Akira", "Berserk"]
+
+    # Inserts before the cursor position do not shift the following pages
+    _create(db_session, "Aria")
+
+    second, cursor = MangaRepository.get_page(db_session, limit=2, cursor=cursor)
+    assert [m.title for m in second] == ["Claymore", "Dorohedoro"]
+
+    last, cursor = MangaRepository.get_page(db_session, limit=2, cursor=cursor)
+    assert [m.title for m in last] == ["Emma"]
+    assert cursor is None
+
+    backwards, cursor = MangaRepository.get_page(db_session, limit=3, sort="desc")
+    assert [m.title for m in backwards] == ["Emma", "Dorohedoro", "Claymore"]
+    rest, _ = MangaRepository.get_page(db_session, limit=3, sort="desc", cursor=cursor)
+    assert [m.title for m in rest] == ["Berserk", "Aria", "Akira"]
+
+
+def test_get_page_cursor_with_search(db_session: Session):
+    _create(db_session, "Dragon Ball")
+    _create(db_session, "Dragon Quest", summary="Not to be confused with Ball")
+    _create(db_session, "Dragon Head")
+
+    first, cursor = MangaRepository.get_page(db_session, limit=1, search="ball")
+    rest, end = MangaRepository.get_page(
+        db_session, limit=5, search="ball", cursor=cursor
+    )
+    assert [m.title for m in first + rest] == ["Dragon Ball", "Dragon Quest"]
+    assert end is None
+
+    # A write re-scores every row, so the search cursor no longer holds
+    _create(db_session, "Ball Room")
+    with pytest.raises(StaleCursor):
+        MangaRepository.get_page(db_session, limit=5, search="ball", cursor=cursor)
+    with pytest.raises(ValueError):
+        MangaRepository.get_page(db_session, cursor=cursor)
+    with pytest.raises(ValueError):
+        MangaRepository.get_page(db_session, cursor="not-a-cursor")
+
+
+def test_list_queries_do_not_lazy_load_per_row(db_session: Session, count_queries):
+    for i in range(6):
+        _create(
+            db_session,
+            f"Series {i}",
+            authors=[AuthorCreate(name=f"Author {i}")],
+            genres=[GenreCreate(name="Action")],
+            lists=[ListCreate(name="Shelf")],
+            volumes=[VolumeCreate(volume_number="1")],
+            star_rating=4.0,
+        )
+    genre_id = MangaRepository.get_by_title(db_session, "Series 0").genres[0].id
+    list_id = MangaRepository.get_by_title(db_session, "Series 0").lists[0].id
+
+    calls = [
+        lambda: MangaRepository.get_all(db_session, limit=100),
+        lambda: MangaRepository.get_by_genre(db_session, genre_id),
+        lambda: MangaRepository.get_by_list(db_session, list_id),
+        lambda: MangaRepository.get_by_star_rating(db_session, 4.0),
+    ]
+    for call in calls:
+        db_session.expire_all()
+        with count_queries() as counter:
+            assert len(call()) == 6
+        # One query for the page plus one per eagerly loaded relationship
+        assert counter.count == 6, counter.statements
+
+    db_session.expire_all()
+    with count_queries() as counter:
+        MangaRepository.get_by_id(db_session, 1)
+    assert counter.count == 2
+
+
+def test_summary_view_is_a_single_projection_query(db_session: Session, count_queries):
+    _create(
+        db_session,
+        "Yotsuba&!",
+        summary="Long text " * 100,
+        lists=[ListCreate(name="Shelf")],
+        volumes=[VolumeCreate(volume_number=str(i)) for i in range(1, 4)],
+        star_rating=5.0,
+    )
+    _create(db_session, "Azumanga Daioh", lists=[ListCreate(name="Shelf")])
+    list_id = MangaRepository.get_by_title(db_session, "Azumanga Daioh").lists[0].id
+
+    with count_queries() as counter:
+        page = MangaRepository.get_all(db_session, view=MangaView.summary)
+    assert counter.count == 1
+    assert "mangas.summary" not in counter.statements[0]
+    assert [(m.title, m.volume_count) for m in page] == [
+        ("Azumanga Daioh", 0),
+        ("Yotsuba&!", 3),
+    ]
+    assert isinstance(page[1], MangaSummary)
+    assert page[1].star_rating == 5.0
+
+    by_list = MangaRepository.get_by_list(db_session, list_id, view=MangaView.summary)
+    assert sorted(m.title for m in by_list) == ["Azumanga Daioh", "Yotsuba&!"]
+
+
+def test_create_batch_bulk_inserts_and_reports_per_item(
+    db_session: Session, count_queries
+):
+    _create(db_session, "Existing", authors=[AuthorCreate(name="Shared Author")])
+
+    def batch_item(title, language="EN"):
+        return MangaCreate(
+            title=title,
+            language=language,
+            category=Category.manga,
+            authors=[AuthorCreate(name="Shared Author"), AuthorCreate(name="New")],
+            genres=[GenreCreate(name="Drama")],
+            lists=[ListCreate(name="Imported")],
+            volumes=[VolumeCreate(volume_number="1"), VolumeCreate(volume_number="2")],
+        )
+
+    batch = [batch_item(f"Batch {i}") for i in range(20)]
+    batch += [
+        batch_item("Existing"),
+        batch_item("Batch 0"),
+        batch_item("Batch 0", "DE"),
+    ]
+
+    with count_queries() as counter:
+        result = MangaRepository.create_batch(db_session, batch)
+
+    # Query count does not depend on the batch size (BEGIN, the savepoint
+    # isolating the bulk insert and the full-text refresh included)
+    assert counter.count < 21, counter.statements
+    assert (result.total, result.imported, result.skipped, result.failed) == (
+        23,
+        21,
+        2,
+        0,
+    )
+    assert [log.status for log in result.logs[-3:]] == [
+        "skipped",
+        "skipped",
+        "imported",
+    ]
+
+    manga = MangaRepository.get_by_title(db_session, "Batch 7", "EN")
+    assert {a.name for a in manga.authors} == {"Shared Author", "New"}
+    assert [v.volume_number for v in manga.volumes] == ["1", "2"]
+    counts = {a.name: a.manga_count for a in manga.authors}
+    assert counts == {"Shared Author": 22, "New": 21}
+    assert manga.genres[0].manga_count == 21
+
+
+def test_manga_counts_are_maintained_by_triggers(db_session: Session):
+    _create(db_session, "Dr. Stone", genres=[GenreCreate(name="Sci-Fi")])
+    _create(db_session, "Planetes", genres=[GenreCreate(name="Sci-Fi")])
+    manga = MangaRepository.get_by_title(db_session, "Planetes")
+    assert manga.genres[0].manga_count == 2
+
+    manga.genres = [GenreCreate(name="Drama")]
+    manga = MangaRepository.update(db_session, manga)
+    assert manga.genres[0].manga_count == 1
+    stone = MangaRepository.get_by_title(db_session, "Dr. Stone")
+    assert stone.genres[0].manga_count == 1
+
+    MangaRepository.delete(db_session, stone.id)
+    db_session.expire_all()
+    sci_fi = db_session.query(GenreModel).filter(GenreModel.name == "Sci-Fi").one()
+    assert sci_fi.manga_count == 0
+
+    # Reconciliation repairs counters that drifted
+    sci_fi.manga_count = 42
+    db_session.commit()
+    reconcile_manga_counts(db_session.connection())
+    db_session.commit()
+    db_session.refresh(sci_fi)
+    assert sci_fi.manga_count == 0
+
+
+async def test_async_repository_matches_sync(db_session: Session, async_db_session):
+    for title in ("Berserk", "Claymore", "Vagabond"):
+        _create(db_session, title, genres=[GenreCreate(name="Seinen")])
+    genre_id = db_session.query(GenreModel.id).scalar()
+
+    items, cursor = await AsyncMangaRepository.get_page(async_db_session, limit=2)
+    assert (items, cursor) == MangaRepository.get_page(db_session, limit=2)
+    rest, _ = await AsyncMangaRepository.get_page(async_db_session, cursor=cursor)
+    assert [manga.title for manga in rest] == ["Vagabond"]
+
+    fetched = await AsyncMangaRepository.get_by_id(async_db_session, items[0].id)
+    assert fetched == MangaRepository.get_by_id(db_session, items[0].id)
+    assert await AsyncMangaRepository.get_by_id(async_db_session, 999) is None
+
+    by_genre = await AsyncMangaRepository.get_by_genre(
+        async_db_session, genre_id, view=MangaView.summary
+    )
+    assert len(by_genre) == 3
+    hits = await AsyncMangaRepository.search(async_db_session, "clay")
+    assert [hit.title for hit in hits] == ["Claymore"]
+
+
+def test_filters_and_facets(db_session: Session):
+    _create(
+        db_session,
+        "Berserk",
+        star_rating=5,
+        reading_status=ReadingStatus.in_progress,
+        genres=[GenreCreate(name="Seinen"), GenreCreate(name="Fantasy")],
+    )
+    _create(
+        db_session,
+        "Claymore",
+        star_rating=4,
+        reading_status=ReadingStatus.completed,
+        genres=[GenreCreate(name="Fantasy")],
+    )
+    _create(db_session, "Kino no Tabi", category=Category.novel, language="JP")
+    fantasy = db_session.query(GenreModel).filter_by(name="Fantasy").one()
+    seinen = db_session.query(GenreModel).filter_by(name="Seinen").one()
+
+    def titles(filters: MangaFilters, search=None):
+        mangas = MangaRepository.get_all(db_session, search=search, filters=filters)
+        return [manga.title for manga in mangas]
+
+    assert titles(MangaFilters(category=[Category.novel])) == ["Kino no Tabi"]
+    assert titles(MangaFilters(genre_ids=[seinen.id, fantasy.id])) == [
+        "Berserk",
+        "Claymore",
+    ]
+    assert titles(MangaFilters(genre_ids=[fantasy.id], min_rating=4.5)) == ["Berserk"]
+    assert titles(MangaFilters(language=["EN"]), search="clay") == ["Claymore"]
+
+    facets = MangaRepository.get_facets(
+        db_session, filters=MangaFilters(genre_ids=[seinen.id], category=["manga"])
+    )
+    assert facets.total == 1
+    # A facet ignores its own filter but applies all others
+    assert [(f.label, f.count) for f in facets.genres] == [
+        ("Fantasy", 2),
+        ("Seinen", 1),
+    ]
+    assert [(f.value, f.count) for f in facets.category] == [("manga", 1)]
+    assert [(f.label, f.count) for f in facets.star_rating] == [("5.0", 1)]
+
+    facets = MangaRepository.get_facets(db_session)
+    assert facets.total == 3
+    assert [(f.label, f.count) for f in facets.genres] == [
+        ("Fantasy", 2),
+        ("Seinen", 1),
+    ]
+    assert facets.category[0].value == "manga" and facets.category[0].count == 2
+    assert {f.label for f in facets.reading_status} == {
+        "in_progress",
+        "completed",
+        "Unknown",
+    }
+
+
+def test_get_all_search_syntax(db_session: Session):
+    _create(
+        db_session,
+        "One Piece",
+        star_rating=5,
+        reading_status=ReadingStatus.in_progress,
+        authors=[AuthorCreate(name="Eiichiro Oda")],
+        genres=[GenreCreate(name="Adventure")],
+        lists=[ListCreate(name="To Read")],
+        volumes=[VolumeCreate(volume_number=str(i)) for i in range(1, 12)],
+    )
+    _create(
+        db_session,
+        "Monster",
+        star_rating=4,
+        language="DE",
+        overall_status=OverallStatus.completed,
+        summary="A doctor follows a former patient.",
+        authors=[AuthorCreate(name="Naoki Urasawa")],
+        genres=[GenreCreate(name="Thriller")],
+    )
+    _create(
+        db_session,
+        "Re:Zero",
+        genres=[GenreCreate(name="Isekai")],
+        lists=[ListCreate(name="100% Done")],
+    )
+
+    def titles(search):
+        return sorted(
+            m.title for m in MangaRepository.get_all(db_session, search=search)
+        )
+
+    assert titles("author:oda") == ["One Piece"]
+    assert titles("-genre:adventure") == ["Monster", "Re:Zero"]
+    assert titles('list:"to read" rating>=4') == ["One Piece"]
+    # LIKE wildcards in list names are plain characters
+    assert titles("list:%") == ["Re:Zero"]
+    assert titles("list:o_read") == []
+    assert titles("volumes>10") == ["One Piece"]
+    assert titles("volumes=0 lang:de") == ["Monster"]
+    assert titles('"former patient"') == ["Monster"]
+    assert titles('"patient former"') == []
+    assert titles("status:in_progress") == ["One Piece"]
+    assert titles("-status:in_progress") == []  # NULL status matches neither
+    # "completed" is both; status: takes the reading status
+    assert titles("status:completed") == []
+    assert titles("overall:completed") == ["Monster"]
+    assert titles("reading:in-progress") == ["One Piece"]
+    assert titles("Re:Zero") == ["Re:Zero"]
+    # Text terms and negation in one query
+    assert titles("author:urasawa -doctor") == []
+
+
+def test_find_similar_titles_and_fuzzy_search(db_session: Session):
+    _create(
+        db_session,
+        "Attack on Titan",
+        authors=[AuthorCreate(name="Hajime Isayama")],
+    )
+    _create(db_session, "Pokémon Adventures")
+    _create(db_session, "Vinland Saga")
+
+    similar = MangaRepository.find_similar(db_session, "Attack On Titan")
+    assert [(match.name, match.similarity) for match in similar] == [
+        ("Attack on Titan", 1.0)
+    ]
+    assert similar[0].language == "EN"
+    assert MangaRepository.find_similar(db_session, "atack on titn")[0].name == (
+        "Attack on Titan"
+    )
+    assert MangaRepository.find_similar(db_session, "pokemon adventure")[0].name == (
+        "Pokémon Adventures"
+    )
+    assert MangaRepository.find_similar(db_session, "xy") == []
+    assert AuthorRepository.find_similar(db_session, "Hajme Isayma")[0].name == (
+        "Hajime Isayama"
+    )
+
+    # Index follows renames and deletes
+    manga = MangaRepository.get_by_title(db_session, "Vinland Saga", "EN")
+    MangaRepository.delete(db_session, manga.id)
+    assert MangaRepository.find_similar(db_session, "Vinland Saga") == []
+
+    # A misspelled plain search falls back to similar titles and authors
+    assert [m.title for m in MangaRepository.get_all(db_session, search="vinlnd")] == []
+    assert [m.title for m in MangaRepository.get_all(db_session, search="atack")] == [
+        "Attack on Titan"
+    ]
+    assert [m.title for m in MangaRepository.get_all(db_session, search="isayma")] == [
+        "Attack on Titan"
+    ]
+    # Searches with fields do not
+    assert MangaRepository.get_all(db_session, search="atack lang:EN") == []
+
+
+def test_get_all_sorts_by_normalized_title(db_session: Session):
+    for title, language in [
+        ("Zetman", "EN"),
+        ("The Ancient Magus' Bride", "EN"),
+        ("Ｂｅｒｓｅｒｋ", "EN"),
+        ("Vol 10", "EN"),
+        ("Vol 2", "EN"),
+        ("Der Ölprinz", "DE"),
+        ("Die Hard", "EN"),
+    ]:
+        _create(db_session, title, language=language)
+
+    assert [m.title for m in MangaRepository.get_all(db_session, limit=10)] == [
+        "The Ancient Magus' Bride",
+        "Ｂｅｒｓｅｒｋ",
+        "Die Hard",
+        "Der Ölprinz",
+        "Vol 2",
+        "Vol 10",
+        "Zetman",
+    ]
+
+    # Title keys follow renames
+    manga = MangaRepository.get_by_title(db_session, "Zetman", "EN")
+    MangaRepository.update(db_session, manga.model_copy(update={"title": "A Zetman"}))
+    first = MangaRepository.get_all(db_session, limit=1, sort="desc")[0]
+    assert first.title == "A Zetman"
+
+
+async def test_volumes_in_natural_order(db_session: Session, async_db_session):
+    numbers = ["10", "2", "Special", "3.5", "1", "Vol. 4"]
+    _create(
+        db_session,
+        "Berserk",
+        volumes=[VolumeCreate(volume_number=number) for number in numbers],
+    )
+    _create(db_session, "Claymore", volumes=[VolumeCreate(volume_number="2")])
+    berserk = MangaRepository.get_by_title(db_session, "Berserk", "EN")
+
+    fetched = MangaRepository.get_by_id(db_session, berserk.id)
+    assert [volume.volume_number for volume in fetched.volumes] == [
+        "1",
+        "2",
+        "3.5",
+        "Vol. 4",
+        "10",
+        "Special",
+    ]
+    assert fetched.volumes[2].sort_key == 3.5
+
+    next_missing = MangaRepository.get_next_missing_volume(db_session, berserk.id)
+    assert (next_missing.volume_number, next_missing.highest_owned) == (3, 10)
+    claymore = MangaRepository.get_by_title(db_session, "Claymore", "EN")
+    next_missing = await AsyncMangaRepository.get_next_missing_volume(
+        async_db_session, claymore.id
+    )
+    assert next_missing.volume_number == 1
+    assert MangaRepository.get_next_missing_volume(db_session, 999) is None
+
+
+def test_owned_volumes_are_stored_as_ranges(db_session: Session, count_queries):
+    numbers = [*range(1, 43), 44, *range(46, 51)]
+    _create(
+        db_session,
+        "Detective Conan",
+        lists=[ListCreate(name="Shelf")],
+        volumes=[
+            *(VolumeCreate(volume_number=str(number)) for number in numbers),
+            VolumeCreate(volume_number="45", cover_image="45.jpg"),
+            VolumeCreate(volume_number="Special"),
+        ],
+    )
+    manga = MangaRepository.get_by_title(db_session, "Detective Conan", "EN")
+    connection = db_session.connection()
+    assert connection.exec_driver_sql(
+        "SELECT first_volume, last_volume FROM volume_ranges ORDER BY first_volume"
+    ).all() == [(1, 42), (44, 44), (46, 50)]
+    assert connection.exec_driver_sql(
+        "SELECT volume_number FROM volumes ORDER BY id"
+    ).all() == [("45",), ("Special",)]
+
+    assert len(manga.volumes) == 50
+    assert [volume.volume_number for volume in manga.volumes[41:46]] == [
+        "42",
+        "44",
+        "45",
+        "46",
+        "47",
+    ]
+    assert manga.owned_volumes == "1-42,44-50"
+    (summary,) = MangaRepository.get_all(db_session, view=MangaView.summary)
+    assert summary.volume_count == 50
+    next_missing = MangaRepository.get_next_missing_volume(db_session, manga.id)
+    assert (next_missing.volume_number, next_missing.highest_owned) == (43, 50)
+
+    # Buying volume 43 rewrites the three ranges, nothing else
+    manga.volumes.append(
+        manga.volumes[0].model_copy(update={"id": 0, "volume_number": "43"})
+    )
+    with count_queries() as counter:
+        MangaRepository.update(db_session, manga)
+    writes = [
+        statement
+        for statement in counter.statements
+        if statement.startswith(("INSERT", "UPDATE", "DELETE"))
+    ]
+    assert not any("volumes" in statement for statement in writes), writes
+    manga = MangaRepository.get_by_id(db_session, manga.id)
+    assert manga.owned_volumes == "1-50"
+    assert (
+        MangaRepository.get_next_missing_volume(db_session, manga.id).volume_number
+        == 51
+    )
+    assert rebuild_statistics(db_session.connection()) == 0
+
+
+async def test_volume_gaps_report(db_session: Session, async_db_session):
+    def volumes(*numbers):
+        return [VolumeCreate(volume_number=number) for number in numbers]
+
+    _create(
+        db_session,
+        "Vinland Saga",
+        lists=[ListCreate(name="Shelf")],
+        volumes=[*volumes("3", "4", "9", "Special"), *volumes("6.5", "Vol. 12")],
+    )
+    _create(
+        db_session,
+        "Kingdom",
+        language="DE",
+        lists=[ListCreate(name="Shelf")],
+        volumes=volumes(*(str(number) for number in range(1, 21) if number != 10)),
+    )
+    _create(db_session, "Complete", volumes=volumes("1", "2", "3"))
+
+    gaps = MangaRepository.get_volume_gaps(db_session)
+    assert [
+        (gap.title, gap.first_missing, gap.last_missing, gap.missing) for gap in gaps
+    ] == [
+        ("Vinland Saga", 5, 8, 4),
+        ("Vinland Saga", 1, 2, 2),
+        ("Vinland Saga", 10, 11, 2),
+        ("Kingdom", 10, 10, 1),
+    ]
+
+    list_id = MangaRepository.get_by_title(db_session, "Kingdom", "DE").lists[0].id
+    filtered = await AsyncMangaRepository.get_volume_gaps(
+        async_db_session, MangaFilters(list_ids=[list_id], language=["DE"])
+    )
+    assert [(gap.title, gap.first_missing) for gap in filtered] == [("Kingdom", 10)]
+    assert len(MangaRepository.get_volume_gaps(db_session, skip=1, limit=2)) == 2
+
+
+def test_create_batch_fails_only_the_bad_item(db_session: Session):
+    def batch_item(title, volume="1"):
+        return MangaCreate(
+            title=title,
+            category=Category.manga,
+            authors=[AuthorCreate(name="Batch Author")],
+            genres=[],
+            lists=[],
+            volumes=[VolumeCreate(volume_number=volume)],
+        )
+
+    # Too large for an SQLite integer
+    batch = [batch_item("Good"), batch_item("Bad", "9" * 20), batch_item("Also Good")]
+    result = MangaRepository.create_batch(db_session, batch)
+
+    assert (result.imported, result.failed) == (2, 1)
+    assert [log.status for log in result.logs] == ["imported", "failed", "imported"]
+    assert MangaRepository.get_by_title(db_session, "Bad") is None
+    manga = MangaRepository.get_by_title(db_session, "Also Good")
+    assert manga.authors[0].manga_count == 2
@@ -0,0 +1,139 @@
+from sqlalchemy import create_engine, inspect
+
+from backend.app.migrations import MIGRATIONS, get_schema_version, upgrade_database
+
+# Schema of a database created before migrations existed
+LEGACY_SCHEMA = """
+CREATE TABLE authors (id INTEGER PRIMARY KEY, name VARCHAR, manga_count INTEGER);
+CREATE TABLE genres (id INTEGER PRIMARY KEY, name VARCHAR, manga_count INTEGER);
+CREATE TABLE lists (id INTEGER PRIMARY KEY, name VARCHAR);
+CREATE TABLE mangas (
+    id INTEGER PRIMARY KEY, title VARCHAR, japanese_title VARCHAR,
+    reading_status VARCHAR(11), overall_status VARCHAR(9), star_rating FLOAT,
+    language VARCHAR, category VARCHAR(9), summary TEXT, cover_image VARCHAR
+);
+CREATE INDEX ix_mangas_title ON mangas (title);
+CREATE TABLE volumes (
+    id INTEGER PRIMARY KEY, volume_number VARCHAR, cover_image VARCHAR,
+    manga_id INTEGER REFERENCES mangas (id)
+);
+CREATE TABLE manga_author (
+    manga_id INTEGER REFERENCES mangas (id), author_id INTEGER REFERENCES authors (id),
+    PRIMARY KEY (manga_id, author_id)
+);
+CREATE TABLE manga_genre (
+    manga_id INTEGER REFERENCES mangas (id), genre_id INTEGER REFERENCES genres (id),
+    PRIMARY KEY (manga_id, genre_id)
+);
+CREATE TABLE manga_list (
+    manga_id INTEGER REFERENCES mangas (id), list_id INTEGER REFERENCES lists (id),
+    PRIMARY KEY (manga_id, list_id)
+);
+INSERT INTO authors VALUES (1, 'Eiichiro Oda', 0);
+INSERT INTO genres VALUES (1, 'Adventure', 7);
+INSERT INTO mangas (id, title, language, category)
+    VALUES (1, 'One Piece', 'EN', 'manga');
+INSERT INTO manga_author VALUES (1, 1);
+INSERT INTO manga_genre VALUES (1, 1);
+INSERT INTO volumes (volume_number, manga_id) VALUES ('1', 1);
+INSERT INTO volumes (volume_number, manga_id) VALUES ('2', 1);
+INSERT INTO volumes (volume_number, cover_image, manga_id)
+    VALUES ('3.5', 'special.jpg', 1);
+"""
+
+
+def _legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA.split(";"):
+            if statement.strip():
+                connection.exec_driver_sql(statement)
+    return engine
+
+
+def test_upgrade_legacy_database(tmp_path):
+    engine = _legacy_engine(tmp_path)
+
+    assert upgrade_database(engine) == MIGRATIONS[-1].version
+
+    inspector = inspect(engine)
+    volume_indexes = {ix["name"] for ix in inspector.get_indexes("volumes")}
+    assert "ix_volumes_manga_id" in volume_indexes
+    manga_indexes = {ix["name"]: ix for ix in inspector.get_indexes("mangas")}
+    assert manga_indexes["ix_mangas_title_language"]["unique"]
+    assert "ix_mangas_title" not in manga_indexes
+    assert manga_indexes["ix_mangas_title_sort_id"]["column_names"] == [
+        "title_sort",
+        "id",
+    ]
+    assert "ix_manga_author_author_id" in {
+        ix["name"] for ix in inspector.get_indexes("manga_author")
+    }
+
+    with engine.connect() as connection:
+        # New tables were created, derived data back-filled
+        assert inspector.has_table("users")
+        assert (
+            connection.exec_driver_sql(
+                "SELECT rowid FROM manga_fts WHERE manga_fts MATCH 'oda'"
+            ).scalar()
+            == 1
+        )
+        assert (
+            connection.exec_driver_sql(
+                "SELECT rowid FROM manga_title_trigrams "
+                "WHERE manga_title_trigrams MATCH 'piece'"
+            ).scalar()
+            == 1
+        )
+        assert connection.exec_driver_sql(
+            "SELECT title_search, title_sort FROM mangas"
+        ).one() == ("one piece", "one piece")
+        assert connection.exec_driver_sql("SELECT sort_key FROM volumes").one() == (
+            3.5,
+        )
+        assert connection.exec_driver_sql(
+            "SELECT first_volume, last_volume FROM volume_ranges"
+        ).all() == [(1, 2)]
+        assert (
+            connection.exec_driver_sql("SELECT manga_count FROM genres").scalar() == 1
+        )
+        assert (
+            connection.exec_driver_sql("SELECT manga_count FROM authors").scalar() == 1
+        )
+        assert (
+            connection.exec_driver_sql(
+                "SELECT count FROM statistics_rollup WHERE value = 'volumes'"
+            ).scalar()
+            == 3
+        )
+    engine.dispose()
+
+
+def test_migrations_run_once(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    upgrade_database(engine)
+    upgrade_database(engine)
+
+    with engine.connect() as connection:
+        assert get_schema_version(connection) == MIGRATIONS[-1].version
+        applied = connection.exec_driver_sql(
+            "SELECT count(*) FROM schema_version"
+        ).scalar()
+    assert applied == len(MIGRATIONS)
+    engine.dispose()
+
+
+def test_duplicate_titles_keep_a_plain_index(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO mangas (title, language, category) "
+            "VALUES ('One Piece', 'EN', 'manga')"
+        )
+
+    upgrade_database(engine)
+
+    indexes = {ix["name"]: ix for ix in inspect(engine).get_indexes("mangas")}
+    assert not indexes["ix_mangas_title_language"]["unique"]
+    engine.dispose()
@@ -1,7 +1,15 @@
 from sqlalchemy.orm import Session
 
+from backend.app.repositories.list import ListRepository
+from backend.app.repositories.manga import MangaRepository
 from backend.app.repositories.source import SourceRepository
-from backend.app.schemas import SourceCreate
+from backend.app.schemas import (
+    Category,
+    ListCreate,
+    MangaCreate,
+    SourceCreate,
+    VolumeCreate,
+)
 
 
 def test_create_source(db_session: Session):
@@ -24,3 +32,40 @@ def test_get_all_sources(db_session: Session):
     names = [s.name for s in sources]
     assert "MangaPassion" in names
     assert "Jikan" in names
+
+
+def test_lists_with_counts(db_session: Session, count_queries):
+    def manga(title, lists, volumes=0):
+        MangaRepository.create(
+            db_session,
+            MangaCreate(
+                title=title,
+                category=Category.manga,
+                authors=[],
+                genres=[],
+                lists=[ListCreate(name=name) for name in lists],
+                volumes=[VolumeCreate(volume_number=str(i)) for i in range(volumes)],
+            ),
+        )
+
+    ListRepository.create(db_session, ListCreate(name="Empty"))
+    manga("Berserk", ["Reading", "Owned"], volumes=3)
+    manga("Monster", ["Owned"], volumes=2)
+
+    with count_queries() as counter:
+        lists_ = ListRepository.get_with_manga_count(db_session)
+    assert counter.count == 1
+    assert [(row["name"], row["mangaCount"], row["volumeCount"]) for row in lists_] == [
+        ("Empty", 0, 0),
+        ("Owned", 2, 5),
+        ("Reading", 1, 3),
+    ]
+
+    top = ListRepository.get_with_manga_count(
+        db_session, limit=2, sort="count", descending=True
+    )
+    assert [row["name"] for row in top] == ["Owned", "Reading"]
+    rest = ListRepository.get_with_manga_count(
+        db_session, skip=2, limit=2, sort="count", descending=True
+    )
+    assert [row["name"] for row in rest] == ["Empty"]
@@ -0,0 +1,46 @@
+import pytest
+
+from backend.app.search_query import SearchTerm, parse_search_query
+
+
+def test_parse_fields_phrases_and_negation():
+    query = parse_search_query(
+        'author:"Eiichiro Oda" -genre:horror rating>=4 volumes>10 "one piece" -box'
+    )
+    assert query.terms == (
+        SearchTerm("author", "Eiichiro Oda", phrase=True),
+        SearchTerm("genre", "horror", negated=True),
+        SearchTerm("rating", "4", ">="),
+        SearchTerm("volumes", "10", ">"),
+        SearchTerm(None, "one piece", phrase=True),
+        SearchTerm(None, "box", negated=True),
+    )
+
+
+def test_parse_normalizes_and_falls_back_to_text():
+    assert parse_search_query("status:In-Progress rating:5 overall:ongoing").terms == (
+        SearchTerm("status", "in_progress"),
+        SearchTerm("rating", "5", "="),
+        SearchTerm("overall", "ongoing"),
+    )
+    # Unknown prefixes and comparisons on text fields are plain text
+    assert parse_search_query("Re:Zero author>x").terms == (
+        SearchTerm(None, "Re:Zero"),
+        SearchTerm(None, "author>x"),
+    )
+    assert parse_search_query("naruto") is parse_search_query("naruto")
+
+
+@pytest.mark.parametrize(
+    "search",
+    [
+        "rating>=high",
+        "volumes<1.5",
+        "status:reading",
+        "reading:ongoing",
+        "overall:dropped",
+    ],
+)
+def test_parse_rejects_invalid_values(search):
+    with pytest.raises(ValueError):
+        parse_search_query(search)
@@ -13,6 +13,7 @@ The tests exercise the FastAPI app via ``httpx.AsyncClient`` against
 ASGITransport, which is the same approach used elsewhere in this suite.
 """
 
+import hashlib
 import io
 import os
 import sqlite3
@@ -59,7 +60,7 @@ def fake_engine():
     """Yield a per-test in-memory engine and patch the global ``engine``
     used by the database export/import endpoints to point at it."""
     eng = _build_engine()
-    with patch("backend.app.api.v1.endpoints.database.engine", eng):
+    with patch("backend.app.database.engine", eng):
         yield eng
     Base.metadata.drop_all(bind=eng)
 
@@ -398,7 +399,8 @@ async def test_image_save_blocks_path_traversal(tmp_paths):
     db_path = tmp_paths["db_path"]
     img_dir = tmp_paths["image_path"]
 
-    files = {"file": ("cover.png", b"not really a sqlite file", "image/png")}
+    payload = b"\x89PNG\r\n\x1a\n" + b"not really a sqlite file"
+    files = {"file": ("cover.png", payload, "image/png")}
     data = {"filename": "../MyMangaDB.db"}
 
     async with _client_with_auth(
@@ -410,22 +412,22 @@ async def test_image_save_blocks_path_traversal(tmp_paths):
         response = await client.post(
             "/api/v1/images/manga/save", files=files, data=data
         )
-    # Sanitization reduces the filename to ``MyMangaDB.db`` and the file
-    # is written into the *images* dir. The request succeeds with the
-    # sanitized name echoed back to the caller.
+    # The client-chosen name is not used at all: the image is stored under
+    # its content hash inside the *images* dir, and that name is returned.
     assert response.status_code == 200, response.text
-    body = response.json()
-    assert body == {"filename": "MyMangaDB.db"}
+    name = response.json()["filename"]
+    assert name == hashlib.sha256(payload).hexdigest() + ".png"
 
     # The real database file must NOT have been overwritten.
     assert not db_path.exists()
 
     # The upload must have landed under the images directory, not the
     # parent directory that holds the database.
-    assert (img_dir / "MyMangaDB.db").exists()
+    stored = img_dir / name[:2] / name[2:4] / name
+    assert stored.read_bytes() == payload
     # Confirm the file is INSIDE the images directory (i.e. not a symlink
     # or anything funky pointing elsewhere).
-    assert (img_dir / "MyMangaDB.db").resolve().parent == img_dir.resolve()
+    assert img_dir.resolve() in stored.resolve().parents
 
 
 @pytest.mark.asyncio
@@ -485,7 +487,7 @@ async def test_image_save_blocks_nul_byte(tmp_paths):
 @pytest.mark.asyncio
 async def test_image_save_accepts_normal_upload(tmp_paths):
     """A well-formed admin upload must succeed and the file must land
-    inside ``IMAGE_SAVE_PATH`` with the sanitized basename."""
+    inside ``IMAGE_SAVE_PATH`` under its content hash."""
     img_dir = tmp_paths["image_path"]
     payload = b"\x89PNG\r\n\x1a\n" + b"fake-bytes"
     files = {"file": ("cover.png", payload, "image/png")}
@@ -502,8 +504,9 @@ async def test_image_save_accepts_normal_upload(tmp_paths):
         )
     assert response.status_code == 200, response.text
     body = response.json()
-    assert body == {"filename": "1700000000_cover.png"}
-    assert (img_dir / "1700000000_cover.png").read_bytes() == payload
+    name = hashlib.sha256(payload).hexdigest() + ".png"
+    assert body == {"filename": name}
+    assert (img_dir / name[:2] / name[2:4] / name).read_bytes() == payload
 
 
 # ---------------------------------------------------------------------------
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 
+from backend.app.ddl import rebuild_statistics
 from backend.app.models import (
     Author,
     Category,
@@ -10,7 +11,10 @@ from backend.app.models import (
     ReadingStatus,
     Volume,
 )
-from backend.app.repositories.statistics import StatisticsRepository
+from backend.app.repositories.statistics import (
+    AsyncStatisticsRepository,
+    StatisticsRepository,
+)
 
 
 def test_get_statistics(db_session: Session):
@@ -124,3 +128,57 @@ def test_get_statistics(db_session: Session):
     top_authors_labels = [item.label for item in stats.top_authors]
     assert "Author One" in top_authors_labels
     assert "Author Two" in top_authors_labels
+
+
+async def test_get_statistics_async(db_session: Session, async_db_session):
+    manga = Manga(title="Manga One", category=Category.manga, star_rating=5.0)
+    manga.genres.append(Genre(name="Action"))
+    db_session.add(manga)
+    db_session.commit()
+
+    stats = await AsyncStatisticsRepository.get_statistics(async_db_session)
+
+    assert stats == StatisticsRepository.get_statistics(db_session)
+    assert stats.total_mangas == 1
+    assert stats.top_genres[0].label == "Action"
+
+
+def test_statistics_rollup_follows_writes(db_session: Session):
+    manga = Manga(
+        title="Manga One",
+        reading_status=ReadingStatus.in_progress,
+        category=Category.manga,
+        star_rating=3.0,
+    )
+    manga.volumes = [Volume(volume_number="1"), Volume(volume_number="1.5")]
+    db_session.add_all(
+        [
+            manga,
+            Manga(title="Manga Two", category=Category.novel),
+            Manga(title="Manga Three", category=Category.novel, star_rating=4.5),
+        ]
+    )
+    db_session.commit()
+    assert StatisticsRepository.get_statistics(db_session).total_volumes == 2
+
+    manga.reading_status = ReadingStatus.completed
+    manga.star_rating = 4.0
+    db_session.commit()
+    db_session.delete(manga)
+    db_session.commit()
+
+    stats = StatisticsRepository.get_statistics(db_session)
+    assert stats.total_mangas == 2
+    assert stats.total_volumes == 0
+    assert [(c.label, c.count) for c in stats.category_distribution] == [("novel", 2)]
+    assert sorted((c.label, c.count) for c in stats.rating_distribution) == [
+        ("4.5", 1),
+        ("Unrated", 1),
+    ]
+
+    # The incrementally maintained rollup matches a full rebuild, also rated
+    # rows, and rebuilding again finds nothing to fix
+    assert rebuild_statistics(db_session.connection()) == 0
+    assert rebuild_statistics(db_session.connection()) == 0
+    db_session.commit()
+    assert StatisticsRepository.get_statistics(db_session) == stats
@@ -0,0 +1,97 @@
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from PIL import Image
+
+from backend.app import images, thumbnails
+from backend.app.main import app
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    Image.new("RGB", (1200, 1800), "navy").save(tmp_path / "cover.jpg", "JPEG")
+    (tmp_path / "broken.jpg").write_bytes(b"not an image")
+    with patch("backend.app.api.v1.endpoints.image.IMAGE_SAVE_PATH", str(tmp_path)):
+        yield tmp_path
+
+
+def test_negotiate_format():
+    chrome = "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8"
+    assert thumbnails.negotiate_format(chrome) == next(iter(thumbnails.FORMATS))
+    assert thumbnails.negotiate_format("image/webp;q=0, image/png") == "jpeg"
+    assert thumbnails.negotiate_format(None) == "jpeg"
+
+
+def test_thumbnails_are_cached_until_the_original_changes(image_dir):
+    path = thumbnails.get_thumbnail(str(image_dir), "cover.jpg", "small", "jpeg")
+    with Image.open(path) as thumbnail:
+        assert thumbnail.size == (200, 300)
+    made = os.path.getmtime(path)
+    assert thumbnails.get_thumbnail(str(image_dir), "cover.jpg", "small", "jpeg")
+    assert os.path.getmtime(path) == made
+
+    os.utime(image_dir / "cover.jpg", (made + 10, made + 10))
+    thumbnails.get_thumbnail(str(image_dir), "cover.jpg", "small", "jpeg")
+    assert os.path.getmtime(path) > made
+
+    images.remove_thumbnails(str(image_dir), "cover.jpg")
+    assert not os.path.exists(path)
+    with pytest.raises(thumbnails.ThumbnailError):
+        thumbnails.get_thumbnail(str(image_dir), "broken.jpg", "small", "jpeg")
+
+
+def test_worker_backfills_existing_images(image_dir, monkeypatch):
+    scanned_on = []
+    stored_files = images.stored_files
+
+    def recording_stored_files(image_dir):
+        scanned_on.append(threading.current_thread().name)
+        return stored_files(image_dir)
+
+    monkeypatch.setattr(images, "stored_files", recording_stored_files)
+    worker = thumbnails.ThumbnailWorker()
+    worker.backfill(str(image_dir))
+    worker.join()
+    worker.shutdown()
+    # Scanned on the worker thread, not at startup
+    assert scanned_on == ["thumbnail-worker"]
+    for size in thumbnails.PREGENERATED_SIZES:
+        for fmt in thumbnails.FORMATS:
+            assert os.path.exists(
+                thumbnails.thumbnail_path(str(image_dir), "cover.jpg", size, fmt)
+            )
+
+
+async def test_image_endpoint_serves_variants(image_dir):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        original = await client.get("/api/v1/images/manga/cover.jpg")
+        small = await client.get(
+            "/api/v1/images/manga/cover.jpg",
+            params={"size": "small"},
+            headers={"Accept": "image/webp,*/*"},
+        )
+        jpeg = await client.get(
+            "/api/v1/images/volume/cover.jpg",
+            params={"size": "medium", "format": "jpeg"},
+        )
+        broken = await client.get(
+            "/api/v1/images/manga/broken.jpg", params={"size": "small"}
+        )
+        bad_size = await client.get(
+            "/api/v1/images/manga/cover.jpg", params={"size": "huge"}
+        )
+
+    assert original.status_code == 200
+    assert small.status_code == 200
+    assert small.headers["content-type"] == "image/webp"
+    assert "Accept" in small.headers["vary"]
+    assert len(small.content) < len(original.content)
+    assert jpeg.headers["content-type"] == "image/jpeg"
+    assert "Accept" not in jpeg.headers.get("vary", "")
+    # Falls back to the original rather than failing
+    assert broken.content == b"not an image"
+    assert bad_size.status_code == 422
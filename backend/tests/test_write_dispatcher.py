@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend.app.models import Genre as GenreModel
+from backend.app.repositories.base import RepositoryError
+from backend.app.repositories.genre import GenreRepository
+from backend.app.schemas import GenreCreate
+from backend.app.write_dispatcher import WriteDispatcher, WriteQueueFull
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = WriteDispatcher()
+    yield dispatcher
+    dispatcher.shutdown(timeout=5)
+
+
+def _block_writer(dispatcher: WriteDispatcher) -> threading.Event:
+    """Occupy the writer thread until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def wait(db):
+        started.set()
+        release.wait(5)
+
+    threading.Thread(target=dispatcher.submit, args=(wait,), daemon=True).start()
+    started.wait(5)
+    return release
+
+
+def test_submit_runs_on_writer_thread(db_session: Session, dispatcher):
+    genre = dispatcher.submit(GenreRepository.create, GenreCreate(name="Horror"))
+
+    assert genre.name == "Horror"
+    assert db_session.query(GenreModel).count() == 1
+    assert dispatcher.submit(lambda db: threading.current_thread().name) == (
+        "db-writer"
+    )
+    with pytest.raises(RepositoryError):
+        dispatcher.submit(GenreRepository.create, GenreCreate(name="Horror"))
+    assert dispatcher.stats().failed == 1
+
+
+def test_group_commit_isolates_failures(db_session: Session, dispatcher):
+    GenreRepository.create(db_session, GenreCreate(name="Taken"))
+    release = _block_writer(dispatcher)
+
+    names = ["Action", "Taken", "Drama"]
+    with ThreadPoolExecutor(len(names)) as pool:
+        futures = [
+            pool.submit(
+                dispatcher.submit,
+                GenreRepository.create,
+                GenreCreate(name=name),
+                groupable=True,
+            )
+            for name in names
+        ]
+        while dispatcher.stats().depth < len(names):
+            time.sleep(0.01)
+        release.set()
+
+    assert futures[0].result().name == "Action"
+    assert futures[2].result().name == "Drama"
+    with pytest.raises(RepositoryError):
+        futures[1].result()
+
+    # Only the failing write was rolled back, the others kept their commit
+    stats = dispatcher.stats()
+    assert stats.group_retries == 0
+    assert (stats.grouped, stats.failed) == (3, 1)
+    assert stats.completed == 3  # blocking job, Action, Drama
+    assert {name for (name,) in db_session.query(GenreModel.name)} == {
+        "Action",
+        "Drama",
+        "Taken",
+    }
+
+
+def test_group_commit_shares_one_transaction(db_session: Session, dispatcher):
+    release = _block_writer(dispatcher)
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [
+            pool.submit(
+                dispatcher.submit,
+                GenreRepository.create,
+                GenreCreate(name=f"Genre {i}"),
+                groupable=True,
+            )
+            for i in range(3)
+        ]
+        while dispatcher.stats().depth < 3:
+            time.sleep(0.01)
+        release.set()
+
+    assert len({future.result().id for future in futures}) == 3
+    assert dispatcher.stats().grouped == 3
+
+
+def test_full_queue_rejects_writes(db_session: Session):
+    dispatcher = WriteDispatcher(max_queue_size=1, submit_timeout=0.05)
+    release = _block_writer(dispatcher)
+    with ThreadPoolExecutor(1) as pool:
+        queued = pool.submit(dispatcher.submit, lambda db: "queued")
+        while dispatcher.stats().depth < 1:
+            time.sleep(0.01)
+
+        with pytest.raises(WriteQueueFull):
+            dispatcher.submit(lambda db: None)
+        release.set()
+        assert queued.result() == "queued"
+
+    assert dispatcher.stats().rejected == 1
+    dispatcher.shutdown(timeout=5)
+
+
+def test_paused_dispatcher_holds_writes(db_session: Session, dispatcher):
+    dispatcher.gate.pause()
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(dispatcher.submit, lambda db: "written")
+        time.sleep(0.1)
+        assert not future.done()
+        dispatcher.gate.resume()
+        assert future.result(timeout=5) == "written"
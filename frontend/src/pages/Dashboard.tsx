@@ -54,7 +54,7 @@ const Dashboard: React.FC = () => {
     queryFn: ({ pageParam = 1 }) => {
       let effectiveSearch = searchQuery;
       if (filterList) {
-        effectiveSearch = `list:${filterList.name}`;
+        effectiveSearch = `list:"${filterList.name}"`;
       }
       return getMangas(pageParam, limit, effectiveSearch, sortOrder);
     },